@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Orders.py
+    --
+    Immutable trade commands with precompiled encoders.
+
+    A DWX_ZMQ_Order holds the fields of a trade command:
+
+        [TRADE;]ACTION;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;TICKET
+
+    MetaTrader 4 commands (DWX_ZeroMQ_Connector_v2_0_1_RC8) start with
+    'TRADE;' and name their action ('OPEN', 'CLOSE', ...); the MetaTrader 5
+    Service's (DW_ZeroMQ_Connector_v1_1) have no prefix and a numeric action
+    (POS_OPEN, POS_CLOSE, ...), pass _prefix=''.
+
+    The symbol, comment and magic number of a strategy's orders rarely
+    change, so they are encoded once, into a str.format() template where
+    the other fields (action, type, price, SL, TP, lots, ticket) are
+    placeholders. Those are encoded once too, so _encode_() only formats
+    the fields given to it, and _ticket_command_() reuses the whole command
+    up to the ticket, per action (POS_CLOSE, ORD_DELETE, GET_POSITIONS, ...).
+    _magic_command_() encodes a command with another magic number (POS_CLOSE_MAGIC)
+    once per magic number.
+
+    Orders cannot be changed after creation, so one can be shared by any
+    number of threads; _replace_() returns a new order with other fields.
+
+    Usage:
+        _order = DWX_ZMQ_Order(_action=POS_OPEN, _symbol='EURUSD',
+                               _comment='dwx_jmar', _magic=123456,
+                               _lots=0.05, _prefix='')
+        _order._encode_(_type=1)
+        '1;1;EURUSD;0.0;500;500;dwx_jmar;0.05;123456;0'
+        _order._ticket_command_(POS_CLOSE, 85051741)
+        '3;0;EURUSD;0.0;500;500;dwx_jmar;0.05;123456;85051741'
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+##############################################################################
+
+# Fields in the order sent
+ORDER_FIELDS = ('_action', '_type', '_symbol', '_price', '_SL', '_TP',
+                '_comment', '_lots', '_magic', '_ticket')
+
+# Fields left as placeholders in an order's template, in that order
+_CHANGING = ('_action', '_type', '_price', '_SL', '_TP', '_lots', '_ticket')
+
+##############################################################################
+
+def _static_(_value):
+
+    # A field encoded into a template, braces escaped for str.format()
+    return '{}'.format(_value).replace('{', '{{').replace('}', '}}')
+
+##############################################################################
+
+class DWX_ZMQ_Order():
+
+    """
+    Trade command fields, encoded with the static ones precompiled
+    """
+    __slots__ = ORDER_FIELDS + ('_prefix', '_template', '_encoded', '_heads', '_magics')
+
+    def __init__(self,
+                 _action='OPEN',
+                 _type=0,
+                 _symbol='EURUSD',
+                 _price=0.0,
+                 _SL=500,                   # SL/TP in POINTS, not pips.
+                 _TP=500,
+                 _comment='DWX_Python_to_MT',
+                 _lots=0.01,
+                 _magic=123456,
+                 _ticket=0,
+                 _prefix='TRADE;'):         # '' for the MetaTrader 5 Service
+
+        _set = object.__setattr__
+
+        for _field, _value in zip(ORDER_FIELDS, (_action, _type, _symbol, _price,
+                                                 _SL, _TP, _comment, _lots,
+                                                 _magic, _ticket)):
+            _set(self, _field, _value)
+
+        _set(self, '_prefix', _prefix)
+
+        # ACTION;TYPE;-;PRICE;SL;TP;-;LOTS;-;TICKET
+        _set(self, '_template', '{}{{}};{{}};{};{{}};{{}};{{}};{};{{}};{};{{}}'.format(
+            _static_(_prefix), _static_(_symbol), _static_(_comment), _static_(_magic)))
+
+        # The placeholders' fields, encoded
+        _set(self, '_encoded', tuple('{}'.format(getattr(self, _field))
+                                     for _field in _CHANGING))
+
+        # {ACTION: COMMAND UP TO THE TICKET}, filled by _ticket_command_()
+        _set(self, '_heads', {})
+
+        # {(ACTION, MAGIC): COMMAND}, filled by _magic_command_()
+        _set(self, '_magics', {})
+
+    ##########################################################################
+
+    def __setattr__(self, _name, _value):
+        raise AttributeError('DWX_ZMQ_Order is immutable, see _replace_()')
+
+    def __delattr__(self, _name):
+        raise AttributeError('DWX_ZMQ_Order is immutable, see _replace_()')
+
+    def __eq__(self, _other):
+        if not isinstance(_other, DWX_ZMQ_Order):
+            return NotImplemented
+        return self._astuple_() == _other._astuple_()
+
+    def __hash__(self):
+        return hash(self._astuple_())
+
+    def __repr__(self):
+        return 'DWX_ZMQ_Order({})'.format(', '.join(
+            '{}={!r}'.format(_field, getattr(self, _field))
+            for _field in ORDER_FIELDS + ('_prefix',)))
+
+    ##########################################################################
+
+    def _astuple_(self):
+        return tuple(getattr(self, _field) for _field in ORDER_FIELDS + ('_prefix',))
+
+    def _asdict_(self):
+
+        # _DWX_MTX_SEND_COMMAND_() arguments
+        return {_field: getattr(self, _field) for _field in ORDER_FIELDS}
+
+    def _replace_(self, **_fields):
+
+        # New order with _fields changed
+        _order = self._asdict_()
+        _order['_prefix'] = self._prefix
+        _order.update(_fields)
+
+        return DWX_ZMQ_Order(**_order)
+
+    ##########################################################################
+
+    def _encode_(self, _action=None, _type=None, _price=None, _SL=None, _TP=None,
+                 _lots=None, _ticket=None):
+
+        # The command, with the fields given instead of the order's
+        _encoded = self._encoded
+
+        return self._template.format(
+            _encoded[0] if _action is None else _action,
+            _encoded[1] if _type is None else _type,
+            _encoded[2] if _price is None else _price,
+            _encoded[3] if _SL is None else _SL,
+            _encoded[4] if _TP is None else _TP,
+            _encoded[5] if _lots is None else _lots,
+            _encoded[6] if _ticket is None else _ticket)
+
+    def _ticket_command_(self, _action, _ticket=None):
+
+        # The command for _action on _ticket (None: the order's), other
+        # fields the order's; only the ticket is encoded once _action has
+        # been seen
+        _head = self._heads.get(_action)
+
+        if _head is None:
+            _head = self._template.format(_action, *self._encoded[1:6], '')
+            self._heads[_action] = _head
+
+        return _head + ('{}'.format(_ticket) if _ticket is not None else self._encoded[6])
+
+    def _magic_command_(self, _action, _magic):
+
+        # The command for _action with _magic instead of the order's, other
+        # fields the order's; encoded once per (_action, _magic)
+        _command = self._magics.get((_action, _magic))
+
+        if _command is None:
+            _command = self._replace_(_magic=_magic)._encode_(_action)
+            self._magics[(_action, _magic)] = _command
+
+        return _command
+
+##############################################################################
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Trades_Book.py
+    --
+    Local book of open positions and pending orders, kept up to date from
+    the responses to the connector's own commands, so that strategies can
+    look them up without a GET_POSITIONS / GET_PENDING_ORDERS round trip to
+    the terminal:
+
+        EXECUTION               new position (_open_time) or pending order
+                                (_setup_time), fields from the command sent
+        POSITION_MODIFY         new SL / TP of a position
+        ORDER_MODIFY            new SL / TP of a pending order
+        CLOSE                   position closed (CLOSE_MARKET), or known not
+                                to exist (NOT_FOUND)
+        CLOSE (CLOSE_PARTIAL)   position reduced by _close_lots, same ticket
+        CLOSE_ALL(_MAGIC)       positions closed
+        DELETE(_ALL)            pending orders deleted
+        OPEN_POSITIONS          full snapshot, replaces the positions
+        PENDING_ORDERS          full snapshot, replaces the pending orders
+
+    The Service executes commands one at a time and answers them in that
+    order, so applying responses in the order they are read keeps the book
+    consistent with the terminal, snapshots included. EXECUTION responses do
+    not carry the symbol, type, lots or comment, nor MODIFY responses the
+    ticket; they are taken from the commands, matched in send order.
+
+    Some changes never produce a response to this client: stops hit,
+    pending orders filled (a new position), trades of other clients or
+    closed by hand. New entries also lack their SL / TP (None until the
+    next snapshot) and positions their P&L. Each book is therefore due for a
+    snapshot every _reconcile_interval seconds and whenever it cannot follow
+    a change (responses without a command); see _due_().
+
+    Usage:
+        _book = _zmq._Trades_Book
+        if _book._due_('positions'):
+            _zmq._DWX_MTX_GET_ALL_OPEN_POSITIONS_()    # response reconciles it
+        _book.select('positions', _comment='Trader_EURUSD')
+        {2148342: {'_magic': 123456, '_symbol': 'EURUSD', '_lots': 0.01,
+                   '_type': 0, '_open_price': 1.10651, ...}}
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+##############################################################################
+
+# Fields looked up through an index
+_INDEXED = ('_magic', '_symbol', '_comment')
+
+# ENUM_DWX_SERV_ACTION (see DW_ZeroMQ_Connector_v1_1)
+POS_OPEN=1
+POS_MODIFY=2
+ORD_OPEN=7
+ORD_MODIFY=8
+
+# Commands answered without their ticket -> queue of their responses
+_RESPONSE_QUEUES = {POS_OPEN: 'EXECUTION',
+                    ORD_OPEN: 'EXECUTION',
+                    POS_MODIFY: 'POSITION_MODIFY',
+                    ORD_MODIFY: 'ORDER_MODIFY'}
+
+# Responses changing the book, all others are ignored
+_BOOK_ACTIONS = frozenset(('EXECUTION', 'POSITION_MODIFY', 'ORDER_MODIFY',
+                           'CLOSE', 'CLOSE_ALL_MAGIC', 'CLOSE_ALL', 'DELETE',
+                           'DELETE_ALL', 'OPEN_POSITIONS', 'PENDING_ORDERS'))
+
+##############################################################################
+
+class DWX_ZMQ_Trades_Index():
+
+    """
+    Positions or orders by ticket, indexed by magic number, symbol and comment
+    """
+    def __init__(self):
+
+        # {TICKET: {'_magic', '_symbol', '_lots', '_type', ...}}
+        self._trades = {}
+
+        # {FIELD: {VALUE: set(TICKETS)}}
+        self._indexes = {_field: {} for _field in _INDEXED}
+
+    def __len__(self):
+        return len(self._trades)
+
+    def __contains__(self, _ticket):
+        return _ticket in self._trades
+
+    ##########################################################################
+
+    def _put_(self, _ticket, _trade):
+
+        self._pop_(_ticket)
+        self._trades[_ticket] = _trade
+
+        for _field, _index in self._indexes.items():
+            _value = _trade.get(_field)
+            _tickets = _index.get(_value)
+            if _tickets is None:
+                _tickets = _index[_value] = set()
+            _tickets.add(_ticket)
+
+    def _pop_(self, _ticket):
+
+        _trade = self._trades.pop(_ticket, None)
+
+        if _trade is None:
+            return None
+
+        for _field, _index in self._indexes.items():
+            _value = _trade.get(_field)
+            _tickets = _index.get(_value)
+            if _tickets is not None:
+                _tickets.discard(_ticket)
+                if not _tickets:
+                    del _index[_value]
+
+        return _trade
+
+    def _update_(self, _ticket, _fields):
+
+        # Changes fields that are not indexed (e.g. _lots, _SL, _TP)
+        _trade = self._trades.get(_ticket)
+
+        if _trade is not None:
+            _trade.update(_fields)
+
+        return _trade
+
+    def _replace_(self, _trades):
+
+        # Starts over from a snapshot ({TICKET: TRADE})
+        self._trades = {}
+        self._indexes = {_field: {} for _field in _INDEXED}
+
+        for _ticket, _trade in _trades.items():
+            self._put_(_ticket, dict(_trade))
+
+    ##########################################################################
+
+    def select(self, _magic=None, _symbol=None, _comment=None):
+
+        # {TICKET: TRADE (copy)} matching all the fields given, by ticket
+        _tickets = None
+
+        for _field, _value in (('_magic', _magic),
+                               ('_symbol', _symbol),
+                               ('_comment', _comment)):
+
+            if _value is None:
+                continue
+
+            _matches = self._indexes[_field].get(_value)
+
+            if not _matches:
+                return {}
+
+            _tickets = set(_matches) if _tickets is None else _tickets & _matches
+
+        if _tickets is None:
+            _tickets = self._trades
+
+        return {_ticket: dict(self._trades[_ticket]) for _ticket in sorted(_tickets)}
+
+##############################################################################
+
+class DWX_ZMQ_Trades_Book():
+
+    """
+    Open positions and pending orders, updated from the responses to this
+    client's commands
+    """
+    def __init__(self, _reconcile_interval=5.0, _max_pending=10000):
+
+        # Seconds between snapshots (None: only when a book is stale)
+        self._reconcile_interval = _reconcile_interval
+
+        self._books = {'positions': DWX_ZMQ_Trades_Index(),
+                       'orders': DWX_ZMQ_Trades_Index()}
+
+        # Commands waiting for a response without their ticket:
+        # {RESPONSE ACTION: deque([(ACTION, FIELDS)])} in send order
+        self._pending = {_queue: deque(maxlen=_max_pending)
+                         for _queue in set(_RESPONSE_QUEUES.values())}
+
+        # Per book, monotonic() of the last snapshot and whether it is known
+        # to have missed a change since
+        self._reconciled = {'positions': None, 'orders': None}
+        self._stale = {'positions': True, 'orders': True}
+
+        self._reconciles = 0
+
+        # The poll thread writes, strategy threads read
+        self._lock = Lock()
+
+    ##########################################################################
+
+    def _sent_(self, _msg):
+
+        # _msg as sent: ACTION;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;
+        # TICKET. Returns what _discard_() needs if it could not be sent
+        # after all (None for commands answered with their ticket).
+        _action, _, _rest = _msg.partition(';')
+
+        try:
+            _action = int(_action)
+        except ValueError:
+            return None
+
+        _queue = _RESPONSE_QUEUES.get(_action)
+
+        if _queue is None:
+            return None
+
+        _fields = _rest.split(';')
+
+        try:
+            if _action in (POS_OPEN, ORD_OPEN):
+                _command = {'_magic': int(_fields[7]),
+                            '_symbol': _fields[1],
+                            '_lots': float(_fields[6]),
+                            '_type': int(_fields[0]),
+                            '_comment': _fields[5]}
+            else:
+                _command = {'_ticket': int(_fields[8])}
+        except (IndexError, ValueError):
+            return None # Malformed, the Service will not answer it either
+
+        _sent = (_action, _command)
+
+        with self._lock:
+            self._pending[_queue].append(_sent)
+
+        return _queue, _sent
+
+    def _discard_(self, _sent):
+
+        # Forgets a command _sent_() registered, which was not sent
+        _queue, _sent = _sent
+
+        with self._lock:
+            try:
+                self._pending[_queue].remove(_sent)
+            except ValueError:
+                pass
+
+    ##########################################################################
+
+    def _received_(self, _data):
+
+        # _data: a parsed response, in the order received
+        if not isinstance(_data, dict):
+            return
+
+        _action = _data.get('_action')
+
+        if _action not in _BOOK_ACTIONS:
+
+            # Commands refused before execution (e.g. trading not allowed)
+            # are answered without an action: no way to tell which one
+            if _action is None and str(_data.get('_response', '')).endswith('ABORTED_COMMAND'):
+                with self._lock:
+                    for _queue in self._pending.values():
+                        _queue.clear()
+                    self._stale = dict.fromkeys(self._stale, True)
+
+            return
+
+        _positions = self._books['positions']
+        _orders = self._books['orders']
+
+        with self._lock:
+
+            if _action == 'EXECUTION':
+                self._execution_(_data)
+
+            elif _action in ('POSITION_MODIFY', 'ORDER_MODIFY'):
+
+                _queue = self._pending[_action]
+                _sent = _queue.popleft() if _queue else None
+
+                # SL / TP are reported as prices
+                if _sent is None:
+                    self._stale['positions' if _action == 'POSITION_MODIFY' else 'orders'] = True
+                elif '_sl' in _data:
+                    _book = _positions if _action == 'POSITION_MODIFY' else _orders
+                    _book._update_(_sent[1]['_ticket'], {'_SL': _data['_sl'],
+                                                         '_TP': _data.get('_tp')})
+
+            elif _action == 'CLOSE':
+
+                _response = _data.get('_response')
+                _ticket = _data.get('_ticket')
+
+                if _response == 'CLOSE_PARTIAL':
+                    # The position keeps its ticket
+                    _position = _positions._trades.get(_ticket)
+                    if _position is not None and '_close_lots' in _data:
+                        _lots = round(_position['_lots'] - _data['_close_lots'], 8)
+                        if _lots > 0:
+                            _positions._update_(_ticket, {'_lots': _lots})
+                        else:
+                            _positions._pop_(_ticket)
+
+                elif _response in ('CLOSE_MARKET', 'NOT_FOUND'):
+                    _positions._pop_(_ticket)
+
+            elif _action in ('CLOSE_ALL_MAGIC', 'CLOSE_ALL'):
+
+                for _ticket, _closed in _data.get('_responses', {}).items():
+                    if _closed.get('_response') == 'CLOSE_MARKET':
+                        _positions._pop_(_ticket)
+
+            elif _action == 'DELETE':
+
+                if _data.get('_response') in ('CLOSE_PENDING', 'NOT_FOUND'):
+                    _orders._pop_(_data.get('_ticket'))
+
+            elif _action == 'DELETE_ALL':
+
+                for _ticket, _deleted in _data.get('_responses', {}).items():
+                    if _deleted.get('_response') == 'CLOSE_PENDING':
+                        _orders._pop_(_ticket)
+
+            elif _action == 'OPEN_POSITIONS' and '_positions' in _data:
+                self._reconcile_('positions', _data['_positions'])
+
+            elif _action == 'PENDING_ORDERS' and '_orders' in _data:
+                self._reconcile_('orders', _data['_orders'])
+
+    def _execution_(self, _data):
+
+        # Called with the lock held
+        _queue = self._pending['EXECUTION']
+        _sent = _queue.popleft() if _queue else None
+
+        # Failed commands have no ticket
+        if '_ticket' not in _data:
+            return
+
+        _pending_order = '_setup_time' in _data
+        _name = 'orders' if _pending_order else 'positions'
+
+        if _sent is None:
+            _command = {'_magic': _data.get('_magic')}
+            self._stale[_name] = True
+        else:
+            _command = _sent[1]
+
+        # Fields in the order of OPEN_POSITIONS / PENDING_ORDERS
+        _trade = {'_magic': _command['_magic'],
+                  '_symbol': _command.get('_symbol'),
+                  '_lots': _command.get('_lots'),
+                  '_type': _command.get('_type'),
+                  '_open_price': _data.get('_open_price')}
+
+        if _pending_order:
+            _trade.update({'_SL': None,
+                           '_TP': None,
+                           '_comment': _command.get('_comment')})
+        else:
+            _trade.update({'_open_time': _data.get('_open_time'),
+                           '_SL': None,
+                           '_TP': None,
+                           '_pnl': None,
+                           '_comment': _command.get('_comment')})
+
+        self._books[_name]._put_(_data['_ticket'], _trade)
+
+    def _reconcile_(self, _name, _snapshot):
+
+        # Called with the lock held
+        self._books[_name]._replace_(_snapshot)
+        self._reconciled[_name] = monotonic()
+        self._stale[_name] = False
+        self._reconciles += 1
+
+    ##########################################################################
+
+    def _due_(self, _name='positions'):
+
+        # True if the book ('positions' or 'orders') should be reconciled
+        # with a snapshot first
+        with self._lock:
+
+            if self._stale[_name] or self._reconciled[_name] is None:
+                return True
+
+            return (self._reconcile_interval is not None
+                    and monotonic() - self._reconciled[_name] >= self._reconcile_interval)
+
+    def _invalidate_(self, _name=None):
+
+        # Forces a snapshot of one book (or both) before it is used again
+        with self._lock:
+            for _book in (self._stale if _name is None else (_name,)):
+                self._stale[_book] = True
+
+    ##########################################################################
+
+    def select(self, _name='positions', _magic=None, _symbol=None, _comment=None):
+
+        # {TICKET: {'_magic', '_symbol', '_lots', '_type', '_open_price', ...}}
+        # of the open positions / pending orders matching all the fields given
+        with self._lock:
+            return self._books[_name].select(_magic, _symbol, _comment)
+
+    def get(self, _ticket, _name='positions'):
+
+        with self._lock:
+            _trade = self._books[_name]._trades.get(_ticket)
+            return None if _trade is None else dict(_trade)
+
+##############################################################################
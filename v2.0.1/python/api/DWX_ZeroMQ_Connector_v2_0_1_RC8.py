@@ -16,9 +16,11 @@
 """
 
 import zmq
-from time import sleep
-from pandas import DataFrame, Timestamp
+from time import sleep, time_ns, perf_counter_ns
+from pandas import DataFrame, Timestamp, to_datetime
 from threading import Thread
+from api.DWX_ZMQ_Parser import DWX_ZMQ_Parser
+from api.DWX_ZMQ_Orders import DWX_ZMQ_Order
 
 # 30-07-2019 10:58 CEST
 from zmq.utils.monitor import recv_monitor_message
@@ -39,6 +41,7 @@ class DWX_ZeroMQ_Connector():
                  _verbose=True,             # String delimiter
                  _poll_timeout=1000,        # ZMQ Poller Timeout (ms)
                  _sleep_delay=0.001,        # 1 ms for time.sleep()
+                 _batch_budget=1000,        # Max. messages read per socket per poll wakeup
                  _monitor=False):           # Experimental ZeroMQ Socket Monitoring
     
         ######################################################################
@@ -105,10 +108,18 @@ class DWX_ZeroMQ_Connector():
         self._PULL_Monitor_Thread = None
         
         # Market Data Dictionary by Symbol (holds tick data)
+        # TIMESTAMP is the receive time, int ns since epoch (UTC), see
+        # _DWX_MTX_GET_MARKETDATA_DATAFRAME_() for datetimes.
         self._Market_Data_DB = {}   # {SYMBOL: {TIMESTAMP: (BID, ASK)}}
+        
+        # Last tick TIMESTAMP (ns): ticks carry no server time, so they are
+        # keyed by receive time, kept increasing so none overwrites another
+        # (time_ns() may repeat, e.g. 100 ns ticks on Windows)
+        self._last_tick_ns = 0
                                 
-        # Temporary Order STRUCT for convenience wrappers later.
-        self.temp_order_dict = self._generate_default_order_dict()
+        # Default order for the convenience wrappers, which send it with
+        # their own fields only (immutable, shared by all threads)
+        self._default_order = DWX_ZMQ_Order(**self._generate_default_order_dict())
         
         # Thread returns the most recently received DATA block here
         self._thread_data_output = None
@@ -122,6 +133,17 @@ class DWX_ZeroMQ_Connector():
         # Global Sleep Delay
         self._sleep_delay = _sleep_delay
         
+        # Messages drained per socket on each poll wakeup, and loop counters
+        self._batch_budget = _batch_budget
+        self._poll_stats = {'wakeups': 0,           # poll() wakeups with data
+                            'messages': 0,          # messages received
+                            'last_batch': 0,        # messages in last wakeup
+                            'max_batch': 0,
+                            'budget_exhausted': 0,  # drains stopped by _batch_budget
+                            'last_loop_ns': 0,      # wakeup -> batch processed
+                            'max_loop_ns': 0,
+                            'total_loop_ns': 0}
+        
         # Begin polling for PULL / SUB data
         self._MarketData_Thread = Thread(target=self._DWX_ZMQ_Poll_Data_, 
                                          args=(self._string_delimiter,
@@ -268,93 +290,61 @@ class DWX_ZeroMQ_Connector():
     
     # Convenience functions to permit easy trading via underlying functions.
     
-    # OPEN ORDER
+    # OPEN ORDER (dict of _DWX_MTX_SEND_COMMAND_() arguments or DWX_ZMQ_Order)
     def _DWX_MTX_NEW_TRADE_(self, _order=None):
         
         if _order is None:
-            _order = self._generate_default_order_dict()
+            _order = self._default_order
         
         # Execute
-        self._DWX_MTX_SEND_COMMAND_(**_order)
+        if isinstance(_order, DWX_ZMQ_Order):
+            self.remote_send(self._PUSH_SOCKET, _order._encode_())
+        else:
+            self._DWX_MTX_SEND_COMMAND_(**_order)
         
     # MODIFY ORDER
     def _DWX_MTX_MODIFY_TRADE_BY_TICKET_(self, _ticket, _SL, _TP): # in points
         
-        try:
-            self.temp_order_dict['_action'] = 'MODIFY'
-            self.temp_order_dict['_SL'] = _SL
-            self.temp_order_dict['_TP'] = _TP
-            self.temp_order_dict['_ticket'] = _ticket
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._encode_('MODIFY', _SL=_SL,
+                                                                         _TP=_TP, _ticket=_ticket))
     
     # CLOSE ORDER
     def _DWX_MTX_CLOSE_TRADE_BY_TICKET_(self, _ticket):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE'
-            self.temp_order_dict['_ticket'] = _ticket
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_('CLOSE', _ticket))
             
     # CLOSE PARTIAL
     def _DWX_MTX_CLOSE_PARTIAL_BY_TICKET_(self, _ticket, _lots):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_PARTIAL'
-            self.temp_order_dict['_ticket'] = _ticket
-            self.temp_order_dict['_lots'] = _lots
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._encode_('CLOSE_PARTIAL', _lots=_lots,
+                                                                         _ticket=_ticket))
             
     # CLOSE MAGIC
     def _DWX_MTX_CLOSE_TRADES_BY_MAGIC_(self, _magic):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_MAGIC'
-            self.temp_order_dict['_magic'] = _magic
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._magic_command_('CLOSE_MAGIC', _magic))
     
     # CLOSE ALL TRADES
     def _DWX_MTX_CLOSE_ALL_TRADES_(self):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_ALL'
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_('CLOSE_ALL'))
         
     # GET OPEN TRADES
     def _DWX_MTX_GET_ALL_OPEN_TRADES_(self):
         
-        try:
-            self.temp_order_dict['_action'] = 'GET_OPEN_TRADES'
-                        
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_('GET_OPEN_TRADES'))
+    
+    # SEND ORDER (DWX_ZMQ_Order, with the _encode_() fields given changed)
+    def _DWX_MTX_SEND_ORDER_(self, _order, **_changes):
+        
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, _order._encode_(**_changes))
     
     # DEFAULT ORDER DICT
     def _generate_default_order_dict(self):
@@ -452,28 +442,37 @@ class DWX_ZeroMQ_Connector():
     
     def _DWX_ZMQ_Poll_Data_(self, 
                            string_delimiter=';',
-                           poll_timeout=1000):
+                           poll_timeout=1000,
+                           no_handshake_delay=0.1):
         
         while self._ACTIVE:
             
-            sleep(self._sleep_delay) # poll timeout is in ms, sleep() is s.
-            
+            # No sleep here: poll() blocks until there is data (or timeout),
+            # and every wakeup drains the sockets up to _batch_budget.
             sockets = dict(self._poller.poll(poll_timeout))
             
+            if not sockets:
+                continue
+            
+            # Loop latency is measured from wakeup until the batch is processed
+            _wakeup = perf_counter_ns()
+            _batch_size = 0
+            
             # Process response to commands sent to MetaTrader
             if self._PULL_SOCKET in sockets and sockets[self._PULL_SOCKET] == zmq.POLLIN:
                 
                 if self._PULL_SOCKET_STATUS['state'] == True:
-                    try:
-                        
-                        # msg = self._PULL_SOCKET.recv_string(zmq.DONTWAIT)
-                        msg = self.remote_recv(self._PULL_SOCKET)
+                    
+                    _batch = self._DWX_ZMQ_Drain_(self._PULL_SOCKET)
+                    _batch_size += len(_batch)
+                    
+                    for msg in _batch:
                         
                         # If data is returned, store as pandas Series
                         if msg != '' and msg != None:
                             
                             try: 
-                                _data = eval(msg)
+                                _data = DWX_ZMQ_Parser.parse(msg)
                                 
                                 self._thread_data_output = _data
                                 if self._verbose:
@@ -483,48 +482,100 @@ class DWX_ZeroMQ_Connector():
                                 _exstr = "Exception Type {0}. Args:\n{1!r}"
                                 _msg = _exstr.format(type(ex).__name__, ex.args)
                                 print(_msg)
-                   
-                    except zmq.error.Again:
-                        pass # resource temporarily unavailable, nothing to print
-                    except ValueError:
-                        pass # No data returned, passing iteration.
-                    except UnboundLocalError:
-                        pass # _symbol may sometimes get referenced before being assigned.
                 
                 else:
                     print('\r[KERNEL] NO HANDSHAKE on PULL SOCKET.. Cannot READ data.', end='', flush=True)
+                    
+                    # Unread responses keep the PULL socket readable, so
+                    # poll() would return at once: wait for the handshake
+                    sleep(no_handshake_delay)
             
             # Receive new market data from MetaTrader
             if self._SUB_SOCKET in sockets and sockets[self._SUB_SOCKET] == zmq.POLLIN:
                 
-                try:
-                    msg = self._SUB_SOCKET.recv_string(zmq.DONTWAIT)
-                    
-                    if msg != "":
-                        _symbol, _data = msg.split(" ")
-                        _bid, _ask = _data.split(string_delimiter)
-                        _timestamp = str(Timestamp.now('UTC'))[:-6]
-                        
-                        if self._verbose:
-                            print("\n[" + _symbol + "] " + _timestamp + " (" + _bid + "/" + _ask + ") BID/ASK")
+                _batch = self._DWX_ZMQ_Drain_(self._SUB_SOCKET)
+                _batch_size += len(_batch)
+                
+                for msg in _batch:
                     
-                        # Update Market Data DB
-                        if _symbol not in self._Market_Data_DB.keys():
-                            self._Market_Data_DB[_symbol] = {}
+                    try:
+                        if msg != "":
+                            _symbol, _data = msg.split(" ")
+                            _bid, _ask = _data.split(string_delimiter)
+                            _timestamp = max(time_ns(), self._last_tick_ns + 1)
+                            self._last_tick_ns = _timestamp
                             
-                        self._Market_Data_DB[_symbol][_timestamp] = (float(_bid), float(_ask))
-                    
-                except zmq.error.Again:
-                    pass # resource temporarily unavailable, nothing to print
-                except ValueError:
-                    pass # No data returned, passing iteration.
-                except UnboundLocalError:
-                    pass # _symbol may sometimes get referenced before being assigned.
+                            if self._verbose:
+                                print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _bid + "/" + _ask + ") BID/ASK")
+                        
+                            # Update Market Data DB
+                            if _symbol not in self._Market_Data_DB.keys():
+                                self._Market_Data_DB[_symbol] = {}
+                                
+                            self._Market_Data_DB[_symbol][_timestamp] = (float(_bid), float(_ask))
+                        
+                    except ValueError:
+                        pass # Malformed message, skipping it.
+            
+            self._update_poll_stats_(_batch_size, perf_counter_ns() - _wakeup)
                     
         print("\n++ [KERNEL] _DWX_ZMQ_Poll_Data_() Signing Out ++")
                 
     ##########################################################################
     
+    """
+    Function to read every pending message on a socket (up to _batch_budget)
+    """
+    def _DWX_ZMQ_Drain_(self, _socket):
+        
+        _batch = []
+        
+        try:
+            for _ in range(self._batch_budget):
+                _batch.append(_socket.recv_string(zmq.NOBLOCK))
+                
+        except zmq.error.Again:
+            pass # socket drained
+        else:
+            self._poll_stats['budget_exhausted'] += 1
+        
+        return _batch
+    
+    ##########################################################################
+    
+    def _update_poll_stats_(self, _batch_size, _loop_ns):
+        
+        _stats = self._poll_stats
+        
+        _stats['wakeups'] += 1
+        _stats['messages'] += _batch_size
+        _stats['last_batch'] = _batch_size
+        _stats['last_loop_ns'] = _loop_ns
+        _stats['total_loop_ns'] += _loop_ns
+        
+        if _batch_size > _stats['max_batch']:
+            _stats['max_batch'] = _batch_size
+        
+        if _loop_ns > _stats['max_loop_ns']:
+            _stats['max_loop_ns'] = _loop_ns
+    
+    ##########################################################################
+    
+    """
+    Function to get the poll loop's batch size and latency counters
+    """
+    def _get_poll_stats_(self):
+        
+        _stats = dict(self._poll_stats)
+        _wakeups = max(_stats['wakeups'], 1)
+        
+        _stats['mean_batch'] = _stats['messages'] / _wakeups
+        _stats['mean_loop_ns'] = _stats['total_loop_ns'] / _wakeups
+        
+        return _stats
+    
+    ##########################################################################
+    
     """
     Function to subscribe to given Symbol's BID/ASK feed from MetaTrader
     """
@@ -538,6 +589,19 @@ class DWX_ZeroMQ_Connector():
         
         print("[KERNEL] Subscribed to {} BID/ASK updates. See self._Market_Data_DB.".format(_symbol))
     
+    """
+    Function to get a Symbol's ticks as a DataFrame indexed by receive time
+    (timestamps are converted here, in one vectorized pass)
+    """
+    def _DWX_MTX_GET_MARKETDATA_DATAFRAME_(self, _symbol='EURUSD'):
+        
+        # Copy first, the poll thread keeps adding ticks
+        _ticks = dict(self._Market_Data_DB.get(_symbol, {}))
+        
+        return DataFrame(list(_ticks.values()),
+                         index=to_datetime(list(_ticks.keys()), unit='ns'),
+                         columns=['bid', 'ask'])
+    
     """
     Function to unsubscribe to given Symbol's BID/ASK feed from MetaTrader
     """
@@ -12,8 +12,11 @@
 """
 import zmq
 from time import sleep, mktime
-from pandas import DataFrame, Timestamp
+from pandas import DataFrame, Timestamp, to_datetime
 from threading import Thread
+from api.DWX_ZMQ_Parser import DWX_ZMQ_Parser
+from api.DWX_ZMQ_Trades_Book import DWX_ZMQ_Trades_Book
+from api.DWX_ZMQ_Orders import DWX_ZMQ_Order
 from zmq.utils.monitor import recv_monitor_message
 
 # ENUM_DWX_SERV_ACTION
@@ -52,7 +55,9 @@ class DWX_ZeroMQ_Connector():
                  _verbose=False,            # Print all responses(self._DWX_ZMQ_Poll_Data_)
                  _poll_timeout=1000,        # ZMQ Poller Timeout (ms)
                  _sleep_delay=0.001,        # 1 ms for time.sleep()
-                 _monitor=False):           # Experimental ZeroMQ Socket Monitoring
+                 _monitor=False,            # Experimental ZeroMQ Socket Monitoring
+                 _trades_book=True,         # Keep positions / orders locally from responses
+                 _reconcile_interval=5.0):  # Seconds before the trades book is due for a snapshot
         ######################################################################
         # Strategy Status (if this is False, ZeroMQ will not listen for data)
         self._ACTIVE = True
@@ -101,9 +106,17 @@ class DWX_ZeroMQ_Connector():
         self._PUSH_Monitor_Thread = None
         self._PULL_Monitor_Thread = None
         # Market Data Dictionary by Symbol (holds tick data)
+        # TIMESTAMP is the server's tick time as sent, int ms since epoch, see
+        # _DWX_MTX_GET_MARKETDATA_DATAFRAME_() for datetimes.
         self._Market_Data_DB = {}   # {SYMBOL: {TIMESTAMP: (BID, ASK)}}
-        # Temporary Order STRUCT for convenience wrappers later.
-        self.temp_order_dict = self._generate_default_order_dict()
+        # Default order for the convenience wrappers, which send it with
+        # their own fields only (immutable, shared by all threads)
+        self._default_order = DWX_ZMQ_Order(**self._generate_default_order_dict(), _prefix='')
+        # Open positions and pending orders, updated from responses and
+        # GET_POSITIONS / GET_PENDING_ORDERS snapshots (see DWX_ZMQ_Trades_Book)
+        self._Trades_Book = None
+        if _trades_book:
+            self._Trades_Book = DWX_ZMQ_Trades_Book(_reconcile_interval)
         # Thread returns the most recently received DATA block here
         self._thread_data_output = None
         # Verbosity
@@ -179,9 +192,15 @@ class DWX_ZeroMQ_Connector():
         Function to send commands to MetaTrader (PUSH)
         """
         if self._PUSH_SOCKET_STATUS['state'] == True:
+            # Registered before sending so the response cannot arrive first
+            _sent = None
+            if self._Trades_Book is not None:
+                _sent = self._Trades_Book._sent_(_data)
             try:
                 _socket.send_string(_data, zmq.DONTWAIT)
             except zmq.error.Again:
+                if _sent is not None:
+                    self._Trades_Book._discard_(_sent)
                 print("\nResource timeout.. please try again.")
                 sleep(self._sleep_delay)
         else:
@@ -222,113 +241,73 @@ class DWX_ZeroMQ_Connector():
     # Convenience functions to permit easy trading via underlying functions. #
     ##########################################################################
     ##########################################################################
-    # NEW POSITION OR PENDING ORDER
+    # NEW POSITION OR PENDING ORDER (dict of _DWX_MTX_SEND_COMMAND_() arguments or DWX_ZMQ_Order)
     def _DWX_MTX_NEW_TRADE_(self, _order=None):
         if _order is None:
-            _order = self._generate_default_order_dict()
+            _order = self._default_order
         # Execute
-        self._DWX_MTX_SEND_COMMAND_(**_order)
+        if isinstance(_order, DWX_ZMQ_Order):
+            self.remote_send(self._PUSH_SOCKET, _order._encode_())
+        else:
+            self._DWX_MTX_SEND_COMMAND_(**_order)
     ##########################################################################
     # MODIFY POSITION (SET|RESET|UPDATE SL|TP)
     def _DWX_MTX_MODIFY_POSITION_BY_TICKET_(self, _ticket, _SL, _TP): # in points
-        try:
-            self.temp_order_dict['_action'] = POS_MODIFY
-            self.temp_order_dict['_SL'] = _SL
-            self.temp_order_dict['_TP'] = _TP
-            self.temp_order_dict['_ticket'] = _ticket
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._encode_(POS_MODIFY, _SL=_SL,
+                                                                         _TP=_TP, _ticket=_ticket))
     ##########################################################################
     # MODIFY PENDING ORDER (SET|RESET|UPDATE SL|TP)
     def _DWX_MTX_MODIFY_ORDER_BY_TICKET_(self, _ticket, _SL, _TP): # in points
-        try:
-            self.temp_order_dict['_action'] = ORD_MODIFY
-            self.temp_order_dict['_SL'] = _SL
-            self.temp_order_dict['_TP'] = _TP
-            self.temp_order_dict['_ticket'] = _ticket
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._encode_(ORD_MODIFY, _SL=_SL,
+                                                                         _TP=_TP, _ticket=_ticket))
     ##########################################################################
     # CLOSE POSITION BY TICKET
     def _DWX_MTX_CLOSE_POSITION_BY_TICKET_(self, _ticket):
-        try:
-            self.temp_order_dict['_action'] = POS_CLOSE
-            self.temp_order_dict['_ticket'] = _ticket
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(POS_CLOSE, _ticket))
     ##########################################################################
     # DELETE PENDING ORDER BY TICKET
     def _DWX_MTX_DELETE_PENDING_BY_TICKET_(self, _ticket):
-        try:
-            self.temp_order_dict['_action'] = ORD_DELETE
-            self.temp_order_dict['_ticket'] = _ticket
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(ORD_DELETE, _ticket))
     ##########################################################################
     # CLOSE PARTIAL
     def _DWX_MTX_CLOSE_PARTIAL_BY_TICKET_(self, _ticket, _lots):
-        try:
-            self.temp_order_dict['_action'] = POS_CLOSE_PARTIAL
-            self.temp_order_dict['_ticket'] = _ticket
-            self.temp_order_dict['_lots'] = _lots
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._encode_(POS_CLOSE_PARTIAL, _lots=_lots,
+                                                                         _ticket=_ticket))
     ##########################################################################
     # CLOSE MAGIC
     def _DWX_MTX_CLOSE_POSITIONS_BY_MAGIC_(self, _magic):
-        try:
-            self.temp_order_dict['_action'] = POS_CLOSE_MAGIC
-            self.temp_order_dict['_magic'] = _magic
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._magic_command_(POS_CLOSE_MAGIC, _magic))
     ##########################################################################
     # CLOSE ALL POSITIONS
     def _DWX_MTX_CLOSE_ALL_POSITIONS_(self):
-        try:
-            self.temp_order_dict['_action'] = POS_CLOSE_ALL
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(POS_CLOSE_ALL))
     ##########################################################################
     # DELETE ALL PENDING ORDERS
     def _DWX_MTX_DELETE_ALL_PENDING_(self):
-        try:
-            self.temp_order_dict['_action'] = ORD_DELETE_ALL
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(ORD_DELETE_ALL))
     ##########################################################################
     # GET WORKING POSITIONS
     def _DWX_MTX_GET_ALL_OPEN_POSITIONS_(self):
-        try:
-            self.temp_order_dict['_action'] = GET_POSITIONS
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(GET_POSITIONS))
     ##########################################################################
     # GET PENDING ORDERS
     def _DWX_MTX_GET_ALL_PENDING_ORDERS_(self):
-        try:
-            self.temp_order_dict['_action'] = GET_PENDING_ORDERS
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-        except KeyError:
-            pass
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, self._default_order._ticket_command_(GET_PENDING_ORDERS))
+    ##########################################################################
+    # SEND ORDER (DWX_ZMQ_Order, with the _encode_() fields given changed)
+    def _DWX_MTX_SEND_ORDER_(self, _order, **_changes):
+        # Execute
+        self.remote_send(self._PUSH_SOCKET, _order._encode_(**_changes))
     ##########################################################################
     # DEFAULT ORDER DICT
     def _generate_default_order_dict(self):
@@ -437,6 +416,7 @@ class DWX_ZeroMQ_Connector():
                                                          _ticket)
         """
     Function to construct messages for sending Trade commands to MetaTrader
+    (for orders sent repeatedly, see DWX_ZMQ_Order and _DWX_MTX_SEND_ORDER_())
         """
         # Send via PUSH Socket
         self.remote_send(self._PUSH_SOCKET, _msg)
@@ -496,7 +476,9 @@ class DWX_ZeroMQ_Connector():
                         # If data is returned, store as pandas Series
                         if msg != '' and msg != None:
                             try:
-                                _data = eval(msg)
+                                _data = DWX_ZMQ_Parser.parse(msg)
+                                if self._Trades_Book is not None:
+                                    self._Trades_Book._received_(_data)
                                 self._thread_data_output = _data
                                 if self._verbose:
                                     print(_data) # default logic
@@ -520,16 +502,17 @@ class DWX_ZeroMQ_Connector():
                         _symbol, _data = msg.split(" ")
                         # There might be one or more ticks data and need bo be split
                         _packets = _data.split(packet_data_delimiter)
+                        # Update Market Data DB
+                        if _symbol not in self._Market_Data_DB.keys():
+                            self._Market_Data_DB[_symbol] = {}
+                        _ticks = self._Market_Data_DB[_symbol]
                         for _tick in _packets:
                             _timestamp, _bid, _ask = _tick.split(string_delimiter)
-                            # Received time in milliseconds need to be formatted
-                            _timestamp = str(Timestamp(int(_timestamp),unit='ms'))[:-3]
+                            # Server time in milliseconds, kept as is
+                            _timestamp = int(_timestamp)
                             if self._verbose:
-                                print("\n[" + _symbol + "] " + _timestamp + " (" + _bid + "/" + _ask + ") BID/ASK")
-                            # Update Market Data DB
-                            if _symbol not in self._Market_Data_DB.keys():
-                                self._Market_Data_DB[_symbol] = {}
-                            self._Market_Data_DB[_symbol][_timestamp] = (float(_bid), float(_ask))
+                                print("\n[" + _symbol + "] " + str(Timestamp(_timestamp, unit='ms')) + " (" + _bid + "/" + _ask + ") BID/ASK")
+                            _ticks[_timestamp] = (float(_bid), float(_ask))
                 except zmq.error.Again:
                     pass # resource temporarily unavailable, nothing to print
                 except ValueError:
@@ -549,6 +532,17 @@ class DWX_ZeroMQ_Connector():
         self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
         print("[KERNEL] Subscribed to {} BID/ASK updates. See self._Market_Data_DB.".format(_symbol))
     ##########################################################################
+    def _DWX_MTX_GET_MARKETDATA_DATAFRAME_(self, _symbol='EURUSD'):
+        """
+    Function to get a Symbol's ticks as a DataFrame indexed by server time
+    (timestamps are converted here, in one vectorized pass)
+        """
+        # Copy first, the poll thread keeps adding ticks
+        _ticks = dict(self._Market_Data_DB.get(_symbol, {}))
+        return DataFrame(list(_ticks.values()),
+                         index=to_datetime(list(_ticks.keys()), unit='ms'),
+                         columns=['bid', 'ask'])
+    ##########################################################################
     def _DWX_MTX_UNSUBSCRIBE_MARKETDATA_(self, _symbol):
         """
     Function to unsubscribe to given Symbol's BID/ASK feed from MetaTrader
@@ -26,11 +26,40 @@ class DWX_ZMQ_Reporting():
     def _get_open_trades_(self, _trader='Trader_SYMBOL', 
                           _delay=0.1, _wbreak=10):
         
+        return self._get_book_('positions', self._zmq._DWX_MTX_GET_ALL_OPEN_POSITIONS_,
+                               _trader, _delay, _wbreak)
+    
+    ##########################################################################
+    
+    def _get_pending_orders_(self, _trader='Trader_SYMBOL', 
+                             _delay=0.1, _wbreak=10):
+        
+        return self._get_book_('orders', self._zmq._DWX_MTX_GET_ALL_PENDING_ORDERS_,
+                               _trader, _delay, _wbreak)
+    
+    ##########################################################################
+    
+    def _get_book_(self, _name, _request, _trader, _delay, _wbreak):
+        
+        # Answer from the connector's trades book, unless it is due for a
+        # snapshot (the response below reconciles it)
+        _book = self._zmq._Trades_Book
+        
+        if _book is not None and not _book._due_(_name):
+            
+            _trades = _book.select(_name, _comment=_trader)
+            
+            if len(_trades) > 0:
+                return DataFrame(data=_trades.values(),
+                                 index=_trades.keys())
+            
+            return DataFrame()
+        
         # Reset data output
         self._zmq._set_response_(None)
         
-        # Get open trades from MetaTrader
-        self._zmq._DWX_MTX_GET_ALL_OPEN_POSITIONS_()
+        # Get open positions / pending orders from MetaTrader
+        _request()
 
         # While loop start time reference            
         _ws = to_datetime('now')
@@ -48,11 +77,13 @@ class DWX_ZMQ_Reporting():
             
             _response = self._zmq._get_response_()
             
-            if ('_positions' in _response.keys()
-                and len(_response['_positions']) > 0):
+            _key = '_' + _name
+            
+            if (_key in _response.keys()
+                and len(_response[_key]) > 0):
                 
-                _df = DataFrame(data=_response['_positions'].values(),
-                                index=_response['_positions'].keys())
+                _df = DataFrame(data=_response[_key].values(),
+                                index=_response[_key].keys())
                 return _df[_df['_comment'] == _trader]
             
         # Default
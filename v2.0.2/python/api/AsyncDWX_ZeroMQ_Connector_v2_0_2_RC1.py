@@ -0,0 +1,671 @@
+# -*- coding: utf-8 -*-
+
+"""
+    AsyncDWX_ZeroMQ_Connector_v2_0_2_RC1.py
+    --
+    asyncio counterpart of DWX_ZeroMQ_Connector, built on zmq.asyncio.
+
+    Every _DWX_MTX_* command is a coroutine that returns the response from
+    MetaTrader (or raises asyncio.TimeoutError), and SUB data is consumed with
+    async iterators instead of a polling thread:
+
+        _zmq = AsyncDWX_ZeroMQ_Connector(_request_ids=True)
+
+        _trades = await _zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()
+
+        await _zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_('EURUSD')
+        await _zmq._DWX_MTX_SEND_TRACKPRICES_REQUEST_(['EURUSD'])
+
+        async for _timestamp, (_bid, _ask) in _zmq._DWX_MTX_MARKETDATA_STREAM_('EURUSD'):
+            ...
+
+    Without request IDs, commands are sent one at a time and each awaits the
+    next response on PULL answering its action (the Expert Advisor answers
+    in order; late responses to commands that timed out are skipped). With
+    _request_ids=True any number of commands can be in flight.
+
+    Existing onPullData / onSubData handlers are invoked for every message,
+    as with DWX_ZeroMQ_Connector. Handlers may also be coroutines.
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+import zmq.asyncio
+import asyncio
+from inspect import isawaitable
+from time import time_ns
+from itertools import count
+from pandas import DataFrame, Timestamp
+from api.DWX_ZMQ_Parser import DWX_ZMQ_Parser
+from api.DWX_ZMQ_Market_Data_DB import DWX_ZMQ_Market_Data_DB
+from api.DWX_ZMQ_Latency import RESPONSE_ACTIONS, COMMAND_QUEUES
+from api.DWX_ZMQ_Orders import DWX_ZMQ_Order
+
+class AsyncDWX_ZeroMQ_Connector():
+
+    """
+    Setup ZeroMQ -> MetaTrader Connector (asyncio)
+    """
+    def __init__(self,
+                 _ClientID='DLabs_Python',  # Unique ID for this client
+                 _host='localhost',         # Host to connect to
+                 _protocol='tcp',           # Connection protocol
+                 _PUSH_PORT=32768,          # Port for Sending commands
+                 _PULL_PORT=32769,          # Port for Receiving responses
+                 _SUB_PORT=32770,           # Port for Subscribing for prices
+                 _delimiter=';',
+                 _pulldata_handlers = [],   # Handlers to process data received through PULL port.
+                 _subdata_handlers = [],    # Handlers to process data received through SUB port.
+                 _verbose=False,            # Print received data
+                 _request_ids=False,        # Tag commands with a request ID echoed back by the server
+                 _timeout=10.0,             # Seconds to wait for a command's response
+                 _stream_maxsize=1000,      # Messages buffered per stream (oldest dropped first)
+                 _tick_capacity=200000,     # Ticks kept per symbol in _Market_Data_DB
+                 _rate_capacity=10000):     # Rates kept per instrument in _Market_Data_DB
+
+        # Strategy Status (if this is False, ZeroMQ will not listen for data)
+        self._ACTIVE = True
+
+        # Client ID
+        self._ClientID = _ClientID
+
+        # ZeroMQ Host
+        self._host = _host
+
+        # Connection Protocol
+        self._protocol = _protocol
+
+        # ZeroMQ Context
+        self._ZMQ_CONTEXT = zmq.asyncio.Context()
+
+        # TCP Connection URL Template
+        self._URL = self._protocol + "://" + self._host + ":"
+
+        # Ports for PUSH, PULL and SUB sockets respectively
+        self._PUSH_PORT = _PUSH_PORT
+        self._PULL_PORT = _PULL_PORT
+        self._SUB_PORT = _SUB_PORT
+
+        # Handlers for received data (pull and sub ports)
+        self._pulldata_handlers = _pulldata_handlers
+        self._subdata_handlers = _subdata_handlers
+
+        # Create Sockets
+        self._PUSH_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUSH)
+        self._PUSH_SOCKET.setsockopt(zmq.SNDHWM, 1)
+
+        self._PULL_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PULL)
+        self._PULL_SOCKET.setsockopt(zmq.RCVHWM, 1)
+
+        self._SUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.SUB)
+
+        # Bind PUSH Socket to send commands to MetaTrader
+        self._PUSH_SOCKET.connect(self._URL + str(self._PUSH_PORT))
+        print("[INIT] Ready to send commands to METATRADER (PUSH): " + str(self._PUSH_PORT))
+
+        # Connect PULL Socket to receive command responses from MetaTrader
+        self._PULL_SOCKET.connect(self._URL + str(self._PULL_PORT))
+        print("[INIT] Listening for responses from METATRADER (PULL): " + str(self._PULL_PORT))
+
+        # Connect SUB Socket to receive market data from MetaTrader
+        self._SUB_SOCKET.connect(self._URL + str(self._SUB_PORT))
+
+        self._string_delimiter = _delimiter
+
+        # PULL / SUB receiver tasks, started on first use inside the event loop
+        self._PULL_Task = None
+        self._SUB_Task = None
+
+        # Market Data Dictionary by Symbol (holds tick data) or Instrument (holds OHLC data)
+        # ({SYMBOL: ring buffer}, see DWX_ZMQ_Market_Data_DB for columns)
+        self._Market_Data_DB = DWX_ZMQ_Market_Data_DB(_tick_capacity, _rate_capacity)
+
+        # Default order for the convenience wrappers, which send it with
+        # their own fields only (see DWX_ZMQ_Order)
+        self._default_order = DWX_ZMQ_Order(**self._generate_default_order_dict())
+
+        # Async iterators over SUB data ({SYMBOL or None: [asyncio.Queue]})
+        self._streams = {}
+        self._stream_maxsize = _stream_maxsize
+
+        # Most recently received PULL response
+        self._thread_data_output = None
+
+        # Verbosity
+        self._verbose = _verbose
+
+        # Request/response correlation ({REQUEST_ID: asyncio.Future})
+        self._request_ids = _request_ids
+        self._request_counter = count(1)
+        self._pending_requests = {}
+        self._timeout = _timeout
+
+        # Without request IDs: one command in flight, answered by the next
+        # response for its action (see RESPONSE_ACTIONS)
+        self._command_lock = None
+        self._next_response = None
+        self._next_action = None
+
+    ##########################################################################
+
+    """
+    Set Status (to enable/disable strategy manually)
+    """
+    def _setStatus(self, _new_status=False):
+
+        self._ACTIVE = _new_status
+        print("\n**\n[KERNEL] Setting Status to {} - Deactivating Tasks.. please wait a bit.\n**".format(_new_status))
+
+        if not _new_status:
+            for _task in (self._PULL_Task, self._SUB_Task):
+                if _task is not None:
+                    _task.cancel()
+
+            self._PULL_Task = None
+            self._SUB_Task = None
+
+            # End all async iterators
+            for _queues in self._streams.values():
+                for _queue in _queues:
+                    if _queue.full():
+                        _queue.get_nowait()
+                    _queue.put_nowait(None)
+
+    ##########################################################################
+
+    """
+    Stop receiving and close all sockets
+    """
+    def _close_(self):
+
+        self._setStatus(False)
+        self._ZMQ_CONTEXT.destroy(0)
+
+    ##########################################################################
+
+    """
+    Start the PULL / SUB receiver tasks in the running event loop
+    """
+    def _start_(self):
+
+        if not self._ACTIVE:
+            return
+
+        _loop = asyncio.get_running_loop()
+
+        if self._command_lock is None:
+            self._command_lock = asyncio.Lock()
+
+        if self._PULL_Task is None:
+            self._PULL_Task = _loop.create_task(self._DWX_ZMQ_Poll_Pull_Data_())
+
+        if self._SUB_Task is None:
+            self._SUB_Task = _loop.create_task(
+                self._DWX_ZMQ_Poll_Sub_Data_(self._string_delimiter))
+
+    ##########################################################################
+
+    """
+    Function to send commands to MetaTrader (PUSH), waiting (up to the
+    response timeout) for room on the socket instead of dropping the command
+    """
+    async def remote_send(self, _socket, _data):
+
+        try:
+            await asyncio.wait_for(_socket.send_string(_data), self._timeout)
+            return True
+        except asyncio.TimeoutError:
+            print("\nResource timeout.. please try again.")
+
+        return False
+
+    ##########################################################################
+
+    """
+    Function to send a command via PUSH and wait for its response
+    """
+    async def _DWX_MTX_SEND_(self, _msg, _timeout=None):
+
+        self._start_()
+
+        _timeout = self._timeout if _timeout is None else _timeout
+        _future = asyncio.get_running_loop().create_future()
+
+        if not self._request_ids:
+
+            # TRADE;ACTION;... or ACTION;...
+            _action, _, _rest = _msg.partition(';')
+
+            if _action == 'TRADE':
+                _action = _rest.partition(';')[0]
+
+            async with self._command_lock:
+
+                self._next_response = _future
+                self._next_action = COMMAND_QUEUES.get(_action, _action)
+
+                try:
+                    if not await self.remote_send(self._PUSH_SOCKET, _msg):
+                        raise zmq.error.Again()
+
+                    return await asyncio.wait_for(_future, _timeout)
+
+                finally:
+                    self._next_response = None
+                    self._next_action = None
+
+        _request_id = next(self._request_counter)
+
+        # Register before sending so the response cannot arrive first
+        self._pending_requests[_request_id] = _future
+
+        try:
+            if not await self.remote_send(self._PUSH_SOCKET,
+                                          "@{};{}".format(_request_id, _msg)):
+                raise zmq.error.Again()
+
+            return await asyncio.wait_for(_future, _timeout)
+
+        finally:
+            self._pending_requests.pop(_request_id, None)
+
+    ##########################################################################
+
+    """
+    Resolves the Future waiting for a response, if any
+    """
+    def _resolve_request_(self, _data):
+
+        if not isinstance(_data, dict):
+            return
+
+        if self._request_ids:
+            if '_request_id' not in _data:
+                return
+            _future = self._pending_requests.pop(_data['_request_id'], None)
+        else:
+            # Only a response to the command in flight (not one to an
+            # earlier command that timed out)
+            if RESPONSE_ACTIONS.get(_data.get('_action')) != self._next_action:
+                return
+            _future, self._next_response = self._next_response, None
+
+        if _future is not None and not _future.done():
+            _future.set_result(_data)
+
+    ##########################################################################
+
+    def _get_response_(self):
+        return self._thread_data_output
+
+    ##########################################################################
+
+    def _set_response_(self, _resp=None):
+        self._thread_data_output = _resp
+
+    ##########################################################################
+
+    def _valid_response_(self, _input='zmq'):
+
+        # Valid data types
+        _types = (dict,DataFrame)
+
+        # If _input = 'zmq', assume self._zmq._thread_data_output
+        if isinstance(_input, str) and _input == 'zmq':
+            return isinstance(self._get_response_(), _types)
+        else:
+            return isinstance(_input, _types)
+
+    ##########################################################################
+
+    # Convenience functions to permit easy trading via underlying functions.
+
+    # OPEN ORDER (dict of _DWX_MTX_SEND_COMMAND_() arguments or DWX_ZMQ_Order)
+    async def _DWX_MTX_NEW_TRADE_(self, _order=None):
+
+        if _order is None:
+            _order = self._default_order
+
+        # Execute
+        if isinstance(_order, DWX_ZMQ_Order):
+            return await self._DWX_MTX_SEND_(_order._encode_())
+
+        return await self._DWX_MTX_SEND_COMMAND_(**_order)
+
+    # MODIFY ORDER
+    async def _DWX_MTX_MODIFY_TRADE_BY_TICKET_(self, _ticket, _SL, _TP): # in points
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._encode_('MODIFY', _SL=_SL,
+                                                                      _TP=_TP, _ticket=_ticket))
+
+    # CLOSE ORDER
+    async def _DWX_MTX_CLOSE_TRADE_BY_TICKET_(self, _ticket):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._ticket_command_('CLOSE', _ticket))
+
+    # CLOSE PARTIAL
+    async def _DWX_MTX_CLOSE_PARTIAL_BY_TICKET_(self, _ticket, _lots):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._encode_('CLOSE_PARTIAL', _lots=_lots,
+                                                                      _ticket=_ticket))
+
+    # CLOSE MAGIC
+    async def _DWX_MTX_CLOSE_TRADES_BY_MAGIC_(self, _magic):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._magic_command_('CLOSE_MAGIC', _magic))
+
+    # CLOSE ALL TRADES
+    async def _DWX_MTX_CLOSE_ALL_TRADES_(self):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._ticket_command_('CLOSE_ALL'))
+
+    # GET OPEN TRADES
+    async def _DWX_MTX_GET_ALL_OPEN_TRADES_(self):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(self._default_order._ticket_command_('GET_OPEN_TRADES'))
+
+    # SEND ORDER (DWX_ZMQ_Order, with the _encode_() fields given changed)
+    async def _DWX_MTX_SEND_ORDER_(self, _order, **_changes):
+
+        # Execute
+        return await self._DWX_MTX_SEND_(_order._encode_(**_changes))
+
+    # DEFAULT ORDER DICT
+    def _generate_default_order_dict(self):
+        return({'_action': 'OPEN',
+                  '_type': 0,
+                  '_symbol': 'EURUSD',
+                  '_price': 0.0,
+                  '_SL': 500, # SL/TP in POINTS, not pips.
+                  '_TP': 500,
+                  '_comment': 'DWX_Python_to_MT',
+                  '_lots': 0.01,
+                  '_magic': 123456,
+                  '_ticket': 0})
+
+    # DEFAULT DATA REQUEST DICT
+    def _generate_default_data_dict(self):
+        return({'_action': 'DATA',
+                  '_symbol': 'EURUSD',
+                  '_timeframe': 1440, # M1 = 1, M5 = 5, and so on..
+                  '_start': '2018.12.21 17:00:00', # timestamp in MT4 recognized format
+                  '_end': '2018.12.21 17:05:00'})
+
+    # DEFAULT HIST REQUEST DICT
+    def _generate_default_hist_dict(self):
+        return({'_action': 'HIST',
+                  '_symbol': 'EURUSD',
+                  '_timeframe': 1, # M1 = 1, M5 = 5, and so on..
+                  '_start': '2018.12.21 17:00:00', # timestamp in MT4 recognized format
+                  '_end': '2018.12.21 17:05:00'})
+
+    ##########################################################################
+    """
+    Function to construct messages for sending DATA commands to MetaTrader
+    """
+    async def _DWX_MTX_SEND_MARKETDATA_REQUEST_(self,
+                                 _symbol='EURUSD',
+                                 _timeframe=1,
+                                 _start='2019.01.04 17:00:00',
+                                 _end=None):
+
+        if _end is None:
+            _end = Timestamp.now().strftime('%Y.%m.%d %H:%M:00')
+
+        _msg = "{};{};{};{};{}".format('DATA',
+                                     _symbol,
+                                     _timeframe,
+                                     _start,
+                                     _end)
+        # Send via PUSH Socket
+        return await self._DWX_MTX_SEND_(_msg)
+
+    ##########################################################################
+    """
+    Function to construct messages for sending HIST commands to MetaTrader
+    """
+    async def _DWX_MTX_SEND_MARKETHIST_REQUEST_(self,
+                                 _symbol='EURUSD',
+                                 _timeframe=1,
+                                 _start='2019.01.04 17:00:00',
+                                 _end=None):
+
+        if _end is None:
+            _end = Timestamp.now().strftime('%Y.%m.%d %H:%M:00')
+
+        _msg = "{};{};{};{};{}".format('HIST',
+                                     _symbol,
+                                     _timeframe,
+                                     _start,
+                                     _end)
+        # Send via PUSH Socket
+        return await self._DWX_MTX_SEND_(_msg)
+
+    ##########################################################################
+    """
+    Function to construct messages for sending TRACK_PRICES commands to MetaTrader
+    """
+    async def _DWX_MTX_SEND_TRACKPRICES_REQUEST_(self,
+                                 _symbols=['EURUSD']):
+        _msg = 'TRACK_PRICES'
+        for s in _symbols:
+          _msg = _msg + ";{}".format(s)
+
+        # Send via PUSH Socket
+        return await self._DWX_MTX_SEND_(_msg)
+
+    ##########################################################################
+    """
+    Function to construct messages for sending TRACK_RATES commands to MetaTrader
+    """
+    async def _DWX_MTX_SEND_TRACKRATES_REQUEST_(self,
+                                 _instruments=[('EURUSD_M1','EURUSD',1)]):
+        _msg = 'TRACK_RATES'
+        for i in _instruments:
+          _msg = _msg + ";{};{}".format(i[1],i[2])
+
+        # Send via PUSH Socket
+        return await self._DWX_MTX_SEND_(_msg)
+
+    ##########################################################################
+    """
+    Function to construct messages for sending Trade commands to MetaTrader
+    """
+    async def _DWX_MTX_SEND_COMMAND_(self, _action='OPEN', _type=0,
+                                 _symbol='EURUSD', _price=0.0,
+                                 _SL=50, _TP=50, _comment="Python-to-MT",
+                                 _lots=0.01, _magic=123456, _ticket=0):
+
+        _msg = "{};{};{};{};{};{};{};{};{};{};{}".format('TRADE',_action,_type,
+                                                         _symbol,_price,
+                                                         _SL,_TP,_comment,
+                                                         _lots,_magic,
+                                                         _ticket)
+
+        # Send via PUSH Socket
+        return await self._DWX_MTX_SEND_(_msg)
+
+    ##########################################################################
+
+    """
+    Handler adapter: calls onPullData / onSubData on each registered handler,
+    awaiting the result when the handler is a coroutine
+    """
+    async def _invoke_handlers_(self, _handlers, _method, _data):
+
+        for hnd in _handlers:
+
+            try:
+                _result = getattr(hnd, _method)(_data)
+
+                if isawaitable(_result):
+                    await _result
+
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                print(_exstr.format(type(ex).__name__, ex.args))
+
+    ##########################################################################
+
+    """
+    Task receiving responses to commands (PULL)
+    """
+    async def _DWX_ZMQ_Poll_Pull_Data_(self):
+
+        while self._ACTIVE:
+
+            msg = await self._PULL_SOCKET.recv_string()
+
+            # If data is returned, resolve the waiting command
+            if msg == '':
+                continue
+
+            try:
+                _data = DWX_ZMQ_Parser.parse(msg)
+
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                print(_exstr.format(type(ex).__name__, ex.args))
+                continue
+
+            self._thread_data_output = _data
+            self._resolve_request_(_data)
+
+            if self._verbose:
+                print(_data) # default logic
+
+            # invokes data handlers on pull port
+            await self._invoke_handlers_(self._pulldata_handlers, 'onPullData', _data)
+
+    ##########################################################################
+
+    """
+    Task receiving market data (SUB)
+    """
+    async def _DWX_ZMQ_Poll_Sub_Data_(self, string_delimiter=';'):
+
+        while self._ACTIVE:
+
+            msg = await self._SUB_SOCKET.recv_string()
+
+            if msg == '':
+                continue
+
+            try:
+                _timestamp = time_ns()
+                _symbol, _data = msg.split(" ")
+                _fields = _data.split(string_delimiter)
+
+                if len(_fields) == 2:
+                    _bid, _ask = _fields
+                    if self._verbose:
+                        print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _bid + "/" + _ask + ") BID/ASK")
+                    _values = (float(_bid), float(_ask))
+                    self._Market_Data_DB._append_tick_(_symbol, _timestamp, *_values)
+
+                elif len(_fields) == 8:
+                    _time, _open, _high, _low, _close, _tick_vol, _spread, _real_vol = _fields
+                    if self._verbose:
+                        print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _data.replace(string_delimiter, "/") + ") TIME/OPEN/HIGH/LOW/CLOSE/TICKVOL/SPREAD/VOLUME")
+                    _values = (int(_time), float(_open), float(_high), float(_low), float(_close), int(_tick_vol), int(_spread), int(_real_vol))
+                    self._Market_Data_DB._append_rate_(_symbol, _timestamp, *_values)
+
+                else:
+                    _values = None
+
+            except ValueError:
+                continue # Malformed message, passing iteration.
+
+            if _values is not None:
+
+                # Feed async iterators for this symbol and for all symbols
+                for _key in (_symbol, None):
+                    for _queue in self._streams.get(_key, ()):
+                        if _queue.full():
+                            _queue.get_nowait()
+                        _queue.put_nowait((_symbol, _timestamp, _values))
+
+            # invokes data handlers on sub port
+            await self._invoke_handlers_(self._subdata_handlers, 'onSubData', msg)
+
+    ##########################################################################
+
+    """
+    Async iterator over SUB data for _symbol (all subscribed symbols if None).
+
+    TIMESTAMP is the receive time in ns since epoch (UTC), as in
+    _Market_Data_DB. Yields (TIMESTAMP, (BID, ASK)) for prices and (TIMESTAMP, (TIME, OPEN,
+    HIGH, LOW, CLOSE, TICKVOL, SPREAD, VOLUME)) for rates; with _symbol=None,
+    (SYMBOL, TIMESTAMP, VALUES). Subscribe with _DWX_MTX_SUBSCRIBE_MARKETDATA_
+    first. If the consumer falls more than _maxsize messages behind, the
+    oldest are dropped.
+    """
+    async def _DWX_MTX_MARKETDATA_STREAM_(self, _symbol=None, _maxsize=None):
+
+        self._start_()
+
+        _queue = asyncio.Queue(self._stream_maxsize if _maxsize is None else _maxsize)
+        self._streams.setdefault(_symbol, []).append(_queue)
+
+        try:
+            while self._ACTIVE:
+
+                _item = await _queue.get()
+
+                if _item is None:
+                    break
+
+                yield _item if _symbol is None else _item[1:]
+
+        finally:
+            self._streams[_symbol].remove(_queue)
+            if not self._streams[_symbol]:
+                del self._streams[_symbol]
+
+    ##########################################################################
+
+    """
+    Function to subscribe to given Symbol's BID/ASK feed from MetaTrader
+    """
+    async def _DWX_MTX_SUBSCRIBE_MARKETDATA_(self, _symbol, _string_delimiter=';'):
+
+        # Subscribe to SYMBOL first.
+        self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+
+        self._string_delimiter = _string_delimiter
+        self._start_()
+
+        print("[KERNEL] Subscribed to {} MARKET updates. See self._Market_Data_DB.".format(_symbol))
+
+    """
+    Function to unsubscribe to given Symbol's BID/ASK feed from MetaTrader
+    """
+    async def _DWX_MTX_UNSUBSCRIBE_MARKETDATA_(self, _symbol):
+
+        self._SUB_SOCKET.setsockopt_string(zmq.UNSUBSCRIBE, _symbol)
+        print("\n**\n[KERNEL] Unsubscribing from " + _symbol + "\n**\n")
+
+
+    """
+    Function to unsubscribe from ALL MetaTrader Symbols
+    """
+    async def _DWX_MTX_UNSUBSCRIBE_ALL_MARKETDATA_REQUESTS_(self):
+
+        self._setStatus(False)
+
+    ##########################################################################
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Binary_Format.py
+    --
+    Fixed-layout binary records for SUB market data (ticks and rates), an
+    alternative to the text payloads, decoded in batches with NumPy.
+
+    Usage:
+        _ticks = DWX_ZMQ_Binary_Format.decode_ticks(b''.join(_records))
+        _ticks['bid']   # float64 view
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import struct
+import numpy as np
+
+##############################################################################
+
+# Never the first byte of a text payload, so both formats can share a
+# socket. Sent after the topic, as "TOPIC " + RECORD in one frame or as
+# [TOPIC, RECORD] frames.
+BINARY_MAGIC = 0xD7
+BINARY_VERSION = 1
+
+KIND_TICK = 1
+KIND_RATE = 2
+
+# Little-endian, 8 byte header. symbol_id is assigned by the publisher,
+# one per topic, and only groups records: the name comes from the topic.
+_HEADER = [('magic', 'u1'),
+           ('version', 'u1'),
+           ('kind', 'u1'),
+           ('reserved', 'u1'),
+           ('symbol_id', '<u4')]
+
+# Version 1: time in ms since epoch (ticks), bar open in s since epoch (rates)
+TICK_DTYPE = np.dtype(_HEADER + [('time', '<i8'),
+                                 ('bid', '<f8'),
+                                 ('ask', '<f8')])
+
+RATE_DTYPE = np.dtype(_HEADER + [('time', '<i8'),
+                                 ('open', '<f8'),
+                                 ('high', '<f8'),
+                                 ('low', '<f8'),
+                                 ('close', '<f8'),
+                                 ('tick_volume', '<i8'),
+                                 ('spread', '<i8'),
+                                 ('real_volume', '<i8')])
+
+_TICK_STRUCT = struct.Struct('<BBBBIqdd')
+_RATE_STRUCT = struct.Struct('<BBBBIqddddqqq')
+
+##############################################################################
+
+class DWX_ZMQ_Binary_Format():
+
+    """
+    Encoder (one record at a time, for publishers) and vectorized decoder
+    (a batch of records at a time, for the connector)
+    """
+
+    @staticmethod
+    def encode_tick(_symbol_id, _time, _bid, _ask):
+
+        return _TICK_STRUCT.pack(BINARY_MAGIC, BINARY_VERSION, KIND_TICK, 0,
+                                 _symbol_id, _time, _bid, _ask)
+
+    @staticmethod
+    def encode_rate(_symbol_id, _time, _open, _high, _low, _close,
+                    _tick_volume, _spread, _real_volume):
+
+        return _RATE_STRUCT.pack(BINARY_MAGIC, BINARY_VERSION, KIND_RATE, 0,
+                                 _symbol_id, _time, _open, _high, _low, _close,
+                                 _tick_volume, _spread, _real_volume)
+
+    ##########################################################################
+
+    @staticmethod
+    def is_binary(_payload):
+
+        # Works on bytes, bytearray and memoryview alike
+        return len(_payload) > 0 and _payload[0] == BINARY_MAGIC
+
+    @staticmethod
+    def kind(_payload):
+        return _payload[2]
+
+    ##########################################################################
+
+    @staticmethod
+    def decode_ticks(_buffer):
+        return DWX_ZMQ_Binary_Format._decode_(_buffer, TICK_DTYPE, KIND_TICK)
+
+    @staticmethod
+    def decode_rates(_buffer):
+        return DWX_ZMQ_Binary_Format._decode_(_buffer, RATE_DTYPE, KIND_RATE)
+
+    @staticmethod
+    def _decode_(_buffer, _dtype, _kind):
+
+        # Zero-copy structured view over back-to-back records of one kind
+        if len(_buffer) % _dtype.itemsize:
+            raise ValueError('Buffer of {} bytes is not a whole number of {} byte records'.format(
+                len(_buffer), _dtype.itemsize))
+
+        _records = np.frombuffer(_buffer, dtype=_dtype)
+
+        if len(_records) and not (np.all(_records['magic'] == BINARY_MAGIC)
+                                  and np.all(_records['kind'] == _kind)):
+            raise ValueError('Not a batch of kind {} records'.format(_kind))
+
+        if len(_records) and np.any(_records['version'] != BINARY_VERSION):
+            raise ValueError('Unsupported record version(s) {}, expected {}'.format(
+                sorted(set(_records['version'].tolist()) - {BINARY_VERSION}),
+                BINARY_VERSION))
+
+        return _records
+
+##############################################################################
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Dispatcher.py
+    --
+    Runs onPullData / onSubData handlers on a pool of worker threads, in
+    order per key (symbol), so the poll thread never waits on strategy code.
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector(_handler_workers=4, _handler_overflow='drop_oldest')
+        _zmq.stats()['handler_dropped']
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from threading import Thread, Lock, Condition, current_thread
+from time import perf_counter_ns
+
+# What happens to a SUB event when its worker's queue is full: the oldest
+# queued SUB event is discarded, the incoming one is, or the poll thread
+# waits for room. PULL responses (_lossless) are never dropped, evicted or
+# held back.
+_OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# Queue entry telling a worker to run the pending event for a key
+_CONFLATED = object()
+
+# Queue entry telling a worker to exit
+_STOP = object()
+
+##############################################################################
+
+class DWX_ZMQ_Event_Queue():
+
+    """
+    A worker's events in order, bounded for lossy (SUB) events only
+    """
+    def __init__(self, _maxsize):
+
+        self._maxsize = _maxsize
+
+        # (FUNCTION, ARGS, LOSSLESS), and how many are lossy
+        self._events = deque()
+        self._lossy = 0
+
+        # Events queued or running, see _join_()
+        self._unfinished = 0
+
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        self._not_full = Condition(self._lock)
+        self._all_done = Condition(self._lock)
+
+    def __len__(self):
+        return len(self._events)
+
+    ##########################################################################
+
+    def _put_(self, _event, _lossless=False, _overflow='block'):
+
+        # Returns how many events were dropped: the oldest lossy one
+        # ('drop_oldest') or _event itself ('drop_newest')
+        _dropped = 0
+
+        with self._lock:
+
+            if not _lossless:
+
+                if self._maxsize > 0 and self._lossy >= self._maxsize:
+
+                    if _overflow == 'drop_newest':
+                        return 1
+
+                    if _overflow == 'drop_oldest':
+                        self._evict_()
+                        _dropped = 1
+
+                    while self._lossy >= self._maxsize:
+                        self._not_full.wait()
+
+                self._lossy += 1
+
+            self._events.append((_event[0], _event[1], _lossless))
+            self._unfinished += 1
+            self._not_empty.notify()
+
+        return _dropped
+
+    def _evict_(self):
+
+        # Called with the lock held: the oldest lossy event goes, lossless
+        # ones keep their place
+        for _index, _queued in enumerate(self._events):
+            if not _queued[2]:
+                del self._events[_index]
+                self._lossy -= 1
+                self._unfinished -= 1
+                return
+
+    ##########################################################################
+
+    def _get_(self):
+
+        with self._lock:
+
+            while not self._events:
+                self._not_empty.wait()
+
+            _function, _args, _lossless = self._events.popleft()
+
+            if not _lossless:
+                self._lossy -= 1
+                self._not_full.notify()
+
+        return _function, _args
+
+    def _task_done_(self):
+
+        with self._lock:
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._all_done.notify_all()
+
+    def _join_(self):
+
+        with self._lock:
+            while self._unfinished:
+                self._all_done.wait()
+
+##############################################################################
+
+class DWX_ZMQ_Dispatcher():
+
+    """
+    Setup worker pool
+    """
+    def __init__(self,
+                 _workers=4,                # Worker threads
+                 _maxsize=10000,            # Lossy (SUB) events queued per worker
+                 _overflow='drop_oldest',   # See _OVERFLOW_POLICIES
+                 _conflate=False):          # Keep only the latest pending event per key
+
+        if _overflow not in _OVERFLOW_POLICIES:
+            raise ValueError('Unknown overflow policy {!r}, expected one of {}'.format(
+                _overflow, _OVERFLOW_POLICIES))
+
+        self._ACTIVE = True
+        self._overflow = _overflow
+        self._conflate = _conflate
+
+        self._queues = [DWX_ZMQ_Event_Queue(_maxsize) for _ in range(_workers)]
+
+        # Pending conflated events ({KEY: (FUNCTION, ARGS)})
+        self._pending = {}
+
+        # Counters ({'dispatched', 'dropped', 'conflated', 'errors', 'max_depth'})
+        self._stats = {'dispatched': 0, 'dropped': 0, 'conflated': 0, 'errors': 0, 'max_depth': 0}
+        self._stats_lock = Lock()
+
+        # Time spent in handlers (ns), one slot per worker (no lock needed)
+        self._handler_ns = [0] * _workers
+
+        self._Worker_Threads = []
+
+        for _worker, _queue in enumerate(self._queues):
+            _thread = Thread(target=self._DWX_ZMQ_Worker_, args=(_queue, _worker))
+            _thread.daemon = True
+            _thread.start()
+            self._Worker_Threads.append(_thread)
+
+    ##########################################################################
+
+    """
+    Queue _function(*_args) behind earlier events with the same key
+    """
+    def _dispatch_(self, _key, _function, *_args, _lossless=False):
+
+        # Same key, same worker: in order. Different keys run in parallel.
+        _queue = self._queues[hash(_key) % len(self._queues)]
+        _event = (_function, _args)
+
+        # Conflated: a newer event for a key whose previous one has not
+        # started replaces it, so handlers see the latest value
+        if self._conflate and not _lossless:
+
+            with self._stats_lock:
+
+                _replaced = _key in self._pending
+                self._pending[_key] = _event
+
+                if _replaced:
+                    self._stats['dispatched'] += 1
+                    self._stats['conflated'] += 1
+                    return
+
+            # One queue entry per pending key, never evicted: the pending
+            # event would be stranded
+            _queue._put_((_CONFLATED, _key), True)
+
+        else:
+            _dropped = _queue._put_(_event, _lossless, self._overflow)
+
+            if _dropped:
+
+                with self._stats_lock:
+                    self._stats['dropped'] += _dropped
+
+                # 'drop_newest': the event is discarded
+                if self._overflow == 'drop_newest':
+                    return
+
+        _depth = len(_queue)
+
+        with self._stats_lock:
+            self._stats['dispatched'] += 1
+            if _depth > self._stats['max_depth']:
+                self._stats['max_depth'] = _depth
+
+    ##########################################################################
+
+    def _DWX_ZMQ_Worker_(self, _queue, _worker=0):
+
+        while True:
+
+            _function, _args = _queue._get_()
+
+            # Shutdown sentinel
+            if _function is _STOP:
+                _queue._task_done_()
+                break
+
+            # Latest event for a conflated key
+            if _function is _CONFLATED:
+                with self._stats_lock:
+                    _function, _args = self._pending.pop(_args)
+
+            _start = perf_counter_ns()
+
+            try:
+                _function(*_args)
+
+            except Exception as ex:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                print(_exstr.format(type(ex).__name__, ex.args))
+
+            finally:
+                self._handler_ns[_worker] += perf_counter_ns() - _start
+                _queue._task_done_()
+
+    ##########################################################################
+
+    """
+    Current number of queued events per worker
+    """
+    def _queue_depths_(self):
+        return [len(_queue) for _queue in self._queues]
+
+    ##########################################################################
+
+    def _get_stats_(self):
+
+        with self._stats_lock:
+            _stats = dict(self._stats)
+
+        _stats['queue_depths'] = self._queue_depths_()
+        _stats['handler_ns'] = sum(self._handler_ns)
+
+        return _stats
+
+    ##########################################################################
+
+    """
+    Wait until every queued event has been handled
+    """
+    def _join_(self):
+
+        for _queue in self._queues:
+            _queue._join_()
+
+    ##########################################################################
+
+    """
+    Let workers finish what is queued, then stop them
+    """
+    def _stop_(self):
+
+        if not self._ACTIVE:
+            return
+
+        self._ACTIVE = False
+
+        # Behind what is queued, never evicted
+        for _queue in self._queues:
+            _queue._put_((_STOP, ()), True)
+
+        # (not waiting for itself if stopped from a handler)
+        for _thread in self._Worker_Threads:
+            if _thread is not current_thread():
+                _thread.join()
+
+    ##########################################################################
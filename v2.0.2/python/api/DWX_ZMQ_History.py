@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_History.py
+    --
+    Column-oriented HIST / DATA results: responses decoded straight into
+    NumPy columns, and a buffer filled by chunked HIST responses.
+
+    Usage:
+        _zmq._DWX_MTX_SEND_MARKETHIST_REQUEST_('EURUSD', 1, _start, _end,
+                                               _format='dataframe')
+
+        _hist = _zmq._DWX_MTX_SEND_MARKETHIST_REQUEST_('EURUSD', 1, _start, _end,
+                                                       _chunk_size=5000)
+        _hist['close']          # bars received so far (read-only view)
+        _hist.result(10)        # wait for the final chunk
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import re
+import numpy as np
+from threading import Event
+from pandas import DataFrame, to_datetime
+
+##############################################################################
+
+# HIST columns (time: bar open in s since epoch); DATA has time and close
+_HIST_FIELDS = (('time', np.int64),
+                ('open', np.float64),
+                ('high', np.float64),
+                ('low', np.float64),
+                ('close', np.float64),
+                ('tick_volume', np.int64),
+                ('spread', np.int64),
+                ('real_volume', np.int64))
+
+# Bar times in HIST / DATA responses ('%Y.%m.%d %H:%M', e.g. '2019.01.04 17:00')
+_HIST_TIME_LENGTH = 16
+
+# HIST bars are written in _HIST_FIELDS order by both servers:
+#   {'time':'2019.01.04 17:00', 'open':1.1, ..., 'real_volume':0}
+_HIST_TIME = re.compile(r"'time':\s*'([^']*)'")
+_HIST_KEYS = re.compile(r"'([a-z_]+)':")
+
+# DATA items: {'2019.01.04 17:00': 1.1, ...}
+_DATA_TIME = re.compile(r"'(\d{4}\.\d\d\.\d\d \d\d:\d\d)':")
+
+_REQUEST_ID = re.compile(r"'_request_id':\s*(\d+)")
+
+# Once times and keys are removed, everything but numbers (with exponents,
+# e.g. 1e-05) becomes a separator
+_NUMBERS_ONLY = str.maketrans({_c: ' ' for _c in "{}[],:'_abcdfghijklmnopqrstuvwxyz"})
+
+##############################################################################
+
+class DWX_ZMQ_Hist_Decoder():
+
+    """
+    Column-oriented decoder for HIST / DATA responses
+    """
+
+    @staticmethod
+    def parse_times(_times):
+
+        # '%Y.%m.%d %H:%M' -> ISO 8601 ('YYYY-MM-DDTHH:MM') by patching the
+        # separator bytes of all times at once, then one datetime64 cast
+        _bytes = np.array(_times, dtype='S{}'.format(_HIST_TIME_LENGTH))
+        _chars = _bytes.view(np.uint8).reshape(-1, _HIST_TIME_LENGTH)
+        _chars[:, [4, 7]] = ord('-')
+        _chars[:, 10] = ord('T')
+
+        return _bytes.astype('datetime64[m]').astype(np.int64) * 60
+
+    ##########################################################################
+
+    @staticmethod
+    def peek(_msg):
+
+        # ('HIST' / 'DATA' / None, REQUEST ID or None), from the first bytes
+        _head = _msg[:64]
+        _request_id = _REQUEST_ID.search(_head)
+
+        if _request_id is not None:
+            _request_id = int(_request_id.group(1))
+
+        if "'_action': 'HIST'" in _head:
+            return 'HIST', _request_id
+
+        if "'_action': 'DATA'" in _head:
+            return 'DATA', _request_id
+
+        return None, _request_id
+
+    ##########################################################################
+
+    @staticmethod
+    def decode(_msg):
+
+        # Response dict with '_data' as {COLUMN: array}, or None if _msg is
+        # not a HIST / DATA response with data (use DWX_ZMQ_Parser then).
+        # No dict per bar is built.
+        _action, _request_id = DWX_ZMQ_Hist_Decoder.peek(_msg)
+
+        if _action == 'HIST':
+            _decode = DWX_ZMQ_Hist_Decoder._decode_hist_
+        elif _action == 'DATA':
+            _decode = DWX_ZMQ_Hist_Decoder._decode_data_
+        else:
+            return None
+
+        _response = {'_action': _action}
+        _start = _msg.find("'_data'")
+
+        if _start < 0:
+            return None
+
+        try:
+            _data = _decode(_msg, _start)
+        except ValueError:
+            return None
+
+        if _data is None:
+            return None
+
+        if _request_id is not None:
+            _response['_request_id'] = _request_id
+
+        _response['_data'] = _data
+
+        return _response
+
+    ##########################################################################
+
+    @staticmethod
+    def _decode_hist_(_msg, _start):
+
+        _body = _msg[_msg.index('[', _start) + 1:_msg.rindex(']')]
+        _times = _HIST_TIME.findall(_body)
+
+        # Any other key order or format is left to the full parser
+        if _times and _HIST_KEYS.findall(_body[:_body.find('}') + 1]) != [_name for _name, _ in _HIST_FIELDS]:
+            return None
+
+        _numbers = _HIST_KEYS.sub('', _HIST_TIME.sub('', _body)).translate(_NUMBERS_ONLY)
+        _numbers = np.fromstring(_numbers, sep=' ')
+
+        if _numbers.size != len(_times) * (len(_HIST_FIELDS) - 1):
+            return None
+
+        _numbers = _numbers.reshape(len(_times), len(_HIST_FIELDS) - 1)
+        _columns = {'time': DWX_ZMQ_Hist_Decoder.parse_times(_times)}
+
+        for _i, (_name, _dtype) in enumerate(_HIST_FIELDS[1:]):
+            _columns[_name] = _numbers[:, _i].astype(_dtype)
+
+        return _columns
+
+    @staticmethod
+    def _decode_data_(_msg, _start):
+
+        _close = _msg.rindex('}')
+        _body = _msg[_msg.index('{', _start) + 1:_msg.rindex('}', 0, _close)]
+        _times = _DATA_TIME.findall(_body)
+
+        _numbers = np.fromstring(_DATA_TIME.sub('', _body).translate(_NUMBERS_ONLY), sep=' ')
+
+        if _numbers.size != len(_times):
+            return None
+
+        return {'time': DWX_ZMQ_Hist_Decoder.parse_times(_times),
+                'close': _numbers}
+
+    ##########################################################################
+
+    @staticmethod
+    def from_bars(_bars):
+
+        # HIST columns from parsed bars ([{'time': ..., 'open': ..., ...}])
+        _columns = {'time': DWX_ZMQ_Hist_Decoder.parse_times([_bar['time'] for _bar in _bars])}
+
+        for _name, _dtype in _HIST_FIELDS[1:]:
+            _columns[_name] = np.array([_bar[_name] for _bar in _bars], dtype=_dtype)
+
+        return _columns
+
+    @staticmethod
+    def from_closes(_closes):
+
+        # DATA columns from parsed closes ({'2019.01.04 17:00': 1.1, ...})
+        return {'time': DWX_ZMQ_Hist_Decoder.parse_times(list(_closes)),
+                'close': np.array(list(_closes.values()), dtype=np.float64)}
+
+    ##########################################################################
+
+    @staticmethod
+    def to_dataframe(_columns):
+
+        # DataFrame indexed by bar time, from decode()'s '_data'
+        _data = dict(_columns)
+        _index = to_datetime(_data.pop('time'), unit='s')
+
+        return DataFrame(_data, index=_index)
+
+##############################################################################
+
+class DWX_ZMQ_Hist_Buffer():
+
+    """
+    Bars of one chunked HIST request, filled by the connector's poll thread
+    """
+    def __init__(self, _symbol, _timeframe):
+
+        self._symbol = _symbol
+        self._timeframe = _timeframe
+
+        # {FIELD: array}, allocated by the first chunk for the '_total' bars
+        # it announces; every chunk is written into them as it arrives
+        self._columns = None
+
+        # Bars written, and sequence number of the next chunk
+        self._filled = 0
+        self._next_seq = 0
+
+        self._error = None
+        self._done = Event()
+
+    ##########################################################################
+
+    def _add_chunk_(self, _chunk):
+
+        if self._done.is_set():
+            return
+
+        if _chunk['_seq'] != self._next_seq:
+            self._set_error_(ValueError('HIST_CHUNK {} received, expected {}'.format(
+                _chunk['_seq'], self._next_seq)))
+            return
+
+        _bars = _chunk['_data']
+        _n = len(_bars)
+
+        if self._columns is None:
+            _total = max(_chunk.get('_total', _n), _n)
+            self._columns = {_name: np.zeros(_total, dtype=_dtype)
+                             for _name, _dtype in _HIST_FIELDS}
+
+        # More bars than announced: grow (copies what is there)
+        elif self._filled + _n > len(self._columns['time']):
+            _size = max(self._filled + _n, 2 * len(self._columns['time']))
+            for _name in self._columns:
+                self._columns[_name] = np.resize(self._columns[_name], _size)
+
+        if _n:
+            _rows = slice(self._filled, self._filled + _n)
+
+            for _name, _values in DWX_ZMQ_Hist_Decoder.from_bars(_bars).items():
+                self._columns[_name][_rows] = _values
+
+            self._filled += _n
+
+        self._next_seq += 1
+
+        if _chunk['_final']:
+            self._done.set()
+
+    ##########################################################################
+
+    def _set_error_(self, _error):
+
+        self._error = _error
+        self._done.set()
+
+    ##########################################################################
+
+    def __len__(self):
+        return self._filled
+
+    def __getitem__(self, _field):
+
+        # Zero-copy, read-only view of the bars received so far
+        if self._columns is None:
+            return np.zeros(0, dtype=dict(_HIST_FIELDS)[_field])
+
+        _view = self._columns[_field][:self._filled]
+        _view.flags.writeable = False
+
+        return _view
+
+    def columns(self):
+
+        # {COLUMN: read-only view} of the bars received so far
+        return {_name: self[_name] for _name, _ in _HIST_FIELDS}
+
+    ##########################################################################
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, _timeout=None):
+
+        # True once the final chunk (or an error) arrived
+        return self._done.wait(_timeout)
+
+    def result(self, _timeout=None):
+
+        if not self._done.wait(_timeout):
+            raise TimeoutError('HIST {} {}: {} bars after {} s, final chunk pending'.format(
+                self._symbol, self._timeframe, self._filled, _timeout))
+
+        if self._error is not None:
+            raise self._error
+
+        return self
+
+    ##########################################################################
+
+    def to_dataframe(self):
+
+        return DWX_ZMQ_Hist_Decoder.to_dataframe({_name: _view.copy()
+                                                  for _name, _view in self.columns().items()})
+
+    ##########################################################################
+
+    def __repr__(self):
+        return '{}(symbol={!r}, timeframe={}, bars={}, done={})'.format(
+            type(self).__name__, self._symbol, self._timeframe, self._filled, self.done)
+
+##############################################################################
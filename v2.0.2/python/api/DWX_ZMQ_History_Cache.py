@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_History_Cache.py
+    --
+    On-disk cache of HIST bars per (symbol, timeframe), so the same history
+    is only requested from MetaTrader once.
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector(_history_cache='hist_cache', _request_ids=True)
+        _zmq._DWX_MTX_GET_HIST_CACHED_('EURUSD', 1, '2019.01.04 00:00:00', '2019.01.05 00:00:00')
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import json
+import numpy as np
+from time import time
+from threading import Lock
+from pandas import DataFrame, read_parquet
+from api.DWX_ZMQ_History import _HIST_FIELDS
+
+# <path>/EURUSD_1/meta.json ({"generation": N, "ranges": [[START, END],
+# ...]} fetched) and time.N.npy, open.N.npy, ... (or bars.N.parquet); each
+# write is a new generation, so readers of the previous one never block it
+_STORAGES = ('npy', 'parquet')
+
+# Margin for bar times in broker time (ahead of or behind UTC) and for
+# calendar periods longer than their nominal minutes (MN1)
+_SETTLE_MARGIN = 2 * 86400
+
+##############################################################################
+
+class DWX_ZMQ_History_Cache():
+
+    """
+    Setup cache directory
+    """
+    def __init__(self, _path, _storage='npy'):
+
+        if _storage not in _STORAGES:
+            raise ValueError('Unknown storage {!r}, expected one of {}'.format(_storage, _STORAGES))
+
+        if _storage == 'parquet':
+            try:
+                import pyarrow
+            except ImportError:
+                import fastparquet # raises if neither engine is installed
+
+        self._path = _path
+        self._storage = _storage
+        self._lock = Lock()
+
+        os.makedirs(_path, exist_ok=True)
+
+    ##########################################################################
+
+    """
+    Bars of (symbol, timeframe) in [_start, _end] (s since epoch), as
+    {COLUMN: array}. _fetch(start, end) must return the same columns for
+    a range missing from the cache, or None if it could not get them (the
+    range is then tried again next time).
+    """
+    def _get_(self, _symbol, _timeframe, _start, _end, _fetch):
+
+        with self._lock:
+
+            _entry = self._entry_path_(_symbol, _timeframe)
+            _meta, _columns = self._load_(_entry)
+
+            _missing = self._missing_ranges_(_meta['ranges'], _start, _end)
+
+            if _missing:
+
+                _settled = self._settled_(_timeframe)
+                _fetched = 0
+
+                for _from, _to in _missing:
+                    _new = _fetch(_from, _to)
+                    if _new is None:
+                        continue
+                    _fetched += 1
+                    _columns = self._merge_(_columns, _new)
+
+                    # Up to the last bar returned (it may be forming) or
+                    # to the settled times, whichever is later
+                    _last = _new['time'][-1] if len(_new['time']) else _from
+                    _until = min(_to, max(int(_last), _settled) - 1)
+
+                    if _until >= _from:
+                        _meta['ranges'] = self._add_range_(_meta['ranges'], _from, _until)
+
+                if _fetched:
+                    _columns = self._save_(_entry, _meta, _columns)
+
+            _times = _columns['time']
+            _rows = slice(np.searchsorted(_times, _start, side='left'),
+                          np.searchsorted(_times, _end, side='right'))
+
+            return {_name: _columns[_name][_rows] for _name, _ in _HIST_FIELDS}
+
+    ##########################################################################
+
+    """
+    Time ranges already fetched for (symbol, timeframe), [[START, END]]
+    """
+    def _ranges_(self, _symbol, _timeframe):
+
+        with self._lock:
+            return self._load_(self._entry_path_(_symbol, _timeframe))[0]['ranges']
+
+    ##########################################################################
+
+    def _entry_path_(self, _symbol, _timeframe):
+        return os.path.join(self._path, '{}_{}'.format(_symbol, _timeframe))
+
+    ##########################################################################
+
+    def _load_(self, _entry):
+
+        try:
+            with open(os.path.join(_entry, 'meta.json')) as _file:
+                _meta = json.load(_file)
+
+        except FileNotFoundError:
+            return ({'generation': 0, 'ranges': []},
+                    {_name: np.zeros(0, dtype=_dtype) for _name, _dtype in _HIST_FIELDS})
+
+        if self._storage == 'parquet':
+            _df = read_parquet(os.path.join(_entry, 'bars.{}.parquet'.format(_meta['generation'])))
+            _columns = {_name: _df[_name].to_numpy(dtype=_dtype) for _name, _dtype in _HIST_FIELDS}
+        else:
+            _columns = {_name: np.load(os.path.join(_entry, '{}.{}.npy'.format(_name, _meta['generation'])),
+                                       mmap_mode='r')
+                        for _name, _ in _HIST_FIELDS}
+
+        return _meta, _columns
+
+    ##########################################################################
+
+    def _save_(self, _entry, _meta, _columns):
+
+        os.makedirs(_entry, exist_ok=True)
+
+        _previous = _meta['generation']
+        _meta['generation'] = _previous + 1
+
+        if self._storage == 'parquet':
+            DataFrame(_columns).to_parquet(os.path.join(_entry, 'bars.{}.parquet'.format(_meta['generation'])))
+        else:
+            for _name, _ in _HIST_FIELDS:
+                np.save(os.path.join(_entry, '{}.{}.npy'.format(_name, _meta['generation'])), _columns[_name])
+
+        # meta.json is switched last, so a crash leaves the previous generation
+        _tmp = os.path.join(_entry, 'meta.json.tmp')
+        with open(_tmp, 'w') as _file:
+            json.dump(_meta, _file)
+        os.replace(_tmp, os.path.join(_entry, 'meta.json'))
+
+        # Best effort: files still mapped elsewhere are left for next time
+        for _file in os.listdir(_entry):
+            _parts = _file.split('.')
+            if len(_parts) == 3 and _parts[1].isdigit() and int(_parts[1]) < _meta['generation']:
+                try:
+                    os.remove(os.path.join(_entry, _file))
+                except OSError:
+                    pass
+
+        return self._load_(_entry)[1]
+
+    ##########################################################################
+
+    @staticmethod
+    def _merge_(_columns, _new):
+
+        # Sorted union by time, fetched bars replacing cached ones
+        _times = np.concatenate((_new['time'], _columns['time']))
+        _order = np.argsort(_times, kind='stable')
+        _keep = np.ones(len(_order), dtype=bool)
+        _keep[1:] = _times[_order][1:] != _times[_order][:-1]
+        _order = _order[_keep]
+
+        return {_name: np.concatenate((np.asarray(_new[_name], dtype=_dtype),
+                                       _columns[_name]))[_order]
+                for _name, _dtype in _HIST_FIELDS}
+
+    ##########################################################################
+
+    @staticmethod
+    def _settled_(_timeframe):
+
+        # Bars starting before this time (s since epoch) are closed, and no
+        # new bar can start before it, whatever the broker's time zone
+        return int(time()) - _timeframe * 60 - _SETTLE_MARGIN
+
+    @staticmethod
+    def _missing_ranges_(_ranges, _start, _end):
+
+        # Parts of [_start, _end] not covered by the sorted, disjoint _ranges
+        _missing = []
+
+        for _from, _to in _ranges:
+            if _to < _start:
+                continue
+            if _from > _end:
+                break
+            if _from > _start:
+                _missing.append((_start, _from - 1))
+            _start = max(_start, _to + 1)
+
+        if _start <= _end:
+            _missing.append((_start, _end))
+
+        return _missing
+
+    @staticmethod
+    def _add_range_(_ranges, _start, _end):
+
+        # Inserts [_start, _end], merging overlapping or adjacent ranges
+        _merged = []
+
+        for _from, _to in sorted(_ranges + [[_start, _end]]):
+            if _merged and _from <= _merged[-1][1] + 1:
+                _merged[-1][1] = max(_merged[-1][1], _to)
+            else:
+                _merged.append([_from, _to])
+
+        return _merged
+
+##############################################################################
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Latency.py
+    --
+    Round-trip latency of commands, per action: from the sender thread
+    writing a command to the poll thread reading its response, in
+    log-bucketed histograms (3% relative error by default).
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector()         # _latency_stats=True
+        _zmq.latency_snapshot()
+        {'OPEN': {'count': 120, 'min_us': 180.2, 'mean_us': 231.5,
+                  'p50_us': 221.2, ..., 'max_us': 402.7}, ...}
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from threading import Lock
+
+##############################################################################
+
+# Response action -> queue of the commands it answers (matching in order)
+RESPONSE_ACTIONS = {'EXECUTION': 'OPEN',
+                    'CLOSE': 'CLOSE',               # also CLOSE_PARTIAL
+                    'MODIFY': 'MODIFY',
+                    'CLOSE_ALL_MAGIC': 'CLOSE_MAGIC',
+                    'CLOSE_ALL': 'CLOSE_ALL',
+                    'OPEN_TRADES': 'GET_OPEN_TRADES',
+                    'HIST': 'HIST',
+                    'HIST_CHUNK': 'HIST',           # final chunk
+                    'DATA': 'DATA',
+                    'TRACK_PRICES': 'TRACK_PRICES',
+                    'TRACK_RATES': 'TRACK_RATES',
+                    'TRADE_BATCH': 'TRADE_BATCH'}
+
+COMMAND_QUEUES = {'CLOSE_PARTIAL': 'CLOSE'}
+
+_PERCENTILES = (('p50_us', 50.0),
+                ('p90_us', 90.0),
+                ('p99_us', 99.0),
+                ('p999_us', 99.9))
+
+##############################################################################
+
+class DWX_ZMQ_Latency_Histogram():
+
+    """
+    Log-bucketed histogram of durations in ns
+    """
+    __slots__ = ('_bits', '_half', '_counts', '_count', '_sum', '_min', '_max')
+
+    def __init__(self, _significant_bits=5):
+
+        self._bits = _significant_bits
+        self._half = 1 << (_significant_bits - 1)
+
+        # Buckets for every int64 value
+        self._counts = [0] * ((64 - _significant_bits + 2) * self._half)
+
+        self._count = 0
+        self._sum = 0
+        self._min = None
+        self._max = 0
+
+    ##########################################################################
+
+    def record(self, _ns):
+
+        if _ns < 0:
+            _ns = 0
+
+        _shift = _ns.bit_length() - self._bits
+
+        if _shift > 0:
+            self._counts[_shift * self._half + (_ns >> _shift)] += 1
+        else:
+            self._counts[_ns] += 1
+
+        self._count += 1
+        self._sum += _ns
+
+        if _ns > self._max:
+            self._max = _ns
+        if self._min is None or _ns < self._min:
+            self._min = _ns
+
+    ##########################################################################
+
+    def _bucket_bounds_(self, _index):
+
+        # [LOW, HIGH) of the values counted in bucket _index
+        if _index < 2 * self._half:
+            return _index, _index + 1
+
+        _shift = _index // self._half - 1
+        _low = (_index - _shift * self._half) << _shift
+
+        return _low, _low + (1 << _shift)
+
+    ##########################################################################
+
+    def percentile(self, _percent):
+
+        # Highest value equivalent (same bucket) to the _percent-th
+        # percentile, capped by the maximum recorded (ns); None if empty
+        if not self._count:
+            return None
+
+        _rank = max(1, -(-self._count * _percent // 100))
+        _seen = 0
+
+        for _index, _n in enumerate(self._counts):
+            _seen += _n
+            if _seen >= _rank:
+                return min(self._bucket_bounds_(_index)[1] - 1, self._max)
+
+        return self._max
+
+    ##########################################################################
+
+    def buckets(self):
+
+        # [(LOW (ns), HIGH (ns), COUNT)] of the non-empty buckets
+        return [self._bucket_bounds_(_index) + (_n,)
+                for _index, _n in enumerate(self._counts) if _n]
+
+    ##########################################################################
+
+    def snapshot(self):
+
+        _snapshot = {'count': self._count}
+
+        if not self._count:
+            return _snapshot
+
+        _snapshot['min_us'] = round(self._min / 1e3, 1)
+        _snapshot['mean_us'] = round(self._sum / self._count / 1e3, 1)
+
+        for _name, _percent in _PERCENTILES:
+            _snapshot[_name] = round(self.percentile(_percent) / 1e3, 1)
+
+        _snapshot['max_us'] = round(self._max / 1e3, 1)
+
+        return _snapshot
+
+##############################################################################
+
+class DWX_ZMQ_Latency_Tracker():
+
+    """
+    Matches responses to commands and keeps a histogram per command action
+    """
+
+    # Without request IDs, responses are matched in order per action: the
+    # Expert Advisor answers commands one at a time, in the order it reads
+    # them. A command left unanswered shifts that order, so at most
+    # _max_pending are kept waiting, oldest dropped first.
+    def __init__(self, _request_ids=False, _significant_bits=5, _max_pending=10000):
+
+        self._request_ids = _request_ids
+        self._significant_bits = _significant_bits
+        self._max_pending = _max_pending
+
+        # Commands waiting for their response: {REQUEST ID: (ACTION, SENT
+        # (ns))}, or {QUEUE: deque([(ACTION, SENT (ns))])} in send order
+        self._pending = {}
+        self._pending_lock = Lock()
+
+        # {ACTION: DWX_ZMQ_Latency_Histogram}, written by the poll thread
+        self._histograms = {}
+
+        # Responses no command was waiting for
+        self._unmatched = 0
+
+    ##########################################################################
+
+    def _sent_(self, _msg, _time_ns):
+
+        # _msg as sent: [@REQUEST_ID;]TRADE;ACTION;... or ACTION;...
+        # Returns what _discard_() needs if it could not be sent after all.
+        _request_id = None
+
+        if _msg[0] == '@':
+            _request_id, _, _msg = _msg[1:].partition(';')
+            _request_id = int(_request_id)
+
+        _action, _, _rest = _msg.partition(';')
+
+        if _action == 'TRADE':
+            _action = _rest.partition(';')[0]
+
+        with self._pending_lock:
+
+            _sent = (_action, _time_ns)
+
+            if _request_id is not None:
+                if len(self._pending) >= self._max_pending:
+                    del self._pending[next(iter(self._pending))]
+                self._pending[_request_id] = _sent
+                return _request_id, _sent
+
+            _key = COMMAND_QUEUES.get(_action, _action)
+            _queue = self._pending.get(_key)
+
+            if _queue is None:
+                _queue = self._pending[_key] = deque(maxlen=self._max_pending)
+
+            _queue.append(_sent)
+
+            return _key, _sent
+
+    ##########################################################################
+
+    def _discard_(self, _sent):
+
+        # Forgets a command _sent_() registered, which was not sent
+        _key, _sent = _sent
+
+        with self._pending_lock:
+            _pending = self._pending.get(_key)
+            if isinstance(_pending, deque):
+                try:
+                    _pending.remove(_sent)
+                except ValueError:
+                    pass
+            elif _pending is _sent:
+                del self._pending[_key]
+
+    def _cancel_(self, _request_id, _time_ns):
+
+        # No round trip for a request given up on at _time_ns. Returns
+        # (ACTION, TIME SINCE SENT (ns)) if it had been sent: its round trip
+        # is at least that.
+        with self._pending_lock:
+            _sent = self._pending.pop(_request_id, None)
+
+        if not isinstance(_sent, tuple):
+            return None
+
+        return _sent[0], _time_ns - _sent[1]
+
+    ##########################################################################
+
+    def _received_(self, _data, _time_ns):
+
+        # _data: a parsed response, received at _time_ns. Returns (ACTION,
+        # ROUND TRIP (ns)) if it answers a command
+        if not isinstance(_data, dict):
+            return None
+
+        _action = _data.get('_action')
+
+        # Only the last chunk completes a chunked HIST request
+        if _action == 'HIST_CHUNK' and not _data.get('_final'):
+            return None
+
+        with self._pending_lock:
+
+            if self._request_ids and '_request_id' in _data:
+                _sent = self._pending.pop(_data['_request_id'], None)
+            else:
+                _queue = self._pending.get(RESPONSE_ACTIONS.get(_action))
+                _sent = _queue.popleft() if _queue else None
+
+        if _sent is None:
+            self._unmatched += 1
+            return None
+
+        _histogram = self._histograms.get(_sent[0])
+
+        if _histogram is None:
+            _histogram = self._histograms[_sent[0]] = DWX_ZMQ_Latency_Histogram(
+                self._significant_bits)
+
+        _histogram.record(_time_ns - _sent[1])
+
+        return _sent[0], _time_ns - _sent[1]
+
+    ##########################################################################
+
+    def snapshot(self, _reset=False, _buckets=False):
+
+        # {ACTION: {'count', 'min_us', 'mean_us', 'p50_us', ..., 'max_us'
+        # (, 'buckets': [(LOW (ns), HIGH (ns), COUNT)])}}
+        _histograms = self._histograms
+
+        if _reset:
+            self._histograms = {}
+
+        _snapshot = {}
+
+        for _action, _histogram in list(_histograms.items()):
+            _snapshot[_action] = _histogram.snapshot()
+            if _buckets:
+                _snapshot[_action]['buckets'] = _histogram.buckets()
+
+        return _snapshot
+
+##############################################################################
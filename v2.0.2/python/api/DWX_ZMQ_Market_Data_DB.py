@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Market_Data_DB.py
+    --
+    Fixed-capacity, columnar store for the market data received on SUB: a
+    ring buffer of NumPy columns per symbol (ticks) or instrument (rates).
+
+    Usage:
+        _db = _zmq._Market_Data_DB
+        _db['EURUSD']['bid']            # zero-copy view, oldest first
+        _db['EURUSD'].last(100)         # {column: view} of the last 100 ticks
+        _db['EURUSD'].to_dataframe()    # copy, indexed by receive time
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+##############################################################################
+
+# timestamp: receive time (ns since epoch UTC); time: server time of
+# binary records (ms since epoch for ticks, bar open in s for rates)
+_TICK_FIELDS = (('timestamp', np.int64),
+                ('bid', np.float64),
+                ('ask', np.float64))
+
+# Ticks with the server's time (if a symbol's first ticks were binary)
+_TIMED_TICK_FIELDS = (('timestamp', np.int64),
+                      ('time', np.int64),
+                      ('bid', np.float64),
+                      ('ask', np.float64))
+
+# Server time of text ticks in a timed buffer (unknown)
+_NO_TIME = -1
+
+_RATE_FIELDS = (('timestamp', np.int64),
+                ('time', np.int64),
+                ('open', np.float64),
+                ('high', np.float64),
+                ('low', np.float64),
+                ('close', np.float64),
+                ('tick_volume', np.int64),
+                ('spread', np.int64),
+                ('real_volume', np.int64))
+
+##############################################################################
+
+class DWX_ZMQ_Ring_Buffer():
+
+    """
+    Fixed-capacity columnar ring buffer (oldest rows are overwritten)
+    """
+    def __init__(self, _fields, _capacity):
+
+        if _capacity < 1:
+            raise ValueError('Capacity must be at least 1, got {}'.format(_capacity))
+
+        self._fields = tuple(_name for _name, _ in _fields)
+        self._capacity = _capacity
+
+        # Two copies of each column: row i lives at i and i + capacity, so
+        # the last N rows are always one contiguous slice (O(1) appends,
+        # zero-copy reads). 48 bytes per tick, 144 per rate, allocated up
+        # front.
+        self._columns = {_name: np.zeros(2 * _capacity, dtype=_dtype)
+                         for _name, _dtype in _fields}
+        self._column_list = [self._columns[_name] for _name in self._fields]
+
+        # Rows ever appended, and next row's slot
+        self._count = 0
+        self._head = 0
+
+    ##########################################################################
+
+    def append(self, *_values):
+
+        _i = self._head
+        _j = _i + self._capacity
+
+        for _column, _value in zip(self._column_list, _values):
+            _column[_i] = _value
+            _column[_j] = _value
+
+        self._count += 1
+        self._head = _i + 1 if _i + 1 < self._capacity else 0
+
+    ##########################################################################
+
+    def extend(self, _rows):
+
+        # Appends a list of row tuples with one slice write per column
+        if _rows:
+            self.extend_columns(*zip(*_rows))
+
+    ##########################################################################
+
+    def extend_columns(self, *_columns):
+
+        # Appends one sequence / array per column, with one slice write each
+        _n = len(_columns[0])
+
+        if _n == 0:
+            return
+
+        # Only the last capacity rows survive
+        _k = min(_n, self._capacity)
+        _i = self._head
+        _first = min(_k, self._capacity - _i)
+
+        for _column, _values in zip(self._column_list, _columns):
+
+            _values = np.asarray(_values[_n - _k:], dtype=_column.dtype)
+
+            _column[_i:_i + _first] = _values[:_first]
+            _column[_i + self._capacity:_i + self._capacity + _first] = _values[:_first]
+
+            # Wrap around
+            _column[:_k - _first] = _values[_first:]
+            _column[self._capacity:self._capacity + _k - _first] = _values[_first:]
+
+        self._count += _n
+        self._head = (_i + _k) % self._capacity
+
+    ##########################################################################
+
+    def __len__(self):
+        return min(self._count, self._capacity)
+
+    ##########################################################################
+
+    def _window_(self, _n=None):
+
+        _size = len(self)
+        _n = _size if _n is None else max(0, min(_n, _size))
+        _end = self._head + self._capacity
+
+        return slice(_end - _n, _end)
+
+    ##########################################################################
+
+    def __getitem__(self, _field):
+
+        # Zero-copy, read-only view of one column, oldest row first
+        _view = self._columns[_field][self._window_()]
+        _view.flags.writeable = False
+
+        return _view
+
+    ##########################################################################
+
+    def last(self, _n=None):
+
+        # Zero-copy views of the last _n rows (all rows if None)
+        _window = self._window_(_n)
+        _views = {}
+
+        for _name in self._fields:
+            _views[_name] = self._columns[_name][_window]
+            _views[_name].flags.writeable = False
+
+        return _views
+
+    ##########################################################################
+
+    def to_dataframe(self, _n=None):
+
+        _data = {_name: _view.copy() for _name, _view in self.last(_n).items()}
+        _index = to_datetime(_data.pop('timestamp'), unit='ns')
+
+        return DataFrame(_data, index=_index)
+
+    ##########################################################################
+
+    @property
+    def nbytes(self):
+        return sum(_column.nbytes for _column in self._column_list)
+
+    ##########################################################################
+
+    def __repr__(self):
+        return '{}(fields={}, rows={}, capacity={})'.format(
+            type(self).__name__, self._fields, len(self), self._capacity)
+
+##############################################################################
+
+class DWX_ZMQ_Market_Data_DB():
+
+    """
+    Per-symbol ring buffers, created on first tick / rate ({SYMBOL: buffer})
+    """
+    def __init__(self, _tick_capacity=200000, _rate_capacity=10000):
+
+        self._tick_capacity = _tick_capacity
+        self._rate_capacity = _rate_capacity
+
+        self._buffers = {}
+
+    ##########################################################################
+
+    def _buffer_(self, _symbol, _fields, _capacity):
+
+        try:
+            return self._buffers[_symbol]
+        except KeyError:
+            _buffer = self._buffers[_symbol] = DWX_ZMQ_Ring_Buffer(_fields, _capacity)
+            return _buffer
+
+    ##########################################################################
+
+    def _tick_buffer_(self, _symbol, _timed=False):
+
+        # The buffer's columns are set by the first ticks stored
+        return self._buffer_(_symbol, _TIMED_TICK_FIELDS if _timed else _TICK_FIELDS,
+                             self._tick_capacity)
+
+    def _append_tick_(self, _symbol, _timestamp, _bid, _ask):
+
+        _buffer = self._tick_buffer_(_symbol)
+
+        if len(_buffer._fields) == len(_TIMED_TICK_FIELDS):
+            _buffer.append(_timestamp, _NO_TIME, _bid, _ask)
+        else:
+            _buffer.append(_timestamp, _bid, _ask)
+
+    def _extend_ticks_(self, _symbol, _rows):
+
+        # _rows: [(TIMESTAMP, BID, ASK)]
+        if _rows:
+            self._extend_tick_columns_(_symbol, *zip(*_rows))
+
+    def _extend_staged_ticks_(self, _symbol, _stage, _n):
+
+        # _stage: (TIMESTAMP, BID, ASK) buffers (e.g. array.array), of which
+        # the first _n rows are used. Read through views, without copying.
+        self._extend_tick_columns_(_symbol,
+                                   *(np.frombuffer(_column, dtype=_dtype, count=_n)
+                                     for _column, (_, _dtype) in zip(_stage, _TICK_FIELDS)))
+
+    def _extend_tick_columns_(self, _symbol, _timestamps, _bids, _asks, _times=None):
+
+        # _times: server times (ms) of binary ticks
+        _buffer = self._tick_buffer_(_symbol, _times is not None)
+
+        if len(_buffer._fields) == len(_TICK_FIELDS):
+            _buffer.extend_columns(_timestamps, _bids, _asks)
+            return
+
+        if _times is None:
+            _times = np.full(len(_timestamps), _NO_TIME, dtype=np.int64)
+
+        _buffer.extend_columns(_timestamps, _times, _bids, _asks)
+
+    ##########################################################################
+
+    def _append_rate_(self, _symbol, _timestamp, _time, _open, _high, _low,
+                      _close, _tick_vol, _spread, _real_vol):
+
+        self._buffer_(_symbol, _RATE_FIELDS, self._rate_capacity).append(
+            _timestamp, _time, _open, _high, _low, _close, _tick_vol, _spread,
+            _real_vol)
+
+    def _extend_rates_(self, _symbol, _rows):
+
+        # _rows: [(TIMESTAMP, TIME, OPEN, HIGH, LOW, CLOSE, TICKVOL, SPREAD, VOLUME)]
+        self._buffer_(_symbol, _RATE_FIELDS, self._rate_capacity).extend(_rows)
+
+    def _extend_rate_columns_(self, _symbol, *_columns):
+
+        # _columns: TIMESTAMP, TIME, OPEN, HIGH, LOW, CLOSE, TICKVOL, SPREAD, VOLUME
+        self._buffer_(_symbol, _RATE_FIELDS, self._rate_capacity).extend_columns(*_columns)
+
+    ##########################################################################
+
+    def __getitem__(self, _symbol):
+        return self._buffers[_symbol]
+
+    def __contains__(self, _symbol):
+        return _symbol in self._buffers
+
+    def __iter__(self):
+        return iter(self._buffers)
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def keys(self):
+        return self._buffers.keys()
+
+    def items(self):
+        return self._buffers.items()
+
+    ##########################################################################
+
+    @property
+    def nbytes(self):
+        # (safe while the poll thread adds buffers)
+        return sum(_buffer.nbytes for _buffer in list(self._buffers.values()))
+
+    ##########################################################################
+
+    def __repr__(self):
+        return '{' + ', '.join('{!r}: {!r}'.format(_symbol, _buffer)
+                               for _symbol, _buffer in self._buffers.items()) + '}'
+
+##############################################################################
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Metrics_Exporter.py
+    --
+    Serves the connector's counters (DWX_ZeroMQ_Connector.stats()) over HTTP
+    in the Prometheus text exposition format.
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector(_metrics_port=9150)
+
+        $ curl -s localhost:9150/metrics
+        dwx_zmq_sub_messages_total 1204711
+        ...
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+##############################################################################
+
+# (STATS KEY, METRIC NAME, TYPE, SCALE, HELP). Counters only ever grow
+# (per-second rates are for Prometheus' rate()), durations are in seconds.
+_METRICS = (
+    ('uptime_s', 'uptime_seconds', 'gauge', 1, 'Seconds since the connector started.'),
+    ('pull_messages', 'pull_messages_total', 'counter', 1, 'Messages received on PULL (responses).'),
+    ('pull_bytes', 'pull_bytes_total', 'counter', 1, 'Bytes received on PULL.'),
+    ('sub_messages', 'sub_messages_total', 'counter', 1, 'Messages received on SUB (market data).'),
+    ('sub_bytes', 'sub_bytes_total', 'counter', 1, 'Bytes received on SUB.'),
+    ('wakeups', 'poll_wakeups_total', 'counter', 1, 'Poll loop wakeups with data.'),
+    ('budget_exhausted', 'poll_budget_exhausted_total', 'counter', 1,
+     'Socket drains stopped by the batch budget (more data was waiting).'),
+    ('last_batch', 'poll_last_batch_messages', 'gauge', 1, 'Messages read in the last wakeup.'),
+    ('max_batch', 'poll_max_batch_messages', 'gauge', 1, 'Most messages read in one wakeup.'),
+    ('max_loop_ns', 'poll_max_loop_seconds', 'gauge', 1e-9, 'Longest wakeup, from poll() to batch processed.'),
+    ('decode_ns', 'decode_seconds_total', 'counter', 1e-9,
+     'Time spent receiving, decoding and storing messages, without handlers.'),
+    ('handler_ns', 'handler_seconds_total', 'counter', 1e-9, 'Time spent in onPullData / onSubData handlers.'),
+    ('sends', 'sends_total', 'counter', 1, 'Commands sent on PUSH.'),
+    ('sends_dropped', 'sends_dropped_total', 'counter', 1, 'Commands not sent, socket error or stopped.'),
+    ('send_retries', 'send_retries_total', 'counter', 1, 'Waits for the PUSH socket to take a command.'),
+    ('sends_expired', 'sends_expired_total', 'counter', 1, 'Commands expired in the send queue (stale OPENs).'),
+    ('sends_cancelled', 'sends_cancelled_total', 'counter', 1,
+     'Commands withdrawn from the send queue, request cancelled.'),
+    ('sends_rejected', 'sends_rejected_total', 'counter', 1, 'Commands refused, send queue full.'),
+    ('pace_rate', 'pace_rate', 'gauge', 1, 'Commands per second the pacer lets through.'),
+    ('paced', 'paced_total', 'counter', 1, 'Times the pacer held a command back.'),
+    ('pace_decreases', 'pace_decreases_total', 'counter', 1, 'Pacing rate decreases (commands timed out or queueing).'),
+    ('pace_increases', 'pace_increases_total', 'counter', 1, 'Pacing rate increases.'),
+    ('sends_high_priority', 'sends_high_priority_total', 'counter', 1,
+     'Commands sent in the high priority lane (closes).'),
+    ('send_queue_high', 'send_queue_high', 'gauge', 1, 'Commands queued in the high priority lane.'),
+    ('send_queue_normal', 'send_queue_normal', 'gauge', 1, 'Commands queued in the normal lane.'),
+    ('requests_cancelled', 'requests_cancelled_total', 'counter', 1, 'Requests given up on (e.g. timed out).'),
+    ('requests_pending', 'requests_pending', 'gauge', 1, 'Requests waiting for their response.'),
+    ('market_data_bytes', 'market_data_bytes', 'gauge', 1, 'Memory of the _Market_Data_DB ring buffers.'),
+    ('market_data_buffers', 'market_data_buffers', 'gauge', 1, 'Symbols and instruments in _Market_Data_DB.'),
+    ('handler_queue_depth', 'handler_queue_depth', 'gauge', 1, 'Events queued for handler threads.'),
+    ('handler_dropped', 'handler_dropped_total', 'counter', 1, 'SUB events dropped, handler queue full.'),
+    ('handler_conflated', 'handler_conflated_total', 'counter', 1, 'SUB events replaced by a newer one.'),
+    ('handler_errors', 'handler_errors_total', 'counter', 1, 'Exceptions raised by handlers.'),
+    ('latency_unmatched', 'latency_unmatched_total', 'counter', 1,
+     'Responses not matched to a command for latency.'),
+    ('open_trades', 'open_trades', 'gauge', 1, 'Open trades in the local trades book.'),
+    ('trades_book_reconciles', 'trades_book_reconciles_total', 'counter', 1,
+     'Trades book snapshots (GET_OPEN_TRADES responses) applied.'),
+)
+
+# Of the latency and send queue wait summaries, since the connector started
+_QUANTILES = (('p50_us', '0.5'),
+              ('p90_us', '0.9'),
+              ('p99_us', '0.99'),
+              ('p999_us', '0.999'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+##############################################################################
+
+def format_metrics(_stats, _prefix='dwx_zmq_'):
+
+    # Prometheus text format of a stats() / _get_stats_() dict
+    _lines = []
+
+    for _key, _name, _type, _scale, _help in _METRICS:
+
+        if _key not in _stats:
+            continue
+
+        _lines.append('# HELP {}{} {}'.format(_prefix, _name, _help))
+        _lines.append('# TYPE {}{} {}'.format(_prefix, _name, _type))
+        _lines.append('{}{} {!r}'.format(_prefix, _name, _stats[_key] * _scale))
+
+    _summary_(_lines, _prefix + 'command_latency_seconds',
+              'Command round trip, from sending to its response.',
+              'action', _stats.get('latency'))
+
+    _summary_(_lines, _prefix + 'send_queue_wait_seconds',
+              'Time commands waited in the send queue.',
+              'lane', _stats.get('send_wait'))
+
+    return '\n'.join(_lines) + '\n'
+
+def _summary_(_lines, _name, _help, _label, _snapshots):
+
+    # Summary of {LABEL VALUE: histogram snapshot (see DWX_ZMQ_Latency)}
+    if not _snapshots:
+        return
+
+    _lines.append('# HELP {} {}'.format(_name, _help))
+    _lines.append('# TYPE {} summary'.format(_name))
+
+    for _value, _snapshot in sorted(_snapshots.items()):
+
+        if not _snapshot['count']:
+            continue
+
+        for _key, _quantile in _QUANTILES:
+            _lines.append('{}{{{}="{}",quantile="{}"}} {!r}'.format(
+                _name, _label, _value, _quantile, _snapshot[_key] / 1e6))
+
+        _lines.append('{}_sum{{{}="{}"}} {!r}'.format(
+            _name, _label, _value, _snapshot['mean_us'] * _snapshot['count'] / 1e6))
+        _lines.append('{}_count{{{}="{}"}} {}'.format(_name, _label, _value, _snapshot['count']))
+
+##############################################################################
+
+class DWX_ZMQ_Metrics_Exporter():
+
+    """
+    HTTP endpoint (/metrics) for a connector's counters
+    """
+    def __init__(self, _get_stats, _port=9150, _host='127.0.0.1', _prefix='dwx_zmq_'):
+
+        # _get_stats: callable returning the counters (DWX_ZeroMQ_Connector._get_stats_)
+        self._get_stats = _get_stats
+        self._prefix = _prefix
+
+        _exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+
+                try:
+                    _body = format_metrics(_exporter._get_stats(), _exporter._prefix).encode()
+                except Exception as ex:
+                    self.send_error(500, type(ex).__name__)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(_body)))
+                self.end_headers()
+                self.wfile.write(_body)
+
+            def log_message(self, *_args):
+                pass
+
+        # Each scrape reads the counters without stopping the poll thread
+        self._server = ThreadingHTTPServer((_host, _port), _Handler)
+        self._server.daemon_threads = True
+
+        # Actual port (_port=0 picks a free one)
+        self._host, self._port = self._server.server_address[:2]
+
+        self._Server_Thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._Server_Thread.start()
+
+        print("[INIT] Serving metrics on http://{}:{}/metrics".format(self._host, self._port))
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        self._server.shutdown()
+        self._server.server_close()
+
+##############################################################################
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Pacer.py
+    --
+    Token-bucket pacing of the commands the sender thread writes, globally
+    and per symbol; with _adaptive=True the rate follows the terminal's
+    capacity, from round trips (DWX_ZMQ_Latency), commands given up on and
+    send-queue waits.
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector(_pace_rate=200, _pace_symbol_rate=5)
+        _zmq._Pacer._get_stats_()
+        {'pace_rate': 412.6, 'paced': 1893, 'pace_decreases': 4,
+         'pace_increases': 37}
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from time import monotonic
+from threading import Lock
+
+##############################################################################
+
+def _symbols_(_msg):
+
+    # Symbols of the trades a command opens, as sent:
+    # [@REQUEST_ID;]TRADE;OPEN;TYPE;SYMBOL;... or TRADE_BATCH;COUNT|OPEN;TYPE;SYMBOL;...|...
+    if _msg[0] == '@':
+        _msg = _msg.partition(';')[2]
+
+    if _msg.startswith('TRADE;OPEN;'):
+        _fields = _msg.split(';', 4)
+        return (_fields[3],) if len(_fields) > 4 else ()
+
+    if _msg.startswith('TRADE_BATCH;'):
+        return tuple(_item.split(';', 3)[2] for _item in _msg.split('|')[1:]
+                     if _item.startswith('OPEN;') and _item.count(';') >= 3)
+
+    return ()
+
+def _action_(_msg):
+
+    # Action of a command as sent, as DWX_ZMQ_Latency names it:
+    # [@REQUEST_ID;]TRADE;ACTION;... or ACTION;...
+    if _msg[0] == '@':
+        _msg = _msg.partition(';')[2]
+
+    _action, _, _rest = _msg.partition(';')
+
+    return _rest.partition(';')[0] if _action == 'TRADE' else _action
+
+##############################################################################
+
+class DWX_ZMQ_Pacer():
+
+    """
+    Global and per-symbol token buckets, the global rate adapting to round trips
+    """
+    def __init__(self,
+                 _rate=100.0,               # Commands per second (initial rate if adaptive, None: no limit)
+                 _burst=10,                 # Commands sent back to back at most
+                 _symbol_rate=None,         # OPENs per second per symbol (None: no limit)
+                 _symbol_burst=5,
+                 _adaptive=True,            # Adapt _rate to round trips
+                 _min_rate=1.0,
+                 _max_rate=None,
+                 _latency_factor=2.0,       # Round trips this many times their baseline mean queueing,
+                 _latency_slack=0.005,      # ... if also this many seconds over it
+                 _latency_limit=0.1,        # Seconds of queueing that decrease _rate, without timeouts
+                 _decrease=0.7,
+                 _increase=0.05,
+                 _adapt_interval=0.05,      # Min. seconds between increases (after slow start)
+                 _queue_target=0.002,       # Seconds commands may wait in the sender's queue before increasing
+                 _baseline_window=30.0):    # Seconds per baseline (lowest round trip) window
+
+        self._rate = None if _rate is None else float(_rate)
+        self._burst = _burst
+        self._symbol_rate = _symbol_rate
+        self._symbol_burst = _symbol_burst
+
+        self._adaptive = _adaptive and _rate is not None
+        self._min_rate = _min_rate
+        self._max_rate = _max_rate
+        self._latency_factor = _latency_factor
+        self._latency_slack_ns = _latency_slack * 1e9
+        self._latency_limit_ns = _latency_limit * 1e9
+        self._decrease = _decrease
+        self._increase = _increase
+        self._adapt_interval = _adapt_interval
+        self._queue_target_ns = _queue_target * 1e9
+        self._baseline_window = _baseline_window
+
+        # Buckets: [TOKENS, LAST REFILL (monotonic)], full to begin with
+        _now = monotonic()
+        self._bucket = [float(_burst), _now]
+        self._symbol_buckets = {}
+
+        # Written by the poll thread: {ACTION: [PREVIOUS WINDOW MIN, MIN]}
+        # (ns), smoothed round trip over the baseline (ns), and the
+        # adaptation state
+        self._baselines = {}
+        self._window_start = _now
+        self._excess = 0.0
+        self._decreased = _now
+        self._next_increase = _now
+
+        # Responses per second over _adapt_interval periods in which
+        # commands queued at the terminal (busy), smoothed: what the
+        # terminal delivers, the rate is cut to when above it
+        self._delivered = 0
+        self._delivered_start = _now
+        self._busy = False
+        self._delivery_rate = 0.0
+
+        # Doubling _rate once per round trip until commands first queue at
+        # the terminal
+        self._slow_start = True
+        self._adapt_lock = Lock()
+
+        # {ACTION: smoothed round trip (ns) of answered commands}. The
+        # sender does not write commands expiring sooner.
+        self._rtt_ns = {}
+
+        # Set by the sender thread when the global bucket held a command
+        # back, and when a command waited too long in the queue
+        self._limited = False
+        self._backlogged = False
+
+        self._stats = {'paced': 0,
+                       'pace_decreases': 0,
+                       'pace_increases': 0}
+
+    ##########################################################################
+
+    def _refill_(self, _bucket, _rate, _burst, _now):
+
+        # Seconds until _bucket has a token
+        _bucket[0] = min(_burst, _bucket[0] + (_now - _bucket[1]) * _rate)
+        _bucket[1] = _now
+
+        return 0.0 if _bucket[0] >= 1 else (1 - _bucket[0]) / _rate
+
+    def _symbol_bucket_(self, _symbol, _now):
+
+        _bucket = self._symbol_buckets.get(_symbol)
+
+        if _bucket is None:
+            _bucket = self._symbol_buckets[_symbol] = [float(self._symbol_burst), _now]
+
+        return _bucket
+
+    ##########################################################################
+
+    def _delay_(self, _symbols=(), _held=False):
+
+        # Sender thread: seconds until a command opening trades on _symbols
+        # may be written (0.0: now). _held: it was already held back (not
+        # counted again).
+        _now = monotonic()
+        _wait = 0.0
+
+        if self._rate is not None:
+            _wait = self._refill_(self._bucket, self._rate, self._burst, _now)
+            if _wait > 0:
+                self._limited = True
+
+        if self._symbol_rate is not None:
+            for _symbol in _symbols:
+                _wait = max(_wait, self._refill_(self._symbol_bucket_(_symbol, _now),
+                                                 self._symbol_rate, self._symbol_burst, _now))
+
+        if _wait > 0 and not _held:
+            self._stats['paced'] += 1
+
+        return _wait
+
+    def _queued_(self, _wait_ns):
+
+        # Sender thread: a normal lane command was written after waiting
+        # _wait_ns in the queue (None: it expired there)
+        if _wait_ns is None or _wait_ns > self._queue_target_ns:
+            self._backlogged = True
+
+    def _take_(self, _symbols=()):
+
+        # Sender thread: a command was written (tokens may go negative)
+        _now = monotonic()
+
+        if self._rate is not None:
+            self._refill_(self._bucket, self._rate, self._burst, _now)
+            self._bucket[0] -= 1
+
+        if self._symbol_rate is not None:
+            for _symbol in _symbols:
+                _bucket = self._symbol_bucket_(_symbol, _now)
+                self._refill_(_bucket, self._symbol_rate, self._symbol_burst, _now)
+                _bucket[0] -= 1
+
+    ##########################################################################
+
+    def _observe_(self, _action, _ns, _unanswered=False):
+
+        # Poll thread: round trip (ns) of a command of _action. Any thread,
+        # _unanswered: a command sent _ns ago was given up on (timed out)
+        # before its response came.
+        if not self._adaptive:
+            return
+
+        with self._adapt_lock:
+
+            _now = monotonic()
+
+            if _now - self._window_start >= self._baseline_window:
+                self._window_start = _now
+                for _mins in self._baselines.values():
+                    _mins[0], _mins[1] = _mins[1], None
+
+            _mins = self._baselines.get(_action)
+
+            if _unanswered:
+                if _mins is None:
+                    return
+            else:
+                _srtt = self._rtt_ns.get(_action)
+                self._rtt_ns[_action] = _ns if _srtt is None else _srtt + (_ns - _srtt) / 8
+
+                if self._delivered == 0:
+                    self._delivered_start = _now
+                elif _now - self._delivered_start >= self._adapt_interval:
+                    if self._busy:
+                        _rate = self._delivered / (_now - self._delivered_start)
+                        self._delivery_rate += ((_rate - self._delivery_rate) / 4
+                                                if self._delivery_rate else _rate)
+                    self._delivered = 0
+                    self._delivered_start = _now
+                    self._busy = False
+                self._delivered += 1
+
+                if _mins is None:
+                    _mins = self._baselines[_action] = [None, _ns]
+                elif _mins[1] is None or _ns < _mins[1]:
+                    _mins[1] = _ns
+
+            _baseline = _mins[1] if _mins[0] is None else min(_mins[0], _mins[1] or _mins[0])
+            _threshold = max(self._latency_slack_ns, (self._latency_factor - 1) * _baseline)
+
+            # Commands sent before the last decrease were paced too fast
+            # already
+            if _now - _ns / 1e9 < self._decreased:
+                return
+
+            # Timed out while queueing at the terminal, not in the sender's
+            # queue (written just before their caller gave up), paced faster
+            # than it delivers. Not paced faster, a timeout is its jitter.
+            if _unanswered:
+                if _ns - _baseline > _threshold and not 0 < self._rate <= self._delivery_rate:
+                    self._decrease_(_now)
+                return
+
+            # Time spent queueing, smoothed over responses of every action
+            self._excess += (_ns - _baseline - self._excess) / 8
+
+            # Commands queueing at the terminal: its capacity is reached.
+            # Queueing is no harm until commands time out, unless it goes
+            # on growing.
+            _queueing = self._excess > _threshold
+            self._busy = self._busy or _queueing
+
+            if _queueing and self._slow_start:
+
+                # Back to the last rate that did not queue, at most what
+                # the terminal delivers
+                self._slow_start = False
+                self._rate = max(self._min_rate, min(self._rate / 2,
+                                                     self._delivery_rate or self._rate))
+                self._decreased = _now
+                self._stats['pace_decreases'] += 1
+
+            elif self._excess > self._latency_limit_ns:
+                self._decrease_(_now)
+
+            # Commands held back by the bucket then waited too long, or
+            # expired, in the sender's queue: the terminal may take more
+            elif (not _queueing and self._limited and self._backlogged
+                    and _now >= self._next_increase):
+
+                self._limited = self._backlogged = False
+
+                if self._slow_start:
+                    self._next_increase = _now + _ns / 1e9
+                    _rate = self._rate * 2
+                else:
+                    self._next_increase = _now + self._adapt_interval
+                    _rate = self._rate * (1 + self._increase)
+
+                self._rate = _rate if self._max_rate is None else min(_rate, self._max_rate)
+                self._stats['pace_increases'] += 1
+
+    def _decrease_(self, _now):
+
+        # Under _adapt_lock. To what the terminal delivers if _rate is above
+        # it (e.g. after slow start), so one cut takes effect, else by
+        # _decrease
+        _delivery = self._delivery_rate
+        _rate = _delivery if 0 < _delivery < self._rate else self._rate * self._decrease
+        self._rate = max(self._min_rate, _rate)
+        self._decreased = _now
+        self._excess = 0.0
+        self._slow_start = False
+        self._stats['pace_decreases'] += 1
+
+    ##########################################################################
+
+    def _get_stats_(self):
+
+        _stats = dict(self._stats)
+
+        if self._rate is not None:
+            _stats['pace_rate'] = self._rate
+
+        return _stats
+
+    ##########################################################################
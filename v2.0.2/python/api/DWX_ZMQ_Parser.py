@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Parser.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import re
+from ast import literal_eval
+from json import JSONDecoder
+
+##############################################################################
+
+# The MQL servers reply with Python dict literals built by string
+# concatenation, e.g.:
+#
+#   {'_action': 'HIST', '_data': [{'time':'2019.01.04 00:00', 'open':0.90111, ...}]}
+#   {'_action': 'OPEN_TRADES', '_trades': {85051741: {'_magic': 123456, ...}}}
+#
+# Apart from the quote character and the integer (ticket) keys, this is JSON,
+# so the common case is re-quoted in one C-level pass and handed to the C JSON
+# scanner. Anything outside that dialect falls back to ast.literal_eval(),
+# which is slower but equally non-executing.
+
+_SINGLE_TO_DOUBLE = str.maketrans("'", '"')
+
+# String-aware rewrite of integer keys and Python constants.
+_FIXUP = re.compile(r'("[^"]*")|([{,]\s*)(-?\d+)(\s*:)|\b(True|False|None)\b')
+
+_CONSTANTS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+# Integer keys are tagged with this prefix so they can be restored to int.
+_INT_KEY_TAG = '\x01'
+
+# Tokens that matter when looking for the end of a value: flat dicts (one per
+# HIST bar) and complete string literals are skipped in one match, brackets
+# change depth, and a lone quote or backslash means a string that is escaped
+# or continues in the next chunk.
+_SCAN = re.compile(r"""\{[^{}\[\]'"\\]*(?:(?:'[^'\\]*'|"[^"\\]*")[^{}\[\]'"\\]*)*\}"""
+                   r"""|'[^'\\]*'|"[^"\\]*"|[{}\[\]'"\\]""")
+
+##############################################################################
+
+def _fixup_(_match):
+
+    if _match.group(1) is not None:
+        return _match.group(1)
+
+    if _match.group(3) is not None:
+        return '{}"\\u0001{}"{}'.format(_match.group(2),
+                                        _match.group(3),
+                                        _match.group(4))
+
+    return _CONSTANTS[_match.group(5)]
+
+def _int_keys_hook_(_pairs):
+
+    return {(int(k[1:]) if k[:1] == _INT_KEY_TAG else k): v for k, v in _pairs}
+
+_DECODER = JSONDecoder(strict=False)
+_INT_KEYS_DECODER = JSONDecoder(strict=False, object_pairs_hook=_int_keys_hook_)
+
+##############################################################################
+
+class DWX_ZMQ_Parser():
+
+    """
+    Non-executing decoder for PULL responses (replaces eval(msg)).
+
+    DWX_ZMQ_Parser.parse(msg) decodes one complete response.
+
+    For input arriving in pieces, feed() each piece to an instance; it
+    returns the list of responses completed by that piece (usually empty
+    or one) and buffers the rest.
+    """
+
+    def __init__(self):
+
+        # Pieces of the value currently being received
+        self._chunks = []
+
+        # Bracket depth and string state carried across pieces
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+
+    ##########################################################################
+
+    @staticmethod
+    def parse(_msg):
+
+        # Quotes or escapes inside strings: leave it to the full grammar.
+        if '"' in _msg or '\\' in _msg:
+            return literal_eval(_msg)
+
+        _json = _msg.translate(_SINGLE_TO_DOUBLE)
+
+        # HIST / DATA replies have neither integer keys nor constants, and
+        # where they do occur (ticket keys) the decoder fails on the first one.
+        try:
+            return _DECODER.decode(_json)
+        except ValueError:
+            pass
+
+        try:
+            return _INT_KEYS_DECODER.decode(_FIXUP.sub(_fixup_, _json))
+        except ValueError:
+            # Valid Python that is not valid JSON (e.g. trailing commas).
+            return literal_eval(_msg)
+
+    ##########################################################################
+
+    def feed(self, _chunk):
+
+        _values = []
+        _start = 0
+
+        while True:
+
+            _end = self._scan_(_chunk, _start)
+
+            if _end < 0:
+                # Skip whitespace between values, keep everything else
+                if self._chunks or _chunk[_start:].strip():
+                    self._chunks.append(_chunk[_start:])
+                break
+
+            self._chunks.append(_chunk[_start:_end])
+            _values.append(self.parse(''.join(self._chunks)))
+            self._chunks = []
+            _start = _end
+
+        return _values
+
+    ##########################################################################
+
+    def close(self):
+
+        # Decode whatever is buffered, e.g. a response that is not a dict.
+        _text = ''.join(self._chunks)
+        self.reset()
+
+        if _text.strip():
+            return [self.parse(_text)]
+
+        return []
+
+    ##########################################################################
+
+    def reset(self):
+
+        self._chunks = []
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+
+    ##########################################################################
+
+    def _scan_(self, _text, _pos):
+
+        # Returns the index just past the first top-level value that ends in
+        # _text[_pos:], or -1 if it does not end in this piece.
+        _n = len(_text)
+
+        while _pos < _n:
+
+            # Inside a string that is escaped or was split across pieces
+            if self._quote is not None:
+
+                while _pos < _n:
+                    _c = _text[_pos]
+                    _pos += 1
+
+                    if self._escape:
+                        self._escape = False
+                    elif _c == '\\':
+                        self._escape = True
+                    elif _c == self._quote:
+                        self._quote = None
+                        break
+
+                continue
+
+            _match = _SCAN.search(_text, _pos)
+
+            if _match is None:
+                return -1
+
+            _token = _match.group()
+            _pos = _match.end()
+
+            if len(_token) > 1:
+                # A flat dict at the top level is a complete response
+                if self._depth == 0 and _token[0] == '{':
+                    return _pos
+                continue
+
+            if _token in '{[':
+                self._depth += 1
+
+            elif _token in '}]':
+                self._depth -= 1
+
+                if self._depth == 0:
+                    return _pos
+
+            elif _token in '\'"':
+                self._quote = _token
+
+        return -1
+
+    ##########################################################################
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Sender.py
+    --
+    Single sender thread writing the PUSH socket, closes first.
+
+    Usage:
+        _zmq._Sender._get_stats_()
+        {'sends': 1520, 'sends_dropped': 0, 'sends_high_priority': 310,
+         'send_retries': 12, 'sends_expired': 0, ..., 'send_queue_normal': 2,
+         'send_wait': {'high': {'count': 310, 'p50_us': 8.1, ...}, ...}}
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+from collections import deque
+from threading import Thread, Event, Lock
+from time import perf_counter_ns
+from api.DWX_ZMQ_Latency import DWX_ZMQ_Latency_Histogram
+from api.DWX_ZMQ_Pacer import _symbols_, _action_
+
+##############################################################################
+
+# Emptied high first: risk-reducing commands (the TRADE actions below, and
+# TRADE_BATCHes of closes only), then everything else. Within a lane,
+# commands are written in the order they were queued.
+LANES = ('high', 'normal')
+
+# TRADE actions sent in the high priority lane
+_HIGH_PRIORITY = frozenset(('CLOSE', 'CLOSE_PARTIAL', 'CLOSE_MAGIC', 'CLOSE_ALL'))
+
+# Max. ms per wait for the socket, between checks for expired commands
+_POLL_MS = 100
+
+##############################################################################
+
+def _request_id_(_msg):
+
+    # Request ID of a command as sent ([@REQUEST_ID;]...), or None
+    if _msg[0] != '@':
+        return None
+
+    try:
+        return int(_msg[1:_msg.index(';')])
+    except ValueError:
+        return None
+
+def _classify_(_msg):
+
+    # (LANE, OPENS) of a command as sent: 0 (high) or 1 (normal), and
+    # whether it only opens trades. [@REQUEST_ID;]TRADE;ACTION;...,
+    # TRADE_BATCH;COUNT|ACTION;...|... or ACTION;...
+    if _msg[0] == '@':
+        _msg = _msg.partition(';')[2]
+
+    if _msg.startswith('TRADE;'):
+        _action = _msg[6:].partition(';')[0]
+        return (0 if _action in _HIGH_PRIORITY else 1), _action == 'OPEN'
+
+    if _msg.startswith('TRADE_BATCH;'):
+        _actions = set(_item.partition(';')[0] for _item in _msg.split('|')[1:])
+        if _actions and _actions <= _HIGH_PRIORITY:
+            return 0, False
+        return 1, _actions == {'OPEN'}
+
+    return 1, False
+
+##############################################################################
+
+class DWX_ZMQ_Sender():
+
+    """
+    Sender thread owning a PUSH socket
+    """
+    def __init__(self,
+                 _socket,                   # PUSH socket, not used by any other thread
+                 _on_send=None,             # Called with each command just before it is written
+                 _on_dropped=None,          # Called with what _on_send returned if it was not
+                 _max_queued=10000,         # Commands queued per lane (None: no limit)
+                 _open_expiry=5.0,          # Seconds an OPEN may wait to be written (None: forever)
+                 _pacer=None,               # DWX_ZMQ_Pacer (None: write as fast as the socket takes)
+                 _significant_bits=5):      # Precision of the queue wait histograms
+
+        self._ACTIVE = True
+        self._socket = _socket
+        self._on_send = _on_send
+        self._on_dropped = _on_dropped
+        self._max_queued = _max_queued
+        self._open_expiry = _open_expiry
+        self._pacer = _pacer
+
+        # (COMMAND, QUEUED (ns), EXPIRES (ns or None), REGISTER, DISCARD,
+        # SYMBOLS OPENED (for per-symbol pacing), REQUEST ID, ACTION (if it
+        # expires and the pacer adapts)) per lane, see LANES
+        self._lanes = (deque(), deque())
+
+        # Request IDs queued, and those of them cancelled meanwhile
+        self._queued_ids = set()
+        self._cancelled_ids = set()
+        self._ids_lock = Lock()
+
+        # Set when there is something to send
+        self._wakeup = Event()
+
+        # When stopping, queued commands are given up on after this
+        # (perf_counter_ns)
+        self._stop_deadline = None
+
+        # Written by the sender thread only
+        self._stats = {'sends': 0,
+                       'sends_dropped': 0,
+                       'sends_high_priority': 0,
+                       'send_retries': 0,
+                       'sends_expired': 0,
+                       'sends_cancelled': 0}
+
+        # Written by any thread, when the backlog is full
+        self._rejected = 0
+        self._rejected_lock = Lock()
+
+        # Time from queued to written (sent), per lane
+        self._waits = [DWX_ZMQ_Latency_Histogram(_significant_bits) for _ in LANES]
+
+        self._Sender_Thread = Thread(target=self._DWX_ZMQ_Send_Loop_, daemon=True)
+        self._Sender_Thread.start()
+
+    ##########################################################################
+
+    """
+    Queue a command (any thread). _register() is called on the sender thread
+    just before it is written, and _discard(WHAT _register() RETURNED, or
+    None) if it is not written after all. _expiry: seconds it may wait
+    (None: _open_expiry for OPENs, forever for others). Returns False if the
+    backlog is full or the sender is stopped.
+    """
+    def _send_(self, _msg, _register=None, _discard=None, _expiry=None):
+
+        if not self._ACTIVE:
+            return False
+
+        _lane, _opens = _classify_(_msg)
+        _queue = self._lanes[_lane]
+
+        # Checked without a lock: a few commands may go past the limit
+        if self._max_queued is not None and len(_queue) >= self._max_queued:
+            with self._rejected_lock:
+                self._rejected += 1
+            return False
+
+        # A stale OPEN is worse than none
+        if _expiry is None and _opens:
+            _expiry = self._open_expiry
+
+        _symbols = ()
+        if _opens and self._pacer is not None and self._pacer._symbol_rate is not None:
+            _symbols = _symbols_(_msg)
+
+        _request_id = _request_id_(_msg)
+
+        if _request_id is not None:
+            with self._ids_lock:
+                self._queued_ids.add(_request_id)
+
+        _now = perf_counter_ns()
+        _expires = None if _expiry is None else _now + int(_expiry * 1e9)
+
+        _action = None
+        if _expires is not None and self._pacer is not None and self._pacer._adaptive:
+            _action = _action_(_msg)
+
+        # deque.append() is atomic: no lock
+        _queue.append((_msg, _now, _expires, _register, _discard, _symbols, _request_id,
+                       _action))
+
+        # An Event set while the thread is draining is cleared before it
+        # drains again, so the command cannot be left behind
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+        return True
+
+    ##########################################################################
+
+    """
+    Withdraw the queued command tagged with _request_id (any thread). Returns
+    True if it will not be written, False if it already was (or is unknown).
+    """
+    def _cancel_(self, _request_id):
+
+        with self._ids_lock:
+
+            if _request_id not in self._queued_ids:
+                return False
+
+            self._cancelled_ids.add(_request_id)
+
+        # Woken up from a pacing wait, so that it is dropped right away
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+        return True
+
+    def _dequeued_(self, _queued):
+
+        # Sender thread: True if the command taken off its lane was cancelled
+        if _queued[6] is None:
+            return False
+
+        with self._ids_lock:
+            self._queued_ids.discard(_queued[6])
+            if _queued[6] in self._cancelled_ids:
+                self._cancelled_ids.discard(_queued[6])
+                return True
+
+        return False
+
+    def _is_cancelled_(self, _queued):
+        return _queued[6] is not None and _queued[6] in self._cancelled_ids
+
+    ##########################################################################
+
+    def _DWX_ZMQ_Send_Loop_(self):
+
+        _high, _normal = self._lanes
+
+        # Command the pacer is holding back (counted once)
+        _held = None
+
+        while True:
+
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            while _high or _normal:
+
+                # Stopping: what is still queued after the deadline is given
+                # up on, whatever it waits for
+                if (self._stop_deadline is not None
+                        and perf_counter_ns() >= self._stop_deadline):
+                    while _high or _normal:
+                        self._stats['sends_dropped'] += 1
+                        self._give_up_((_high or _normal).popleft())
+                    break
+
+                _lane = 0 if _high else 1
+                _queue = self._lanes[_lane]
+                _expires = _queue[0][2]
+
+                if self._is_cancelled_(_queue[0]):
+                    self._stats['sends_cancelled'] += 1
+                    self._give_up_(_queue.popleft())
+                    continue
+
+                # Also if it could not be answered before expiring (by its
+                # action's mean round trip, at most half of the time it may
+                # wait)
+                if _expires is not None and perf_counter_ns() + (
+                        0 if _queue[0][7] is None else
+                        min(self._pacer._rtt_ns.get(_queue[0][7], 0),
+                            (_expires - _queue[0][1]) // 2)) >= _expires:
+                    self._stats['sends_expired'] += 1
+                    if self._pacer is not None and _lane == 1:
+                        self._pacer._queued_(None)
+                    self._give_up_(_queue.popleft())
+                    continue
+
+                if self._pacer is not None and _lane == 1:
+
+                    _wait = self._pacer._delay_(_queue[0][5], _queue[0] is _held)
+                    _held = _queue[0] if _wait > 0 else None
+
+                    # Until a token is due, a close is queued, or the stop
+                    # deadline
+                    if _wait > 0:
+                        self._wakeup.clear()
+                        if self._stop_deadline is not None:
+                            _wait = min(_wait, max(self._stop_deadline - perf_counter_ns(), 0) / 1e9)
+                        if not _high:
+                            self._wakeup.wait(_wait)
+                        continue
+
+                # Not writable (SNDHWM 1: the previous command is not
+                # acknowledged yet, or the terminal is not reading): the
+                # lanes are the backlog. Wait for POLLOUT without taking the
+                # command, so that a close queued meanwhile still goes first.
+                if not self._socket.getsockopt(zmq.EVENTS) & zmq.POLLOUT:
+
+                    self._stats['send_retries'] += 1
+                    self._socket.poll(_POLL_MS, zmq.POLLOUT)
+                    continue
+
+                _queued = _queue.popleft()
+
+                # Last check: cancelled since the head was looked at
+                if self._dequeued_(_queued):
+                    self._stats['sends_cancelled'] += 1
+                    self._give_up_(_queued)
+                    continue
+
+                self._write_(_lane, _queued)
+
+            if not self._ACTIVE and not (_high or _normal):
+                break
+
+    def _give_up_(self, _queued):
+
+        # A command that is not going to be written, never registered
+        self._dequeued_(_queued)
+
+        if _queued[4] is not None:
+            _queued[4](None)
+
+    def _write_(self, _lane, _queued):
+
+        _msg, _queued_ns, _, _register, _discard, _symbols, _, _ = _queued
+
+        # Registered before sending so the response cannot arrive first,
+        # and in the order sent, which the terminal answers in (what matches
+        # responses in order: latency, trades book, HIST / DATA formats)
+        _sent = self._on_send(_msg) if self._on_send is not None else None
+        _registered = _register() if _register is not None else None
+
+        # Only written once POLLOUT is reported, so no other writer can
+        # fill the socket first
+        try:
+            self._socket.send_string(_msg, zmq.DONTWAIT)
+
+        except Exception as ex:
+
+            self._stats['sends_dropped'] += 1
+
+            if self._on_dropped is not None:
+                self._on_dropped(_sent)
+            if _discard is not None:
+                _discard(_registered)
+
+            _exstr = "Exception Type {0}. Args:\n{1!r}"
+            print(_exstr.format(type(ex).__name__, ex.args))
+            return
+
+        _wait = perf_counter_ns() - _queued_ns
+
+        self._stats['sends'] += 1
+        self._waits[_lane].record(_wait)
+
+        if self._pacer is not None:
+            self._pacer._take_(_symbols)
+            if _lane == 1:
+                self._pacer._queued_(_wait)
+
+        if _lane == 0:
+            self._stats['sends_high_priority'] += 1
+
+    ##########################################################################
+
+    """
+    Commands waiting per lane
+    """
+    def _queue_depths_(self):
+        return [len(_lane) for _lane in self._lanes]
+
+    def _get_stats_(self):
+
+        _stats = dict(self._stats)
+        _stats['sends_rejected'] = self._rejected
+
+        for _name, _depth in zip(LANES, self._queue_depths_()):
+            _stats['send_queue_' + _name] = _depth
+
+        _stats['send_wait'] = {_name: _waits.snapshot()
+                               for _name, _waits in zip(LANES, self._waits)}
+
+        return _stats
+
+    ##########################################################################
+
+    """
+    Write what is queued, giving up on what the socket has not taken after
+    _timeout seconds, then stop the sender thread
+    """
+    def _stop_(self, _timeout=5.0):
+
+        if not self._ACTIVE:
+            return
+
+        self._stop_deadline = perf_counter_ns() + int(_timeout * 1e9)
+        self._ACTIVE = False
+        self._wakeup.set()
+
+        # Past the deadline it drops what is left within a socket poll
+        self._Sender_Thread.join(_timeout + 2 * _POLL_MS / 1e3)
+
+    ##########################################################################
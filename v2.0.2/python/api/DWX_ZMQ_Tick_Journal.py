@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Tick_Journal.py
+    --
+    Append-only record of every SUB message in memory-mapped segment files,
+    one sequence per topic and UTC day, for replaying incidents.
+
+    Usage:
+        _zmq = DWX_ZeroMQ_Connector(_tick_journal='journal')
+        for _seq, _time_ns, _payload in DWX_ZMQ_Tick_Journal.read(_file): ...
+        for _seq, _time_ns, _topic, _payload in DWX_ZMQ_Tick_Journal.replay('journal', '2019-01-04'): ...
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import mmap
+import heapq
+import struct
+from glob import glob, escape
+from time import monotonic, time_ns
+from datetime import datetime, timezone
+
+##############################################################################
+
+JOURNAL_MAGIC = b'DWXJ'
+JOURNAL_VERSION = 1
+
+# <path>/2019-01-04/EURUSD.0000.dwxj, preallocated, truncated to its used
+# size when closed: header (magic, version, entry header size, creation
+# time ns), then entries (seq, receive time ns since epoch UTC, payload
+# size) each followed by the payload. seq counts messages across topics
+# from 1 (0: unused space) and carries on when the journal is reopened.
+_SEGMENT_HEADER = struct.Struct('<4sHHq')
+_ENTRY = struct.Struct('<QqI')
+
+_NS_PER_DAY = 86400 * 10**9
+
+_pack_entry = _ENTRY.pack_into
+
+##############################################################################
+
+class DWX_ZMQ_Journal_Segment():
+
+    """
+    One preallocated, memory-mapped segment file
+    """
+    __slots__ = ('_file', '_size', '_mmap', '_offset', '_limit', '_start_ns', '_end_ns')
+
+    def __init__(self, _file, _day, _size):
+
+        self._file = _file
+        self._size = _size
+
+        # Receive times it takes ([_start_ns, _end_ns), its UTC day)
+        self._start_ns = _day * _NS_PER_DAY
+        self._end_ns = self._start_ns + _NS_PER_DAY
+
+        with open(_file, 'x+b') as _handle:
+            _handle.truncate(_size)
+            self._mmap = mmap.mmap(_handle.fileno(), _size)
+
+        _SEGMENT_HEADER.pack_into(self._mmap, 0, JOURNAL_MAGIC, JOURNAL_VERSION,
+                                  _ENTRY.size, time_ns())
+
+        # Next entry's offset, and last offset a payload may end at
+        self._offset = _SEGMENT_HEADER.size
+        self._limit = _size - _ENTRY.size
+
+    ##########################################################################
+
+    def _flush_(self):
+        self._mmap.flush()
+
+    def _close_(self):
+
+        # Drops the unused, zero-filled end of the file
+        self._mmap.flush()
+        self._mmap.close()
+
+        with open(self._file, 'r+b') as _handle:
+            _handle.truncate(self._offset)
+
+##############################################################################
+
+class DWX_ZMQ_Tick_Journal():
+
+    """
+    Per-topic, per-day segments of raw SUB payloads
+    """
+    def __init__(self, _path, _segment_size=64 * 2**20, _flush_interval=1.0):
+
+        if _segment_size < _SEGMENT_HEADER.size + _ENTRY.size:
+            raise ValueError('Segment size must be at least {} bytes, got {}'.format(
+                _SEGMENT_HEADER.size + _ENTRY.size, _segment_size))
+
+        self._path = _path
+        self._segment_size = _segment_size
+        self._flush_interval = _flush_interval
+
+        # {TOPIC (str or bytes, as given to _append_): open segment}
+        self._segments = {}
+
+        os.makedirs(_path, exist_ok=True)
+
+        # Last sequence number used (continuing the journal's), at opening
+        # and at last flush
+        self._seq = self._start_seq = self._last_seq_(_path)
+        self._flushed_seq = self._seq
+        self._last_flush = monotonic()
+
+        self._stats = {'segments': 0,    # segments opened
+                       'flushes': 0}
+
+    ##########################################################################
+
+    def _append_(self, _topic, _payload, _time_ns):
+
+        # _payload: bytes-like (bytes, bytearray, memoryview)
+        _segment = self._segments.get(_topic)
+        _n = len(_payload)
+
+        if (_segment is None or not _segment._start_ns <= _time_ns < _segment._end_ns
+                or _segment._offset + _n > _segment._limit):
+            _segment = self._rotate_(_topic, _time_ns // _NS_PER_DAY, _n)
+
+        self._seq = _seq = self._seq + 1
+        _offset = _segment._offset
+        _mmap = _segment._mmap
+        _pack_entry(_mmap, _offset, _seq, _time_ns, _n)
+        _offset += _ENTRY.size
+        _segment._offset = _offset + _n
+        _mmap[_offset:_offset + _n] = _payload
+
+    ##########################################################################
+
+    def _rotate_(self, _topic, _day, _n):
+
+        # Closes _topic's segment, opens the next one of day _day
+        _previous = self._segments.pop(_topic, None)
+        if _previous is not None:
+            _previous._close_()
+
+        _name = (_topic.decode() if isinstance(_topic, (bytes, bytearray)) else _topic)
+        _name = _name.replace('/', '_').replace('\\', '_')
+        _dir = os.path.join(self._path, self._day_name_(_day))
+        os.makedirs(_dir, exist_ok=True)
+
+        # Never appends to an existing file (e.g. after a restart)
+        _index = len(glob(os.path.join(escape(_dir), escape(_name) + '.*.dwxj')))
+
+        while True:
+            _file = os.path.join(_dir, '{}.{:04d}.dwxj'.format(_name, _index))
+            try:
+                _segment = DWX_ZMQ_Journal_Segment(
+                    _file, _day, max(self._segment_size, _SEGMENT_HEADER.size + _ENTRY.size + _n))
+                break
+            except FileExistsError:
+                _index += 1
+
+        self._segments[_topic] = _segment
+        self._stats['segments'] += 1
+
+        return _segment
+
+    ##########################################################################
+
+    def _flush_(self, _force=False):
+
+        # msync() of every open segment, at most every _flush_interval s
+        if self._seq == self._flushed_seq:
+            return
+
+        _now = monotonic()
+
+        if not _force and _now - self._last_flush < self._flush_interval:
+            return
+
+        for _segment in self._segments.values():
+            _segment._flush_()
+
+        self._stats['flushes'] += 1
+        self._flushed_seq = self._seq
+        self._last_flush = _now
+
+    ##########################################################################
+
+    def _close_(self):
+
+        self._flush_(_force=True)
+
+        for _segment in self._segments.values():
+            _segment._close_()
+
+        self._segments.clear()
+
+    ##########################################################################
+
+    def _get_stats_(self):
+
+        _stats = dict(self._stats)
+        _stats['entries'] = self._seq - self._start_seq
+        _stats['open_segments'] = len(self._segments)
+
+        return _stats
+
+    ##########################################################################
+
+    @staticmethod
+    def _day_name_(_day):
+        return datetime.fromtimestamp(_day * 86400, timezone.utc).strftime('%Y-%m-%d')
+
+    ##########################################################################
+
+    @staticmethod
+    def _last_seq_(_path):
+
+        # Highest seq in the last segment of each topic of the latest day
+        # (0 for a new journal)
+        _days = sorted(_dir for _dir in os.listdir(_path)
+                       if os.path.isdir(os.path.join(_path, _dir)))
+
+        for _day in reversed(_days):
+
+            _last = {}
+
+            for _file in sorted(glob(os.path.join(escape(os.path.join(_path, _day)), '*.dwxj'))):
+                _last[os.path.basename(_file).rsplit('.', 2)[0]] = _file
+
+            _seq = 0
+
+            for _file in _last.values():
+                for _entry_seq, _, _ in DWX_ZMQ_Tick_Journal.read(_file):
+                    _seq = max(_seq, _entry_seq)
+
+            if _seq:
+                return _seq
+
+        return 0
+
+    ##########################################################################
+
+    @staticmethod
+    def read(_file):
+
+        # (SEQ, RECEIVE TIME (ns), PAYLOAD) of every entry in one segment,
+        # which may still be open for writing
+        with open(_file, 'rb') as _handle:
+            _data = _handle.read()
+
+        if len(_data) < _SEGMENT_HEADER.size:
+            return
+
+        _magic, _version, _entry_size, _ = _SEGMENT_HEADER.unpack_from(_data, 0)
+
+        if _magic != JOURNAL_MAGIC or _version != JOURNAL_VERSION or _entry_size != _ENTRY.size:
+            raise ValueError('{} is not a version {} tick journal segment'.format(
+                _file, JOURNAL_VERSION))
+
+        _offset = _SEGMENT_HEADER.size
+
+        while _offset + _ENTRY.size <= len(_data):
+
+            _seq, _time_ns, _n = _ENTRY.unpack_from(_data, _offset)
+
+            # Zero-filled, unused end
+            if _seq == 0:
+                return
+
+            _offset += _ENTRY.size
+            yield _seq, _time_ns, _data[_offset:_offset + _n]
+            _offset += _n
+
+    ##########################################################################
+
+    @staticmethod
+    def replay(_path, _day, _topics=None):
+
+        # (SEQ, RECEIVE TIME (ns), TOPIC, PAYLOAD) of one day ('%Y-%m-%d'),
+        # in arrival order across topics (all topics if _topics is None)
+        _segments = {}
+
+        for _file in sorted(glob(os.path.join(escape(os.path.join(_path, _day)), '*.dwxj'))):
+            _topic = os.path.basename(_file).rsplit('.', 2)[0]
+            if _topics is None or _topic in _topics:
+                _segments.setdefault(_topic, []).append(_file)
+
+        def _entries(_topic, _files):
+            for _file in _files:
+                for _seq, _time_ns, _payload in DWX_ZMQ_Tick_Journal.read(_file):
+                    yield _seq, _time_ns, _topic, _payload
+
+        return heapq.merge(*(_entries(_topic, _files) for _topic, _files in _segments.items()))
+
+##############################################################################
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZMQ_Trades_Book.py
+    --
+    Local book of open trades, kept up to date from the responses to the
+    connector's own commands and reconciled with GET_OPEN_TRADES snapshots.
+
+    Usage:
+        _book = _zmq._Trades_Book
+        if _book._due_():
+            _zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()   # response reconciles it
+        _book.select(_comment='Trader_EURUSD')
+        {85051741: {'_magic': 123456, '_symbol': 'EURUSD', '_lots': 0.01,
+                    '_type': 0, '_open_price': 1.10651, ...}}
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2017-2019, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+##############################################################################
+
+# Fields looked up through an index
+_INDEXED = ('_magic', '_symbol', '_comment')
+
+# Responses changing the book, all others are ignored: EXECUTION (new
+# trade), CLOSE (closed, or NOT_FOUND; a CLOSE_PARTIAL remainder is
+# re-opened under a new ticket), MODIFY (new SL / TP), CLOSE_ALL(_MAGIC),
+# OPEN_TRADES (snapshot, replaces the book) and TRADE_BATCH (each result)
+_BOOK_ACTIONS = frozenset(('EXECUTION', 'CLOSE', 'MODIFY', 'CLOSE_ALL_MAGIC',
+                           'CLOSE_ALL', 'OPEN_TRADES', 'TRADE_BATCH'))
+
+##############################################################################
+
+class DWX_ZMQ_Trades_Index():
+
+    """
+    Trades by ticket, indexed by magic number, symbol and comment
+    """
+    def __init__(self):
+
+        # {TICKET: {'_magic', '_symbol', '_lots', '_type', ...}}
+        self._trades = {}
+
+        # {FIELD: {VALUE: set(TICKETS)}}
+        self._indexes = {_field: {} for _field in _INDEXED}
+
+    def __len__(self):
+        return len(self._trades)
+
+    def __contains__(self, _ticket):
+        return _ticket in self._trades
+
+    ##########################################################################
+
+    def _put_(self, _ticket, _trade):
+
+        self._pop_(_ticket)
+        self._trades[_ticket] = _trade
+
+        for _field, _index in self._indexes.items():
+            _value = _trade.get(_field)
+            _tickets = _index.get(_value)
+            if _tickets is None:
+                _tickets = _index[_value] = set()
+            _tickets.add(_ticket)
+
+    def _pop_(self, _ticket):
+
+        _trade = self._trades.pop(_ticket, None)
+
+        if _trade is None:
+            return None
+
+        for _field, _index in self._indexes.items():
+            _value = _trade.get(_field)
+            _tickets = _index.get(_value)
+            if _tickets is not None:
+                _tickets.discard(_ticket)
+                if not _tickets:
+                    del _index[_value]
+
+        return _trade
+
+    def _update_(self, _ticket, _fields):
+
+        # Changes fields that are not indexed (e.g. _lots, _SL, _TP)
+        _trade = self._trades.get(_ticket)
+
+        if _trade is not None:
+            _trade.update(_fields)
+
+        return _trade
+
+    def _replace_(self, _trades):
+
+        # Starts over from a snapshot ({TICKET: TRADE})
+        self._trades = {}
+        self._indexes = {_field: {} for _field in _INDEXED}
+
+        for _ticket, _trade in _trades.items():
+            self._put_(_ticket, dict(_trade))
+
+    ##########################################################################
+
+    def select(self, _magic=None, _symbol=None, _comment=None):
+
+        # {TICKET: TRADE (copy)} matching all the fields given, by ticket
+        _tickets = None
+
+        for _field, _value in (('_magic', _magic),
+                               ('_symbol', _symbol),
+                               ('_comment', _comment)):
+
+            if _value is None:
+                continue
+
+            _matches = self._indexes[_field].get(_value)
+
+            if not _matches:
+                return {}
+
+            _tickets = set(_matches) if _tickets is None else _tickets & _matches
+
+        if _tickets is None:
+            _tickets = self._trades
+
+        return {_ticket: dict(self._trades[_ticket]) for _ticket in sorted(_tickets)}
+
+##############################################################################
+
+class DWX_ZMQ_Trades_Book():
+
+    """
+    Open trades, updated from the responses to this client's commands
+    """
+    def __init__(self, _request_ids=False, _reconcile_interval=5.0, _max_pending=10000):
+
+        self._request_ids = _request_ids
+
+        # Seconds between snapshots (None: only when the book is stale).
+        # Stops and limits hit, pending orders filled and trades of other
+        # clients never produce a response here, and new trades lack their
+        # SL / TP as prices and P&L until the next snapshot.
+        self._reconcile_interval = _reconcile_interval
+
+        self._trades = DWX_ZMQ_Trades_Index()
+
+        # OPEN commands waiting for their EXECUTION response: {REQUEST ID:
+        # [FIELDS]} (several for a TRADE_BATCH), or deque([FIELDS]) in send
+        # order
+        self._opening = {}
+        self._opening_queue = deque(maxlen=_max_pending)
+        self._max_pending = _max_pending
+
+        # monotonic() of the last snapshot, and whether the book is known to
+        # have missed a change since
+        self._reconciled = None
+        self._stale = True
+
+        self._reconciles = 0
+
+        # The poll thread writes, strategy threads read
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._trades)
+
+    ##########################################################################
+
+    def _sent_(self, _msg):
+
+        # _msg as sent: [@REQUEST_ID;]TRADE;OPEN;TYPE;SYMBOL;PRICE;SL;TP;
+        # COMMENT;LOTS;MAGIC;TICKET or TRADE_BATCH;COUNT|OPEN;TYPE;...|...
+        # Returns what _discard_() needs if it could not be sent after all
+        # (None for commands opening nothing).
+        _request_id = None
+
+        if _msg[0] == '@':
+            _request_id, _, _msg = _msg[1:].partition(';')
+
+        if _msg.startswith('TRADE;OPEN;'):
+            _openings = [self._opening_(_msg[6:])]
+        elif _msg.startswith('TRADE_BATCH;'):
+            _openings = [self._opening_(_item) for _item in _msg.split('|')[1:]
+                         if _item.startswith('OPEN;')]
+        else:
+            return None
+
+        # Malformed OPENs are not answered with an EXECUTION either
+        _openings = [_opening for _opening in _openings if _opening is not None]
+
+        if not _openings:
+            return None
+
+        with self._lock:
+
+            if _request_id is not None:
+                _request_id = int(_request_id)
+                if len(self._opening) >= self._max_pending:
+                    del self._opening[next(iter(self._opening))]
+                self._opening[_request_id] = _openings
+                return _request_id, _openings
+
+            self._opening_queue.extend(_openings)
+
+            return None, _openings
+
+    def _opening_(self, _command):
+
+        # Fields of OPEN;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;TICKET
+        # that the EXECUTION response lacks (None if malformed)
+        _fields = _command.split(';')
+
+        try:
+            return {'_magic': int(_fields[8]),
+                    '_symbol': _fields[2],
+                    '_lots': float(_fields[7]),
+                    '_type': int(_fields[1]),
+                    '_comment': _fields[6]}
+        except (IndexError, ValueError):
+            return None
+
+    def _discard_(self, _sent):
+
+        # Forgets OPEN commands _sent_() registered, which were not sent
+        _request_id, _openings = _sent
+
+        with self._lock:
+            if _request_id is not None:
+                self._opening.pop(_request_id, None)
+            else:
+                for _opening in _openings:
+                    try:
+                        self._opening_queue.remove(_opening)
+                    except ValueError:
+                        pass
+
+    ##########################################################################
+
+    def _received_(self, _data):
+
+        # _data: a parsed response, in the order received. The Expert
+        # Advisor answers commands in the order it executes them, so this
+        # keeps the book consistent with the terminal, snapshots included.
+        if not isinstance(_data, dict):
+            return
+
+        _action = _data.get('_action')
+
+        if _action not in _BOOK_ACTIONS:
+            return
+
+        with self._lock:
+
+            # With request IDs, the OPENs answered by this response
+            _openings = None
+
+            if (self._request_ids and '_request_id' in _data
+                    and _action in ('EXECUTION', 'TRADE_BATCH')):
+                _openings = deque(self._opening.pop(_data['_request_id'], ()))
+
+            if _action != 'TRADE_BATCH':
+                self._apply_(_action, _data, _openings)
+
+            elif '_results' in _data:
+                for _result in _data['_results']:
+                    if isinstance(_result, dict):
+                        self._apply_(_result.get('_action'), _result, _openings)
+
+            elif _openings is None:
+                # Batch not executed: its OPENs cannot be told from others
+                self._opening_queue.clear()
+                self._stale = True
+
+    def _apply_(self, _action, _data, _openings):
+
+        # Called with the lock held
+        if _action == 'EXECUTION':
+            self._execution_(_data, _openings)
+
+        elif _action == 'CLOSE':
+
+            _response = _data.get('_response')
+
+            if _response == 'CLOSE_PARTIAL':
+                # The remainder's new ticket is not in the response
+                if '_close_price' in _data:
+                    self._trades._pop_(_data.get('_ticket'))
+                self._stale = True
+
+            elif _response in ('CLOSE_MARKET', 'CLOSE_PENDING', 'NOT_FOUND'):
+                self._trades._pop_(_data.get('_ticket'))
+
+        elif _action == 'MODIFY':
+            # SL / TP are reported in points; prices come with the next
+            # snapshot
+            if '_sl' in _data:
+                self._trades._update_(_data.get('_ticket'), {'_SL': None, '_TP': None})
+
+        elif _action in ('CLOSE_ALL_MAGIC', 'CLOSE_ALL'):
+
+            for _ticket, _closed in _data.get('_responses', {}).items():
+                if _closed.get('_response') in ('CLOSE_MARKET', 'CLOSE_PENDING'):
+                    self._trades._pop_(_ticket)
+
+        elif _action == 'OPEN_TRADES' and '_trades' in _data:
+            self._trades._replace_(_data['_trades'])
+            self._reconciled = monotonic()
+            self._stale = False
+            self._reconciles += 1
+
+    def _execution_(self, _data, _openings=None):
+
+        # Called with the lock held
+        if _openings is not None:
+            _opening = _openings.popleft() if _openings else None
+        else:
+            _opening = self._opening_queue.popleft() if self._opening_queue else None
+
+        # Failed OPENs have no ticket (except for ERROR_SETTING_SL_TP: the
+        # trade is open, without its stops)
+        if '_ticket' not in _data:
+            return
+
+        if _opening is None:
+            _opening = {'_magic': _data.get('_magic')}
+            self._stale = True
+
+        # Fields in the order of OPEN_TRADES
+        _trade = {'_magic': _opening['_magic'],
+                  '_symbol': _opening.get('_symbol'),
+                  '_lots': _opening.get('_lots'),
+                  '_type': _opening.get('_type'),
+                  '_open_price': _data.get('_open_price'),
+                  '_open_time': _data.get('_open_time'),
+                  '_SL': None,
+                  '_TP': None,
+                  '_pnl': None,
+                  '_comment': _opening.get('_comment')}
+
+        self._trades._put_(_data['_ticket'], _trade)
+
+    ##########################################################################
+
+    def _due_(self):
+
+        # True if the book should be reconciled with a snapshot first
+        with self._lock:
+
+            if self._stale or self._reconciled is None:
+                return True
+
+            return (self._reconcile_interval is not None
+                    and monotonic() - self._reconciled >= self._reconcile_interval)
+
+    def _invalidate_(self):
+
+        # Forces a snapshot before the book is used again
+        with self._lock:
+            self._stale = True
+
+    ##########################################################################
+
+    def select(self, _magic=None, _symbol=None, _comment=None):
+
+        # {TICKET: {'_magic', '_symbol', '_lots', '_type', '_open_price',
+        # '_open_time', '_SL', '_TP', '_pnl', '_comment'}} of the open trades
+        # matching all the fields given
+        with self._lock:
+            return self._trades.select(_magic, _symbol, _comment)
+
+    def get(self, _ticket):
+
+        with self._lock:
+            _trade = self._trades._trades.get(_ticket)
+            return None if _trade is None else dict(_trade)
+
+##############################################################################
@@ -17,9 +17,34 @@
 # IMPORT zmq library
 # import zmq, time
 import zmq
-from time import sleep
-from pandas import DataFrame, Timestamp
-from threading import Thread
+import numpy as np
+from time import sleep, time_ns, perf_counter_ns, monotonic
+from array import array
+from pandas import DataFrame, Timestamp, to_datetime
+from threading import Thread, Lock, Condition, current_thread
+from itertools import count
+from collections import deque
+from functools import partial
+from concurrent.futures import Future
+from api.DWX_ZMQ_Parser import DWX_ZMQ_Parser
+from api.DWX_ZMQ_Market_Data_DB import DWX_ZMQ_Market_Data_DB
+from api.DWX_ZMQ_Latency import DWX_ZMQ_Latency_Tracker
+from api.DWX_ZMQ_Trades_Book import DWX_ZMQ_Trades_Book
+from api.DWX_ZMQ_Orders import DWX_ZMQ_Order
+from api.DWX_ZMQ_Sender import DWX_ZMQ_Sender
+from api.DWX_ZMQ_Pacer import DWX_ZMQ_Pacer
+from api.DWX_ZMQ_Metrics_Exporter import DWX_ZMQ_Metrics_Exporter
+from api.DWX_ZMQ_Dispatcher import DWX_ZMQ_Dispatcher
+from api.DWX_ZMQ_History import DWX_ZMQ_Hist_Buffer, DWX_ZMQ_Hist_Decoder
+from api.DWX_ZMQ_History_Cache import DWX_ZMQ_History_Cache
+from api.DWX_ZMQ_Tick_Journal import DWX_ZMQ_Tick_Journal
+from api.DWX_ZMQ_Binary_Format import DWX_ZMQ_Binary_Format, BINARY_MAGIC, KIND_TICK, KIND_RATE
+
+# Commands that can be sent in a TRADE_BATCH
+TRADE_BATCH_ACTIONS = ('OPEN', 'MODIFY', 'CLOSE', 'CLOSE_PARTIAL')
+
+# Max. ms the poll thread waits for data, between checks of _ACTIVE
+_POLL_TIMEOUT = 250
 
 class DWX_ZeroMQ_Connector():
 
@@ -36,7 +61,33 @@ class DWX_ZeroMQ_Connector():
                  _delimiter=';',
                  _pulldata_handlers = [],    # Handlers to process data received through PULL port.
                  _subdata_handlers = [],     # Handlers to process data received through SUB port.
-                 _verbose=False):           # String delimiter           
+                 _verbose=False,             # String delimiter
+                 _request_ids=False,         # Tag commands with a request ID echoed back by the server
+                 _tick_capacity=200000,      # Ticks kept per symbol in _Market_Data_DB
+                 _rate_capacity=10000,       # Rates kept per instrument in _Market_Data_DB
+                 _batch_budget=1000,         # Max. messages read per socket per poll wakeup
+                 _handler_workers=0,         # Threads running handlers (0: run them in the poll thread)
+                 _handler_queue_size=10000,  # Events queued per handler thread
+                 _handler_overflow='drop_oldest', # SUB events when a queue is full, see DWX_ZMQ_Dispatcher
+                 _conflate=False,            # Handlers only get the latest pending tick per symbol
+                 _zero_copy=False,           # Parse SUB frames in place (also accepts [TOPIC, PAYLOAD] frames)
+                 _binary=False,              # Accept binary SUB records (DWX_ZMQ_Binary_Format) besides text
+                 _history_cache=None,        # Directory for the HIST cache (None: no cache)
+                 _history_storage='npy',     # 'npy' (memory-mapped) or 'parquet', see DWX_ZMQ_History_Cache
+                 _tick_journal=None,         # Directory recording every SUB message (None: no journal)
+                 _journal_segment_size=64 * 2**20, # Bytes per journal segment file
+                 _journal_flush_interval=1.0,      # Min. seconds between journal msync()s
+                 _latency_stats=True,        # Round-trip histograms per command action, see latency_snapshot()
+                 _trades_book=True,          # Keep open trades locally from responses, see DWX_ZMQ_Trades_Book
+                 _reconcile_interval=5.0,    # Seconds before the trades book is due for a full snapshot
+                 _send_backlog=10000,        # Commands queued per send lane (None: no limit)
+                 _open_expiry=1.0,           # Seconds an OPEN may wait to be sent (None: forever)
+                 _pace_rate=None,            # Commands/s sent (None: no pacing), see DWX_ZMQ_Pacer
+                 _pace_burst=10,             # Commands sent back to back at most when pacing
+                 _pace_symbol_rate=None,     # OPENs/s per symbol (None: no limit)
+                 _pace_adaptive=True,        # Adapt _pace_rate to round trips (needs _latency_stats)
+                 _metrics_port=None,         # Serve stats() in the Prometheus text format (None: off)
+                 _metrics_host='127.0.0.1'):
     
         # Strategy Status (if this is False, ZeroMQ will not listen for data)
         self._ACTIVE = True
@@ -96,55 +147,456 @@ class DWX_ZeroMQ_Connector():
         # BID/ASK Market Data Subscription Threads ({SYMBOL: Thread})
         self._MarketData_Thread = None
         
-        # Begin polling for PULL / SUB data
-        self._MarketData_Thread = Thread(target=self._DWX_ZMQ_Poll_Data_, args=(self._string_delimiter))
-        self._MarketData_Thread.start()
+        # Messages drained per socket on each poll wakeup, and loop counters
+        self._batch_budget = _batch_budget
+        self._poll_stats = {'wakeups': 0,           # poll() wakeups with data
+                            'messages': 0,          # messages received
+                            'last_batch': 0,        # messages in last wakeup
+                            'max_batch': 0,
+                            'budget_exhausted': 0,  # drains stopped by _batch_budget
+                            'last_loop_ns': 0,      # wakeup -> batch processed
+                            'max_loop_ns': 0,
+                            'total_loop_ns': 0,
+                            'pull_messages': 0,
+                            'pull_bytes': 0,        # (characters of text messages)
+                            'sub_messages': 0,
+                            'sub_bytes': 0,
+                            'handler_ns': 0}        # handlers run in the poll thread
+        
+        # Requests given up on (sends are counted by _Sender)
+        self._send_stats = {'requests_cancelled': 0}
+        
+        # stats() rates are over the time since its previous call (in any
+        # thread, e.g. the metrics exporter's), guarded by _stats_lock
+        self._started = monotonic()
+        self._stats_previous = (self._started, {})
+        self._stats_lock = Lock()
+        
+        # Zero-copy SUB path: frames are received into one reusable buffer
+        # and parsed in place ({TOPIC BYTES: SYMBOL ID} avoids decoding
+        # topics), ticks are staged in preallocated per-symbol (TIMESTAMP,
+        # BID, ASK) arrays until the end of each batch.
+        self._zero_copy = _zero_copy
+        self._rx_buffer = bytearray(4096)
+        self._rx_view = memoryview(self._rx_buffer)
+        self._rx_topics = {}
+        self._rx_symbols = []
+        self._rx_stages = []    # [SYMBOL ID] -> (TIMESTAMP, BID, ASK) arrays
+        self._rx_staged = []    # [SYMBOL ID] -> rows staged in this batch
+        
+        # Binary SUB records, decoded a batch at a time and grouped by topic
+        # ({TOPIC BYTES: SYMBOL}, decoded names)
+        self._binary = _binary
+        self._binary_symbols = {}
+        
+        # Local HIST cache, see _DWX_MTX_GET_HIST_CACHED_()
+        self._History_Cache = None
+        
+        if _history_cache is not None:
+            self._History_Cache = DWX_ZMQ_History_Cache(_history_cache, _history_storage)
+        
+        # Raw SUB messages, appended by the poll thread as they are read
+        # (see DWX_ZMQ_Tick_Journal for the file layout)
+        self._Tick_Journal = None
+        
+        if _tick_journal is not None:
+            self._Tick_Journal = DWX_ZMQ_Tick_Journal(_tick_journal,
+                                                      _journal_segment_size,
+                                                      _journal_flush_interval)
+        
+        # Command round trips, stamped by the sender and poll threads (see
+        # DWX_ZMQ_Latency)
+        self._Latency = None
+        
+        if _latency_stats:
+            self._Latency = DWX_ZMQ_Latency_Tracker(_request_ids)
+        
+        # Open trades, updated by the sender and poll threads from OPEN /
+        # CLOSE / MODIFY responses and GET_OPEN_TRADES snapshots
+        self._Trades_Book = None
+        
+        if _trades_book:
+            self._Trades_Book = DWX_ZMQ_Trades_Book(_request_ids, _reconcile_interval)
+        
+        # Handler threads (per-symbol ordering, bounded queues). Conflation
+        # needs at least one, so that ticks can be replaced while it is busy.
+        self._dispatcher = None
+        if _handler_workers > 0 or _conflate:
+            self._dispatcher = DWX_ZMQ_Dispatcher(max(_handler_workers, 1),
+                                                  _handler_queue_size,
+                                                  _handler_overflow,
+                                                  _conflate)
         
         # Market Data Dictionary by Symbol (holds tick data) or Instrument (holds OHLC data)
-        self._Market_Data_DB = {}   # {SYMBOL: {TIMESTAMP: (BID, ASK)}}
-                                    # {SYMBOL: {TIMESTAMP: (TIME, OPEN, HIGH, LOW, CLOSE, TICKVOL, SPREAD, VOLUME)}}
+        # ({SYMBOL: ring buffer}, see DWX_ZMQ_Market_Data_DB for columns)
+        self._Market_Data_DB = DWX_ZMQ_Market_Data_DB(_tick_capacity, _rate_capacity)
 
-        # Temporary Order STRUCT for convenience wrappers later.
-        self.temp_order_dict = self._generate_default_order_dict()
+        # Default order for the convenience wrappers, which send it with
+        # their own fields only (immutable, shared by all threads)
+        self._default_order = DWX_ZMQ_Order(**self._generate_default_order_dict())
         
-        # Thread returns the most recently received DATA block here
+        # Thread returns the most recently received DATA block here, and
+        # wakes up threads in _wait_response_()
         self._thread_data_output = None
+        self._response_condition = Condition()
         
         # Verbosity
         self._verbose = _verbose
         
+        # Request/response correlation ({REQUEST_ID: Future})
+        self._request_ids = _request_ids
+        self._request_counter = count(1)
+        self._pending_requests = {}
+        self._pending_lock = Lock()
+        
+        # HIST / DATA requests wanting column-oriented results ({REQUEST_ID:
+        # FORMAT}, or without request IDs {ACTION: deque([FORMAT or None])}
+        # in the order the responses will arrive)
+        self._columnar_requests = {}
+        
+        # Chunked HIST requests being received ({REQUEST_ID or (SYMBOL,
+        # TIMEFRAME): DWX_ZMQ_Hist_Buffer})
+        self._chunked_requests = {}
+        
+        # Guards _send_stats
+        self._send_lock = Lock()
+        
+        # Commands/s the terminal is sent, following its round trips
+        self._Pacer = None
+        
+        if _pace_rate is not None or _pace_symbol_rate is not None:
+            self._Pacer = DWX_ZMQ_Pacer(_pace_rate, _pace_burst,
+                                        _symbol_rate=_pace_symbol_rate,
+                                        _adaptive=_pace_adaptive and self._Latency is not None)
+        
+        # The only thread writing to the PUSH socket: remote_send() queues
+        # commands from any thread, closes ahead of the rest, and they wait
+        # there while the terminal is not reading (see DWX_ZMQ_Sender)
+        self._Sender = DWX_ZMQ_Sender(self._PUSH_SOCKET,
+                                      self._sent_,
+                                      self._not_sent_,
+                                      _send_backlog,
+                                      _open_expiry,
+                                      self._Pacer)
+        
+        # Prometheus endpoint for _get_stats_()
+        self._Metrics_Exporter = None
+        
+        if _metrics_port is not None:
+            self._Metrics_Exporter = DWX_ZMQ_Metrics_Exporter(self._get_stats_,
+                                                              _metrics_port,
+                                                              _metrics_host)
+        
+        # Begin polling for PULL / SUB data, last: the poll thread uses all
+        # of the above as soon as the first message arrives
+        self._MarketData_Thread = Thread(target=self._DWX_ZMQ_Poll_Data_, args=(self._string_delimiter))
+        self._MarketData_Thread.start()
+        
     ##########################################################################
     
     """
-    Set Status (to enable/disable strategy manually)
+    Set Status (to enable/disable strategy manually). Disabling shuts the
+    connector's threads down, see _DWX_ZMQ_SHUTDOWN_().
     """
     def _setStatus(self, _new_status=False):
     
-        self._ACTIVE = _new_status
         print("\n**\n[KERNEL] Setting Status to {} - Deactivating Threads.. please wait a bit.\n**".format(_new_status))
+        
+        if _new_status:
+            self._ACTIVE = True
+        else:
+            self._DWX_ZMQ_SHUTDOWN_()
+    
+    """
+    Function to stop the connector's threads: commands still queued are
+    sent first (closes ahead of the rest) while responses are received,
+    those the PUSH socket has not taken after _timeout seconds are dropped
+    and reported; then the poll thread, handler threads and metrics
+    endpoint are stopped.
+    """
+    def _DWX_ZMQ_SHUTDOWN_(self, _timeout=5.0):
+        
+        _dropped = self._Sender._stats['sends_dropped']
+        self._Sender._stop_(_timeout)
+        _dropped = self._Sender._stats['sends_dropped'] - _dropped
+        
+        if _dropped:
+            print("[KERNEL] {} queued command(s) could not be sent before shutdown".format(_dropped))
+        
+        # Poll thread exits within _POLL_TIMEOUT ms (unless shutting down
+        # from a handler it runs)
+        self._ACTIVE = False
+        
+        if (self._MarketData_Thread is not None
+                and self._MarketData_Thread is not current_thread()):
+            self._MarketData_Thread.join()
+        
+        if self._dispatcher is not None:
+            self._dispatcher._stop_()
+        
+        if self._Metrics_Exporter is not None:
+            self._Metrics_Exporter._stop_()
+            self._Metrics_Exporter = None
                 
     ##########################################################################
     
     """
-    Function to send commands to MetaTrader (PUSH)
+    Function to send commands to MetaTrader (PUSH). Commands are queued for
+    the sender thread, which owns the PUSH socket (_socket is kept for
+    compatibility); _register / _discard run there, _expiry overrides how
+    long the command may wait, see DWX_ZMQ_Sender. Returns False if the
+    send backlog is full.
     """
-    def remote_send(self, _socket, _data):
+    def remote_send(self, _socket, _data, _register=None, _discard=None, _expiry=None):
         
-        try:
-            _socket.send_string(_data, zmq.DONTWAIT)
-        except zmq.error.Again:
-            print("\nResource timeout.. please try again.")
-            sleep(0.000000001)
+        return self._Sender._send_(_data, _register, _discard, _expiry)
+    
+    def _sent_(self, _data):
+        
+        # Sender thread, just before _data is written
+        _sent = None
+        if self._Latency is not None:
+            _sent = self._Latency._sent_(_data, perf_counter_ns())
+        
+        _opening = None
+        if self._Trades_Book is not None:
+            _opening = self._Trades_Book._sent_(_data)
+        
+        return _sent, _opening
+    
+    def _not_sent_(self, _registered):
+        
+        # Sender thread, _data could not be written after all
+        _sent, _opening = _registered
+        
+        if _sent is not None:
+            self._Latency._discard_(_sent)
+        if _opening is not None:
+            self._Trades_Book._discard_(_opening)
       
     ##########################################################################
     
+    """
+    Function to send a command via PUSH, returning a Future for its response
+    if request IDs are enabled (None otherwise, False if the send backlog
+    is full or the connector is shut down). _format ('arrays' or
+    'dataframe') asks for a HIST / DATA response as columns. _expiry: seconds
+    the command may wait to be sent, e.g. the caller's timeout (None:
+    _open_expiry for OPENs, forever for others).
+    """
+    def _DWX_MTX_SEND_(self, _msg, _format=None, _expiry=None):
+        
+        if _format not in (None, 'arrays', 'dataframe'):
+            raise ValueError("Unknown format {!r}, expected 'arrays' or 'dataframe'".format(_format))
+        
+        if not self._request_ids:
+            
+            # Responses are matched in order, so HIST / DATA formats are
+            # queued in the order the requests are written. A command
+            # refused here never reaches the sender thread, so nothing was
+            # registered for it.
+            _action = _msg.split(';', 1)[0]
+            
+            if _action in ('HIST', 'DATA'):
+                _sent = self.remote_send(self._PUSH_SOCKET, _msg,
+                                         partial(self._queue_columnar_, _action, _format),
+                                         self._unqueue_columnar_, _expiry)
+            else:
+                _sent = self.remote_send(self._PUSH_SOCKET, _msg, _expiry=_expiry)
+            
+            return None if _sent else False
+        
+        _future = Future()
+        _future._request_id = next(self._request_counter)
+        
+        # Register before sending so the response cannot arrive first
+        with self._pending_lock:
+            self._pending_requests[_future._request_id] = _future
+            if _format is not None:
+                self._columnar_requests[_future._request_id] = _format
+        
+        if not self.remote_send(self._PUSH_SOCKET,
+                                "@{};{}".format(_future._request_id, _msg),
+                                _discard=partial(self._fail_request_, _future),
+                                _expiry=_expiry):
+            self._fail_request_(_future)
+        
+        return _future
+    
+    def _fail_request_(self, _future, _registered=None):
+        
+        # The request could not be sent
+        with self._pending_lock:
+            self._pending_requests.pop(_future._request_id, None)
+            self._columnar_requests.pop(_future._request_id, None)
+        
+        # (unless given up on meanwhile)
+        if not _future.done():
+            _future.set_exception(zmq.error.Again())
+    
+    def _queue_columnar_(self, _action, _format):
+        
+        # Sender thread: every HIST / DATA request takes a place in the
+        # queue (None: not columnar), so responses take their own request's
+        # _format
+        with self._pending_lock:
+            _queue = self._columnar_requests.setdefault(_action, deque())
+            _queue.append(_format)
+            return _queue
+    
+    def _unqueue_columnar_(self, _queue):
+        
+        # Sender thread, right after _queue_columnar_() for the same request
+        if _queue is not None:
+            with self._pending_lock:
+                _queue.pop()
+    
+    ##########################################################################
+    
+    """
+    Function to stop waiting for a request's response (e.g. after a timeout).
+    A command still queued is withdrawn, so it is not sent late; returns
+    False if it had been sent already.
+    """
+    def _DWX_MTX_CANCEL_REQUEST_(self, _future):
+        
+        _request_id = getattr(_future, '_request_id', None)
+        
+        _withdrawn = self._Sender._cancel_(_request_id)
+        
+        with self._pending_lock:
+            self._pending_requests.pop(_request_id, None)
+            self._columnar_requests.pop(_request_id, None)
+        
+        if self._Latency is not None:
+            
+            # Sent and unanswered: the round trip is at least the time since,
+            # which the pacer would never see otherwise
+            _rtt = self._Latency._cancel_(_request_id, perf_counter_ns())
+            if _rtt is not None and self._Pacer is not None and not _future.done():
+                self._Pacer._observe_(*_rtt, _unanswered=True)
+        
+        with self._send_lock:
+            self._send_stats['requests_cancelled'] += 1
+        
+        _future.cancel()
+        
+        return _withdrawn
+    
+    ##########################################################################
+    
+    """
+    Resolves the Future waiting for a response, if any
+    """
+    def _resolve_request_(self, _data):
+        
+        if not isinstance(_data, dict) or '_request_id' not in _data:
+            return
+        
+        with self._pending_lock:
+            _future = self._pending_requests.pop(_data['_request_id'], None)
+        
+        if _future is not None and _future.set_running_or_notify_cancel():
+            _future.set_result(_data)
+    
+    ##########################################################################
+    
+    """
+    Decodes a HIST / DATA response as columns if its request asked for it
+    (None otherwise). Responses the column decoder cannot read are parsed in
+    full and converted, so the result always has the format asked for
+    (unless it has no data, e.g. an error).
+    """
+    def _DWX_ZMQ_Decode_Columnar_(self, msg):
+        
+        _action, _request_id = DWX_ZMQ_Hist_Decoder.peek(msg)
+        
+        if _action is None:
+            return None
+        
+        with self._pending_lock:
+            if self._request_ids:
+                _format = self._columnar_requests.pop(_request_id, None)
+            else:
+                _queue = self._columnar_requests.get(_action)
+                _format = _queue.popleft() if _queue else None
+                if _queue is not None and not _queue:
+                    del self._columnar_requests[_action]
+        
+        if _format is None:
+            return None
+        
+        _data = DWX_ZMQ_Hist_Decoder.decode(msg)
+        
+        if _data is None:
+            _data = DWX_ZMQ_Parser.parse(msg)
+            
+            try:
+                if isinstance(_data.get('_data'), list):
+                    _data['_data'] = DWX_ZMQ_Hist_Decoder.from_bars(_data['_data'])
+                elif isinstance(_data.get('_data'), dict):
+                    _data['_data'] = DWX_ZMQ_Hist_Decoder.from_closes(_data['_data'])
+                else:
+                    return _data
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return _data
+        
+        if _format == 'dataframe':
+            _data['_data'] = DWX_ZMQ_Hist_Decoder.to_dataframe(_data['_data'])
+        
+        return _data
+    
+    ##########################################################################
+    
+    """
+    Appends a HIST_CHUNK to the buffer of its request, if any
+    """
+    def _DWX_ZMQ_Hist_Chunk_(self, _data):
+        
+        _key = _data.get('_request_id', (_data.get('_symbol'), _data.get('_timeframe')))
+        
+        with self._pending_lock:
+            _hist = self._chunked_requests.get(_key)
+        
+        if _hist is None:
+            return
+        
+        _hist._add_chunk_(_data)
+        
+        # Final chunk (or out of sequence): the request is over
+        if _hist.done:
+            with self._pending_lock:
+                if self._chunked_requests.get(_key) is _hist:
+                    del self._chunked_requests[_key]
+    
+    ##########################################################################
+    
     def _get_response_(self):
         return self._thread_data_output
     
     ##########################################################################
     
     def _set_response_(self, _resp=None):
-        self._thread_data_output = _resp
+        
+        with self._response_condition:
+            self._thread_data_output = _resp
+            self._response_condition.notify_all()
+    
+    ##########################################################################
+    
+    """
+    Function to wait (at most _timeout seconds, None: forever) until a valid
+    response is stored, e.g. after _set_response_(None) and sending a
+    command without request IDs. Returns it, or None on timeout.
+    """
+    def _wait_response_(self, _timeout=None):
+        
+        with self._response_condition:
+            if not self._response_condition.wait_for(lambda: self._valid_response_('zmq'),
+                                                     _timeout):
+                return None
+            
+            return self._thread_data_output
     
     ##########################################################################
     
@@ -182,93 +634,68 @@ class DWX_ZeroMQ_Connector():
     
     # Convenience functions to permit easy trading via underlying functions.
     
-    # OPEN ORDER
-    def _DWX_MTX_NEW_TRADE_(self, _order=None):
+    # OPEN ORDER (dict of _DWX_MTX_SEND_COMMAND_() arguments or DWX_ZMQ_Order),
+    # not sent if still queued after _expiry seconds (None: _open_expiry)
+    def _DWX_MTX_NEW_TRADE_(self, _order=None, _expiry=None):
         
         if _order is None:
-            _order = self._generate_default_order_dict()
+            _order = self._default_order
         
         # Execute
-        self._DWX_MTX_SEND_COMMAND_(**_order)
+        if isinstance(_order, DWX_ZMQ_Order):
+            return self._DWX_MTX_SEND_(_order._encode_(), _expiry=_expiry)
+        
+        return self._DWX_MTX_SEND_COMMAND_(**_order, _expiry=_expiry)
         
     # MODIFY ORDER
     def _DWX_MTX_MODIFY_TRADE_BY_TICKET_(self, _ticket, _SL, _TP): # in points
         
-        try:
-            self.temp_order_dict['_action'] = 'MODIFY'
-            self.temp_order_dict['_SL'] = _SL
-            self.temp_order_dict['_TP'] = _TP
-            self.temp_order_dict['_ticket'] = _ticket
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._encode_('MODIFY', _SL=_SL,
+                                                                _TP=_TP, _ticket=_ticket))
     
     # CLOSE ORDER
     def _DWX_MTX_CLOSE_TRADE_BY_TICKET_(self, _ticket):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE'
-            self.temp_order_dict['_ticket'] = _ticket
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._ticket_command_('CLOSE', _ticket))
             
     # CLOSE PARTIAL
     def _DWX_MTX_CLOSE_PARTIAL_BY_TICKET_(self, _ticket, _lots):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_PARTIAL'
-            self.temp_order_dict['_ticket'] = _ticket
-            self.temp_order_dict['_lots'] = _lots
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            print("[ERROR] Order Ticket {} not found!".format(_ticket))
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._encode_('CLOSE_PARTIAL', _lots=_lots,
+                                                                _ticket=_ticket))
             
     # CLOSE MAGIC
     def _DWX_MTX_CLOSE_TRADES_BY_MAGIC_(self, _magic):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_MAGIC'
-            self.temp_order_dict['_magic'] = _magic
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._magic_command_('CLOSE_MAGIC', _magic))
     
     # CLOSE ALL TRADES
     def _DWX_MTX_CLOSE_ALL_TRADES_(self):
         
-        try:
-            self.temp_order_dict['_action'] = 'CLOSE_ALL'
-            
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._ticket_command_('CLOSE_ALL'))
+    
+    # CLOSE TRADES BY TICKET (one TRADE_BATCH)
+    def _DWX_MTX_CLOSE_TRADES_BY_TICKETS_(self, _tickets):
+        
+        return self._DWX_MTX_SEND_TRADE_BATCH_([{'_action': 'CLOSE', '_ticket': _ticket}
+                                                for _ticket in _tickets])
         
     # GET OPEN TRADES
     def _DWX_MTX_GET_ALL_OPEN_TRADES_(self):
         
-        try:
-            self.temp_order_dict['_action'] = 'GET_OPEN_TRADES'
-                        
-            # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
-            
-        except KeyError:
-            pass
+        # Execute
+        return self._DWX_MTX_SEND_(self._default_order._ticket_command_('GET_OPEN_TRADES'))
+    
+    # SEND ORDER (DWX_ZMQ_Order, with the _encode_() fields given changed)
+    def _DWX_MTX_SEND_ORDER_(self, _order, _expiry=None, **_changes):
+        
+        # Execute
+        return self._DWX_MTX_SEND_(_order._encode_(**_changes), _expiry=_expiry)
     
     # DEFAULT ORDER DICT
     def _generate_default_order_dict(self):
@@ -301,14 +728,17 @@ class DWX_ZeroMQ_Connector():
         
     ##########################################################################
     """
-    Function to construct messages for sending DATA commands to MetaTrader
+    Function to construct messages for sending DATA commands to MetaTrader.
+    With _format='arrays' / 'dataframe', the response's '_data' holds time
+    and close columns / a DataFrame (see DWX_ZMQ_History.py).
     """
     def _DWX_MTX_SEND_MARKETDATA_REQUEST_(self,
                                  _symbol='EURUSD',
                                  _timeframe=1,
                                  _start='2019.01.04 17:00:00',
-                                 _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00')):
+                                 _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00'),
                                  #_end='2019.01.04 17:05:00'):
+                                 _format=None):
         
         _msg = "{};{};{};{};{}".format('DATA',
                                      _symbol,
@@ -316,28 +746,132 @@ class DWX_ZeroMQ_Connector():
                                      _start,
                                      _end)
         # Send via PUSH Socket
-        self.remote_send(self._PUSH_SOCKET, _msg)
+        return self._DWX_MTX_SEND_(_msg, _format)
     
     
     ##########################################################################
     """
-    Function to construct messages for sending HIST commands to MetaTrader
+    Function to construct messages for sending HIST commands to MetaTrader.
+    With _chunk_size, the response arrives in HIST_CHUNK messages of up to
+    _chunk_size bars, and a DWX_ZMQ_Hist_Buffer is returned that fills up
+    as they arrive. Otherwise, _format='arrays' / 'dataframe' gets the
+    response's '_data' as OHLCV columns / a DataFrame.
     """
     def _DWX_MTX_SEND_MARKETHIST_REQUEST_(self,
                                  _symbol='EURUSD',
                                  _timeframe=1,
                                  _start='2019.01.04 17:00:00',
-                                 _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00')):
+                                 _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00'),
                                  #_end='2019.01.04 17:05:00'):
+                                 _chunk_size=None,
+                                 _format=None):
         
         _msg = "{};{};{};{};{}".format('HIST',
                                      _symbol,
                                      _timeframe,
                                      _start,
                                      _end)
-        # Send via PUSH Socket
-        self.remote_send(self._PUSH_SOCKET, _msg)
+        
+        if _chunk_size is None:
+            # Send via PUSH Socket
+            return self._DWX_MTX_SEND_(_msg, _format)
+        
+        _hist = DWX_ZMQ_Hist_Buffer(_symbol, int(_timeframe))
+        
+        # Chunks are matched by request ID, or else by (symbol, timeframe)
+        if self._request_ids:
+            _key = next(self._request_counter)
+            _msg = "@{};{}".format(_key, _msg)
+        else:
+            _key = (_symbol, int(_timeframe))
+        
+        with self._pending_lock:
+            self._chunked_requests[_key] = _hist
+        
+        if not self.remote_send(self._PUSH_SOCKET, "{};{}".format(_msg, _chunk_size),
+                                _discard=partial(self._fail_chunked_, _key, _hist)):
+            self._fail_chunked_(_key, _hist)
+        
+        return _hist
+    
+    def _fail_chunked_(self, _key, _hist, _registered=None):
+        
+        # The chunked request could not be sent
+        with self._pending_lock:
+            if self._chunked_requests.get(_key) is _hist:
+                del self._chunked_requests[_key]
+        
+        _hist._set_error_(zmq.error.Again())
+    
+    
+    ##########################################################################
+    """
+    Function to get HIST bars through the local cache (_history_cache): only
+    sub-ranges never fetched before are requested from MetaTrader, then
+    merged into the cache. Blocks until they arrive, which needs either
+    _request_ids or _chunk_size (a server answering HIST_CHUNK).
+    Returns {COLUMN: array} (see DWX_ZMQ_History.py), or a DataFrame with
+    _format='dataframe'.
+    """
+    def _DWX_MTX_GET_HIST_CACHED_(self,
+                                  _symbol='EURUSD',
+                                  _timeframe=1,
+                                  _start='2019.01.04 17:00:00',
+                                  _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00'),
+                                  _format='arrays',
+                                  _chunk_size=None,
+                                  _timeout=30):
+        
+        if self._History_Cache is None:
+            raise RuntimeError('No history cache, set _history_cache to a directory')
+        
+        if not self._request_ids and _chunk_size is None:
+            raise RuntimeError('Waiting for HIST responses needs _request_ids=True or a _chunk_size')
+        
+        def _fetch(_from, _to):
+            
+            _from = Timestamp(_from, unit='s').strftime('%Y.%m.%d %H:%M:%S')
+            _to = Timestamp(_to, unit='s').strftime('%Y.%m.%d %H:%M:%S')
+            
+            if _chunk_size is not None:
+                _hist = self._DWX_MTX_SEND_MARKETHIST_REQUEST_(_symbol, _timeframe, _from, _to,
+                                                               _chunk_size=_chunk_size)
+                # No bars (e.g. a weekend) is an answer too
+                return _hist.result(_timeout).columns()
+            
+            _future = self._DWX_MTX_SEND_MARKETHIST_REQUEST_(_symbol, _timeframe, _from, _to,
+                                                             _format='arrays')
+            try:
+                _response = _future.result(_timeout)
+            except Exception:
+                self._DWX_MTX_CANCEL_REQUEST_(_future)
+                raise
+            
+            # NOT_AVAILABLE: maybe not loaded by the terminal yet, retry next time
+            if '_data' not in _response:
+                return None
+            
+            if isinstance(_response['_data'], list):
+                return DWX_ZMQ_Hist_Decoder.from_bars(_response['_data'])
+            
+            return _response['_data']
+        
+        _columns = self._History_Cache._get_(_symbol, int(_timeframe),
+                                             self._hist_time_(_start), self._hist_time_(_end),
+                                             _fetch)
+        
+        if _format == 'dataframe':
+            return DWX_ZMQ_Hist_Decoder.to_dataframe(_columns)
+        
+        return _columns
     
+    def _hist_time_(self, _time):
+        
+        # '%Y.%m.%d %H:%M:%S' (as in HIST commands) or Timestamp -> s since epoch
+        if isinstance(_time, str):
+            _time = to_datetime(_time, format='%Y.%m.%d %H:%M:%S')
+        
+        return int(Timestamp(_time).timestamp())
     
     ##########################################################################
     """
@@ -350,7 +884,7 @@ class DWX_ZeroMQ_Connector():
           _msg = _msg + ";{}".format(s)
 
         # Send via PUSH Socket
-        self.remote_send(self._PUSH_SOCKET, _msg)
+        return self._DWX_MTX_SEND_(_msg)
     
     
     ##########################################################################
@@ -364,17 +898,19 @@ class DWX_ZeroMQ_Connector():
           _msg = _msg + ";{};{}".format(i[1],i[2])
           
         # Send via PUSH Socket
-        self.remote_send(self._PUSH_SOCKET, _msg)
+        return self._DWX_MTX_SEND_(_msg)
     
     
     ##########################################################################
     """
     Function to construct messages for sending Trade commands to MetaTrader
+    (for orders sent repeatedly, see DWX_ZMQ_Order and _DWX_MTX_SEND_ORDER_())
     """
     def _DWX_MTX_SEND_COMMAND_(self, _action='OPEN', _type=0,
                                  _symbol='EURUSD', _price=0.0,
                                  _SL=50, _TP=50, _comment="Python-to-MT",
-                                 _lots=0.01, _magic=123456, _ticket=0):
+                                 _lots=0.01, _magic=123456, _ticket=0,
+                                 _expiry=None):
         
         _msg = "{};{};{};{};{};{};{};{};{};{};{}".format('TRADE',_action,_type,
                                                          _symbol,_price,
@@ -383,7 +919,7 @@ class DWX_ZeroMQ_Connector():
                                                          _ticket)
         
         # Send via PUSH Socket
-        self.remote_send(self._PUSH_SOCKET, _msg)
+        return self._DWX_MTX_SEND_(_msg, _expiry=_expiry)
         
         """
          compArray[0] = TRADE or DATA
@@ -416,6 +952,50 @@ class DWX_ZeroMQ_Connector():
     
     ##########################################################################
     
+    """
+    Function to send OPEN / MODIFY / CLOSE / CLOSE_PARTIAL commands in one
+    message (TRADE_BATCH), executed by MetaTrader in order and answered
+    together: {'_action': 'TRADE_BATCH', '_count': N, '_results': [RESPONSE,
+    ...]}, each RESPONSE as to the command sent alone. _orders are dicts of
+    _DWX_MTX_SEND_COMMAND_() arguments, missing ones as in
+    _generate_default_order_dict(), or DWX_ZMQ_Orders.
+    """
+    def _DWX_MTX_SEND_TRADE_BATCH_(self, _orders):
+        
+        _default = self._generate_default_order_dict()
+        _items = []
+        
+        for _order in _orders:
+            
+            if isinstance(_order, DWX_ZMQ_Order):
+                _order = _order._asdict_()
+            
+            _order = dict(_default, **_order)
+            
+            if _order['_action'] not in TRADE_BATCH_ACTIONS:
+                raise ValueError("{!r} cannot be batched, expected one of {}".format(
+                    _order['_action'], ', '.join(TRADE_BATCH_ACTIONS)))
+            
+            _item = "{};{};{};{};{};{};{};{};{};{}".format(_order['_action'],_order['_type'],
+                                                           _order['_symbol'],_order['_price'],
+                                                           _order['_SL'],_order['_TP'],
+                                                           _order['_comment'],_order['_lots'],
+                                                           _order['_magic'],_order['_ticket'])
+            
+            # Items are '|'-separated, fields ';'-separated
+            if '|' in _item or _item.count(';') != 9:
+                raise ValueError("Batched fields cannot contain '|' or ';': {!r}".format(_item))
+            
+            _items.append(_item)
+        
+        if not _items:
+            raise ValueError('TRADE_BATCH needs at least one command')
+        
+        # Send via PUSH Socket
+        return self._DWX_MTX_SEND_("TRADE_BATCH;{}|{}".format(len(_items), '|'.join(_items)))
+    
+    ##########################################################################
+    
     """
     Function to check Poller for new reponses (PULL) and market data (SUB)
     """
@@ -425,77 +1005,672 @@ class DWX_ZeroMQ_Connector():
         
         while self._ACTIVE:
             
-            sockets = dict(self._poller.poll())
+            sockets = dict(self._poller.poll(_POLL_TIMEOUT))
             
-            # Process response to commands sent to MetaTrader
-            if self._PULL_SOCKET in sockets and sockets[self._PULL_SOCKET] == zmq.POLLIN:
+            if not sockets:
                 
-                try:
+                # Idle: what the last batches appended is still synced
+                if self._Tick_Journal is not None:
+                    self._Tick_Journal._flush_()
+                continue
+            
+            # Loop latency is measured from wakeup until the batch is processed
+            _wakeup = perf_counter_ns()
+            _batch_size = 0
+            
+            # Process responses to commands sent to MetaTrader
+            if sockets.get(self._PULL_SOCKET) == zmq.POLLIN:
+                
+                _batch = self._DWX_ZMQ_Drain_(self._PULL_SOCKET)
+                _batch_size += len(_batch)
+                self._poll_stats['pull_messages'] += len(_batch)
+                
+                self._DWX_ZMQ_Process_Pull_Batch_(_batch)
+            
+            # Receive new market data from MetaTrader
+            if sockets.get(self._SUB_SOCKET) == zmq.POLLIN:
+                
+                if self._binary:
+                    _sub_size = self._DWX_ZMQ_Drain_Sub_Binary_(self._SUB_SOCKET,
+                                                                string_delimiter)
+                elif self._zero_copy:
+                    _sub_size = self._DWX_ZMQ_Drain_Sub_Zero_Copy_(self._SUB_SOCKET,
+                                                                   string_delimiter)
+                else:
+                    _batch = self._DWX_ZMQ_Drain_(self._SUB_SOCKET)
+                    _sub_size = len(_batch)
                     
-                    msg = self._PULL_SOCKET.recv_string(zmq.DONTWAIT)
+                    if self._Tick_Journal is not None:
+                        self._DWX_ZMQ_Journal_Batch_(_batch)
                     
-                    # If data is returned, store as pandas Series
-                    if msg != '' and msg != None:
-                        
-                        try: 
-                            _data = eval(msg)
-                            
-                            self._thread_data_output = _data
-                            if self._verbose:
-                              print(_data) # default logic
-                            # invokes data handlers on pull port
-                            for hnd in self._pulldata_handlers:
-                              hnd.onPullData(_data)
-                                
-                        except Exception as ex:
-                            _exstr = "Exception Type {0}. Args:\n{1!r}"
-                            _msg = _exstr.format(type(ex).__name__, ex.args)
-                            print(_msg)
-               
-                except zmq.error.Again:
-                    pass # resource temporarily unavailable, nothing to print
-                except ValueError:
-                    pass # No data returned, passing iteration.
-                except UnboundLocalError:
-                    pass # _symbol may sometimes get referenced before being assigned.
+                    self._DWX_ZMQ_Process_Sub_Batch_(_batch, string_delimiter)
+                
+                _batch_size += _sub_size
+                self._poll_stats['sub_messages'] += _sub_size
+                
+                if self._Tick_Journal is not None:
+                    self._Tick_Journal._flush_()
             
-            # Receive new market data from MetaTrader
-            if self._SUB_SOCKET in sockets and sockets[self._SUB_SOCKET] == zmq.POLLIN:
+            self._update_poll_stats_(_batch_size, perf_counter_ns() - _wakeup)
+        
+        if self._Tick_Journal is not None:
+            self._Tick_Journal._close_()
+    
+    ##########################################################################
+    
+    """
+    Function to read every pending message on a socket (up to _batch_budget),
+    returning [(RECEIVE TIMESTAMP (ns), MESSAGE)]: perf_counter_ns() for
+    responses (PULL, round trips), time_ns() for market data (SUB, stored)
+    """
+    def _DWX_ZMQ_Drain_(self, _socket):
+        
+        _batch = []
+        _bytes = 0
+        _clock = perf_counter_ns if _socket is self._PULL_SOCKET else time_ns
+        
+        try:
+            for _ in range(self._batch_budget):
+                msg = _socket.recv_string(zmq.NOBLOCK)
+                _batch.append((_clock(), msg))
+                _bytes += len(msg)
                 
-                try:
-                  msg = self._SUB_SOCKET.recv_string(zmq.DONTWAIT)
+        except zmq.error.Again:
+            pass # socket drained
+        else:
+            self._poll_stats['budget_exhausted'] += 1
+        
+        self._poll_stats['pull_bytes' if _socket is self._PULL_SOCKET else 'sub_bytes'] += _bytes
+        
+        return _batch
+    
+    ##########################################################################
+    
+    """
+    Function to record a batch of SUB messages ([(RECEIVE TIMESTAMP (ns),
+    "TOPIC PAYLOAD")]) in the tick journal
+    """
+    def _DWX_ZMQ_Journal_Batch_(self, _batch):
+        
+        _append = self._Tick_Journal._append_
+        
+        for _timestamp, msg in _batch:
+            _topic, _, _payload = msg.partition(" ")
+            _append(_topic, _payload.encode(), _timestamp)
+    
+    ##########################################################################
+    
+    """
+    Function to decode a batch of responses (PULL)
+    """
+    def _DWX_ZMQ_Process_Pull_Batch_(self, _batch):
+        
+        for _timestamp, msg in _batch:
+            
+            # If data is returned, store as pandas Series
+            if msg == '':
+                continue
+            
+            try: 
+                _data = None
+                if self._columnar_requests:
+                    _data = self._DWX_ZMQ_Decode_Columnar_(msg)
+                if _data is None:
+                    _data = DWX_ZMQ_Parser.parse(msg)
+                
+                if self._Latency is not None:
+                    _rtt = self._Latency._received_(_data, _timestamp)
+                    if _rtt is not None and self._Pacer is not None:
+                        self._Pacer._observe_(*_rtt)
+                
+                # Before waking up threads waiting for this response
+                if self._Trades_Book is not None:
+                    self._Trades_Book._received_(_data)
+                
+                # Chunks are buffered by their request; only the final one
+                # wakes up threads waiting for a response
+                if isinstance(_data, dict) and _data.get('_action') == 'HIST_CHUNK':
+                    if _data.get('_final'):
+                        self._set_response_(_data)
+                    self._DWX_ZMQ_Hist_Chunk_(_data)
+                else:
+                    self._set_response_(_data)
+                    self._resolve_request_(_data)
+                if self._verbose:
+                  print(_data) # default logic
+                # invokes data handlers on pull port (responses are never dropped)
+                if self._dispatcher is None:
+                  self._invoke_pull_handlers_(_data)
+                elif self._pulldata_handlers:
+                  self._dispatcher._dispatch_(None, self._invoke_pull_handlers_, _data,
+                                              _lossless=True)
+                    
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _msg = _exstr.format(type(ex).__name__, ex.args)
+                print(_msg)
+    
+    ##########################################################################
+    
+    """
+    Function to decode a batch of market data (SUB) and store it with one
+    write per symbol
+    """
+    def _DWX_ZMQ_Process_Sub_Batch_(self, _batch, string_delimiter=';'):
+        
+        _ticks = {}     # {SYMBOL: [(TIMESTAMP, BID, ASK)]}
+        _rates = {}     # {SYMBOL: [(TIMESTAMP, TIME, OPEN, ..., VOLUME)]}
+        _received = []
+        
+        for _timestamp, msg in _batch:
+            
+            if msg == "":
+                continue
+            
+            try:
+                _symbol, _data = msg.split(" ")
+                _fields = _data.split(string_delimiter)
+                
+                if len(_fields) == 2:
+                  _bid, _ask = _fields
+                  if self._verbose:
+                    print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _bid + "/" + _ask + ") BID/ASK")                    
+                  _row = (_timestamp, float(_bid), float(_ask))
+                  _ticks.setdefault(_symbol, []).append(_row)
                   
-                  if msg != "":
-                    _timestamp = str(Timestamp.now('UTC'))[:-6]
-                    _symbol, _data = msg.split(" ")
-                    if len(_data.split(string_delimiter)) == 2:
-                      _bid, _ask = _data.split(string_delimiter)
-                      if self._verbose:
-                        print("\n[" + _symbol + "] " + _timestamp + " (" + _bid + "/" + _ask + ") BID/ASK")                    
-                      # Update Market Data DB
-                      if _symbol not in self._Market_Data_DB.keys():
-                        self._Market_Data_DB[_symbol] = {}
-                      self._Market_Data_DB[_symbol][_timestamp] = (float(_bid), float(_ask))
-
-                    elif len(_data.split(string_delimiter)) == 8:
-                      _time, _open, _high, _low, _close, _tick_vol, _spread, _real_vol = _data.split(string_delimiter)
-                      if self._verbose:
-                        print("\n[" + _symbol + "] " + _timestamp + " (" + _time + "/" + _open + "/" + _high + "/" + _low + "/" + _close + "/" + _tick_vol + "/" + _spread + "/" + _real_vol + ") TIME/OPEN/HIGH/LOW/CLOSE/TICKVOL/SPREAD/VOLUME")                    
-                      # Update Market Rate DB
-                      if _symbol not in self._Market_Data_DB.keys():
-                        self._Market_Data_DB[_symbol] = {}
-                      self._Market_Data_DB[_symbol][_timestamp] = (int(_time), float(_open), float(_high), float(_low), float(_close), int(_tick_vol), int(_spread), int(_real_vol))
-                    # invokes data handlers on sub port
-                    for hnd in self._subdata_handlers:
-                      hnd.onSubData(msg)                      
-                   
-                except zmq.error.Again:
-                    pass # resource temporarily unavailable, nothing to print
+                elif len(_fields) == 8:
+                  _time, _open, _high, _low, _close, _tick_vol, _spread, _real_vol = _fields
+                  if self._verbose:
+                    print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _time + "/" + _open + "/" + _high + "/" + _low + "/" + _close + "/" + _tick_vol + "/" + _spread + "/" + _real_vol + ") TIME/OPEN/HIGH/LOW/CLOSE/TICKVOL/SPREAD/VOLUME")                    
+                  _row = (_timestamp, int(_time), float(_open), float(_high), float(_low), float(_close), int(_tick_vol), int(_spread), int(_real_vol))
+                  _rates.setdefault(_symbol, []).append(_row)
+                
+                _received.append((_symbol, msg))
+                
+            except ValueError:
+                pass # Malformed message, skipping it.
+        
+        # Update Market Data DB
+        for _symbol, _rows in _ticks.items():
+            self._Market_Data_DB._extend_ticks_(_symbol, _rows)
+        
+        # Update Market Rate DB
+        for _symbol, _rows in _rates.items():
+            self._Market_Data_DB._extend_rates_(_symbol, _rows)
+        
+        # invokes data handlers on sub port, in order per symbol
+        if self._dispatcher is None:
+            for _symbol, msg in _received:
+                self._invoke_sub_handlers_(msg)
+        elif self._subdata_handlers:
+            for _symbol, msg in _received:
+                self._dispatcher._dispatch_(_symbol, self._invoke_sub_handlers_, msg)
+    
+    ##########################################################################
+    
+    """
+    Function returning a receiver for _socket: _recv_into(buffer) reads one
+    frame into buffer and returns its size (recv_into needs pyzmq >= 26.4,
+    older versions copy from a zero-copy Frame)
+    """
+    def _recv_into_(self, _socket):
+        
+        if hasattr(_socket, 'recv_into'):
+            return partial(_socket.recv_into, flags=zmq.NOBLOCK)
+        
+        # pyzmq < 26.4: one zmq.Frame per message, copied into the buffer
+        def _recv_into(_buffer):
+            _frame = _socket.recv(zmq.NOBLOCK, copy=False)
+            _n = len(_frame.buffer)
+            if _n <= len(_buffer):
+                _buffer[:_n] = _frame.buffer
+            return _n
+        
+        return _recv_into
+    
+    ##########################################################################
+    
+    """
+    Function to read and store every pending market data message (SUB) from
+    the reusable buffer: topic and fields are parsed in place and ticks are
+    staged in preallocated arrays, then stored with one write per symbol. No
+    str or list is built per tick (unless there are SUB handlers, which get
+    the usual "TOPIC PAYLOAD" string). Accepts "TOPIC PAYLOAD" messages and
+    [TOPIC, PAYLOAD] frames. Returns the number of messages read.
+    """
+    def _DWX_ZMQ_Drain_Sub_Zero_Copy_(self, _socket, string_delimiter=';'):
+        
+        _rx = self._rx_buffer
+        _view = self._rx_view
+        _size = len(_rx)
+        _delimiter = ord(string_delimiter)
+        _topics = self._rx_topics
+        _symbols = self._rx_symbols
+        _stages = self._rx_stages
+        _staged = self._rx_staged
+        _budget = self._batch_budget
+        _received = []
+        _count = 0
+        _bytes = 0
+        _recv_into = self._recv_into_(_socket)
+        _verbose = self._verbose
+        _handlers = bool(self._subdata_handlers)
+        _journal = None if self._Tick_Journal is None else self._Tick_Journal._append_
+        
+        try:
+            for _ in range(self._batch_budget):
+                
+                _n = _recv_into(_view)
+                _timestamp = time_ns()
+                _count += 1
+                _bytes += _n
+                
+                if _n > _size:
+                    # Truncated: no tick or rate is anywhere near this long
+                    while _socket.getsockopt(zmq.RCVMORE):
+                        _recv_into(_view)
+                    continue
+                
+                _topic_end = _rx.find(32, 0, _n)
+                
+                if _topic_end >= 0:
+                    _start = _topic_end + 1
+                    _end = _n
+                
+                # [TOPIC, PAYLOAD] frames: payload goes right after the topic
+                elif _socket.getsockopt(zmq.RCVMORE):
+                    _topic_end = _n
+                    _start = _n
+                    _end = _n + _recv_into(_view[_n:])
+                    _bytes += _end - _n
+                    if _end > _size:
+                        continue
+                
+                else:
+                    continue
+                
+                _key = bytes(_view[:_topic_end])
+                _symbol_id = _topics.get(_key)
+                if _symbol_id is None:
+                    _symbol_id = _topics[_key] = len(_symbols)
+                    _symbols.append(_key.decode())
+                    _stages.append((array('q', bytes(8 * _budget)),
+                                    array('d', bytes(8 * _budget)),
+                                    array('d', bytes(8 * _budget))))
+                    _staged.append(0)
+                _symbol = _symbols[_symbol_id]
+                
+                if _journal is not None:
+                    _journal(_key, _view[_start:_end], _timestamp)
+                
+                try:
+                    _split = _rx.find(_delimiter, _start, _end)
+                    
+                    if _split < 0:
+                        continue
+                    
+                    # BID;ASK
+                    if _rx.find(_delimiter, _split + 1, _end) < 0:
+                        _stage_time, _stage_bid, _stage_ask = _stages[_symbol_id]
+                        _row = _staged[_symbol_id]
+                        _stage_time[_row] = _timestamp
+                        _stage_bid[_row] = float(_rx[_start:_split])
+                        _stage_ask[_row] = float(_rx[_split + 1:_end])
+                        if _verbose:
+                          print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + str(_stage_bid[_row]) + "/" + str(_stage_ask[_row]) + ") BID/ASK")
+                        _staged[_symbol_id] = _row + 1
+                        
+                    elif _rx.count(_delimiter, _start, _end) == 7:
+                        _values = []
+                        _pos = _start
+                        while _pos <= _end:
+                            _split = _rx.find(_delimiter, _pos, _end)
+                            if _split < 0:
+                                _split = _end
+                            _values.append(_rx[_pos:_split])
+                            _pos = _split + 1
+                        _time, _open, _high, _low, _close, _tick_vol, _spread, _real_vol = _values
+                        if _verbose:
+                          print("\n[" + _symbol + "] " + str(Timestamp(_timestamp)) + " (" + _rx[_start:_end].decode().replace(string_delimiter, "/") + ") TIME/OPEN/HIGH/LOW/CLOSE/TICKVOL/SPREAD/VOLUME")
+                        # Update Market Rate DB
+                        self._Market_Data_DB._append_rate_(_symbol, _timestamp, int(_time), float(_open), float(_high), float(_low), float(_close), int(_tick_vol), int(_spread), int(_real_vol))
+                    
+                    else:
+                        continue
+                    
                 except ValueError:
-                    pass # No data returned, passing iteration.
-                except UnboundLocalError:
-                    pass # _symbol may sometimes get referenced before being assigned.
+                    continue # Malformed message, skipping it.
+                
+                if _handlers:
+                    _received.append((_symbol, _symbol + " " + _rx[_start:_end].decode()))
+                
+        except zmq.error.Again:
+            pass # socket drained
+        else:
+            self._poll_stats['budget_exhausted'] += 1
+        
+        self._poll_stats['sub_bytes'] += _bytes
+        
+        # Update Market Data DB
+        for _symbol_id, _rows in enumerate(_staged):
+            if _rows:
+                self._Market_Data_DB._extend_staged_ticks_(_symbols[_symbol_id],
+                                                           _stages[_symbol_id], _rows)
+                _staged[_symbol_id] = 0
+        
+        # invokes data handlers on sub port, in order per symbol
+        if self._dispatcher is None:
+            for _symbol, msg in _received:
+                self._invoke_sub_handlers_(msg)
+        else:
+            for _symbol, msg in _received:
+                self._dispatcher._dispatch_(_symbol, self._invoke_sub_handlers_, msg)
+        
+        return _count
+    
+    ##########################################################################
+    
+    """
+    Function to read every pending market data message (SUB) when binary
+    records may arrive ("TOPIC RECORD" or [TOPIC, RECORD] frames). Records
+    are decoded per batch with one NumPy view per kind and stored with one
+    write per symbol; text messages go through _DWX_ZMQ_Process_Sub_Batch_.
+    Returns the number of messages read.
+    """
+    def _DWX_ZMQ_Drain_Sub_Binary_(self, _socket, string_delimiter=';'):
+        
+        _records = {KIND_TICK: [], KIND_RATE: []}    # {KIND: [RECORD]}
+        _times = {KIND_TICK: [], KIND_RATE: []}      # {KIND: [RECEIVE TIMESTAMP]}
+        _topics = {KIND_TICK: [], KIND_RATE: []}     # {KIND: [TOPIC]}
+        _text = []
+        _count = 0
+        _bytes = 0
+        _magic = bytes((BINARY_MAGIC,))
+        _journal = None if self._Tick_Journal is None else self._Tick_Journal._append_
+        
+        try:
+            for _ in range(self._batch_budget):
+                
+                msg = _socket.recv(zmq.NOBLOCK)
+                _timestamp = time_ns()
+                _count += 1
+                _bytes += len(msg)
+                
+                _split = msg.find(b' ')
+                
+                if _split >= 0:
+                    _topic = msg[:_split]
+                    _payload = msg[_split + 1:]
+                elif _socket.getsockopt(zmq.RCVMORE):
+                    _topic = msg
+                    _payload = _socket.recv(zmq.NOBLOCK)
+                    _bytes += len(_payload)
+                else:
+                    continue
+                
+                if _journal is not None:
+                    _journal(_topic, _payload, _timestamp)
                 
+                if _payload[:1] == _magic and len(_payload) > 8 and _payload[2] in _records:
+                    _records[_payload[2]].append(_payload)
+                    _times[_payload[2]].append(_timestamp)
+                    _topics[_payload[2]].append(_topic)
+                else:
+                    try:
+                        _text.append((_timestamp, _topic.decode() + " " + _payload.decode()))
+                    except UnicodeDecodeError:
+                        pass # Malformed message, skipping it.
+                
+        except zmq.error.Again:
+            pass # socket drained
+        else:
+            self._poll_stats['budget_exhausted'] += 1
+        
+        self._poll_stats['sub_bytes'] += _bytes
+        
+        if _text:
+            self._DWX_ZMQ_Process_Sub_Batch_(_text, string_delimiter)
+        
+        for _kind, _decode in ((KIND_TICK, DWX_ZMQ_Binary_Format.decode_ticks),
+                               (KIND_RATE, DWX_ZMQ_Binary_Format.decode_rates)):
+            if _records[_kind]:
+                try:
+                    self._DWX_ZMQ_Store_Binary_(_kind, _decode(b''.join(_records[_kind])),
+                                                _times[_kind], _topics[_kind], string_delimiter)
+                except ValueError as ex:
+                    print("[ERROR] Binary records skipped: " + str(ex))
+        
+        return _count
+    
+    ##########################################################################
+    
+    """
+    Function to store decoded binary records (ticks or rates) grouped by
+    symbol, then run handlers with the equivalent text message
+    """
+    def _DWX_ZMQ_Store_Binary_(self, _kind, _records, _times, _topics,
+                               string_delimiter=';'):
+        
+        # Handlers get the text format's fields (ticks: BID;ASK)
+        if _kind == KIND_TICK:
+            _fields = ('bid', 'ask')
+            _stored = ('bid', 'ask', 'time')
+            _extend = self._Market_Data_DB._extend_tick_columns_
+        else:
+            _fields = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+            _stored = _fields
+            _extend = self._Market_Data_DB._extend_rate_columns_
+        
+        # Rows are grouped by topic, which names the symbol: the publisher's
+        # symbol IDs may be reassigned (e.g. after a restart)
+        _groups = {}
+        _keys = np.fromiter((_groups.setdefault(_topic, len(_groups)) for _topic in _topics),
+                            dtype=np.int64, count=len(_topics))
+        
+        _symbols = []
+        for _topic in _groups:
+            _symbol = self._binary_symbols.get(_topic)
+            if _symbol is None:
+                _symbol = self._binary_symbols[_topic] = _topic.decode()
+            _symbols.append(_symbol)
+        
+        # One write per symbol, rows in arrival order (stable sort)
+        _columns = [np.array(_times, dtype=np.int64)] + [_records[_name] for _name in _stored]
+        
+        if len(_symbols) == 1:
+            _bounds = [(0, 0, len(_keys))]
+        else:
+            _order = np.argsort(_keys, kind='stable')
+            _columns = [_column[_order] for _column in _columns]
+            _starts = np.searchsorted(_keys[_order], np.arange(len(_symbols))).tolist()
+            _bounds = zip(range(len(_symbols)), _starts, _starts[1:] + [len(_keys)])
+        
+        for _key, _start, _end in _bounds:
+            _extend(_symbols[_key], *(_column[_start:_end] for _column in _columns))
+        
+        if not (self._verbose or self._subdata_handlers):
+            return
+        
+        _received = []
+        
+        for _topic, _values in zip(_topics, zip(*(_records[_name].tolist() for _name in _fields))):
+            _symbol = _topic.decode()
+            if self._verbose:
+              print("\n[" + _symbol + "] (" + "/".join(str(_value) for _value in _values) + ") " + "/".join(_fields).upper())
+            _received.append((_symbol, _symbol + " " + string_delimiter.join(str(_value) for _value in _values)))
+        
+        # invokes data handlers on sub port, in order per symbol
+        if self._dispatcher is None:
+            for _symbol, msg in _received:
+                self._invoke_sub_handlers_(msg)
+        elif self._subdata_handlers:
+            for _symbol, msg in _received:
+                self._dispatcher._dispatch_(_symbol, self._invoke_sub_handlers_, msg)
+    
+    ##########################################################################
+    
+    def _invoke_pull_handlers_(self, _data):
+        
+        if not self._pulldata_handlers:
+            return
+        
+        _start = perf_counter_ns()
+        
+        for hnd in self._pulldata_handlers:
+          hnd.onPullData(_data)
+        
+        # Handlers run by the dispatcher are timed by its workers
+        if self._dispatcher is None:
+            self._poll_stats['handler_ns'] += perf_counter_ns() - _start
+    
+    def _invoke_sub_handlers_(self, msg):
+        
+        if not self._subdata_handlers:
+            return
+        
+        _start = perf_counter_ns()
+        
+        for hnd in self._subdata_handlers:
+          hnd.onSubData(msg)
+        
+        if self._dispatcher is None:
+            self._poll_stats['handler_ns'] += perf_counter_ns() - _start
+    
+    ##########################################################################
+    
+    """
+    Function to get handler queue depths and drop / conflation counters
+    (None if handlers run in the poll thread)
+    """
+    def _get_dispatch_stats_(self):
+        
+        if self._dispatcher is None:
+            return None
+        
+        return self._dispatcher._get_stats_()
+    
+    ##########################################################################
+    
+    def _update_poll_stats_(self, _batch_size, _loop_ns):
+        
+        _stats = self._poll_stats
+        
+        _stats['wakeups'] += 1
+        _stats['messages'] += _batch_size
+        _stats['last_batch'] = _batch_size
+        _stats['last_loop_ns'] = _loop_ns
+        _stats['total_loop_ns'] += _loop_ns
+        
+        if _batch_size > _stats['max_batch']:
+            _stats['max_batch'] = _batch_size
+        
+        if _loop_ns > _stats['max_loop_ns']:
+            _stats['max_loop_ns'] = _loop_ns
+    
+    ##########################################################################
+    
+    """
+    Function to get the poll loop's batch size and latency counters
+    """
+    def _get_poll_stats_(self):
+        
+        _stats = dict(self._poll_stats)
+        _wakeups = max(_stats['wakeups'], 1)
+        
+        _stats['mean_batch'] = _stats['messages'] / _wakeups
+        _stats['mean_loop_ns'] = _stats['total_loop_ns'] / _wakeups
+        
+        return _stats
+    
+    ##########################################################################
+    
+    """
+    Function to get every connector counter in one flat dict: messages and
+    bytes per socket, poll wakeups and batch sizes, decode and handler time,
+    sends retried (PUSH socket full), expired and refused, send queues and
+    their wait times per lane, the pacing rate, _Market_Data_DB memory,
+    handler queues, command latencies and the trades book (see
+    DWX_ZMQ_Metrics_Exporter for descriptions). Message and byte rates
+    ('*_per_s') are over the time since the previous call.
+    """
+    def stats(self):
+        
+        with self._stats_lock:
+            _stats = self._get_stats_()
+            _now = monotonic()
+            _previous_time, _previous = self._stats_previous
+            self._stats_previous = (_now, _stats)
+        
+        _seconds = max(_now - _previous_time, 1e-9)
+        
+        for _key in ('pull_messages', 'pull_bytes', 'sub_messages', 'sub_bytes'):
+            _stats[_key + '_per_s'] = (_stats[_key] - _previous.get(_key, 0)) / _seconds
+        
+        return _stats
+    
+    def _get_stats_(self):
+        
+        _poll = self._get_poll_stats_()
+        
+        with self._send_lock:
+            _stats = dict(self._send_stats)
+        
+        _stats.update(self._Sender._get_stats_())
+        
+        if self._Pacer is not None:
+            _stats.update(self._Pacer._get_stats_())
+        
+        _stats.update({'uptime_s': monotonic() - self._started,
+                       'pull_messages': _poll['pull_messages'],
+                       'pull_bytes': _poll['pull_bytes'],
+                       'sub_messages': _poll['sub_messages'],
+                       'sub_bytes': _poll['sub_bytes'],
+                       'wakeups': _poll['wakeups'],
+                       'budget_exhausted': _poll['budget_exhausted'],
+                       'last_batch': _poll['last_batch'],
+                       'max_batch': _poll['max_batch'],
+                       'mean_batch': _poll['mean_batch'],
+                       'max_loop_ns': _poll['max_loop_ns'],
+                       # Receiving, decoding and storing, without handlers
+                       'decode_ns': _poll['total_loop_ns'] - _poll['handler_ns'],
+                       'handler_ns': _poll['handler_ns'],
+                       'requests_pending': len(self._pending_requests),
+                       'market_data_bytes': self._Market_Data_DB.nbytes,
+                       'market_data_buffers': len(self._Market_Data_DB)})
+        
+        _dispatch = self._get_dispatch_stats_()
+        
+        if _dispatch is not None:
+            _stats['handler_ns'] += _dispatch['handler_ns']
+            _stats.update({'handler_queue_depth': sum(_dispatch['queue_depths']),
+                           'handler_dropped': _dispatch['dropped'],
+                           'handler_conflated': _dispatch['conflated'],
+                           'handler_errors': _dispatch['errors']})
+        
+        if self._Latency is not None:
+            _stats['latency'] = self._Latency.snapshot()
+            _stats['latency_unmatched'] = self._Latency._unmatched
+        
+        if self._Trades_Book is not None:
+            _stats['open_trades'] = len(self._Trades_Book)
+            _stats['trades_book_reconciles'] = self._Trades_Book._reconciles
+        
+        return _stats
+    
+    ##########################################################################
+    
+    """
+    Function to get command round-trip latencies per action ({ACTION:
+    {'count', 'min_us', 'mean_us', 'p50_us', 'p90_us', 'p99_us', 'p999_us',
+    'max_us'}}, see DWX_ZMQ_Latency), optionally starting over afterwards
+    """
+    def latency_snapshot(self, _reset=False, _buckets=False):
+        
+        if self._Latency is None:
+            return {}
+        
+        return self._Latency.snapshot(_reset, _buckets)
+    
     ##########################################################################
     
     """
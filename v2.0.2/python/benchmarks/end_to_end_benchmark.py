@@ -0,0 +1,637 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    end_to_end_benchmark.py
+
+    The connector against the stand-in MetaTrader server
+    (server/DWX_ZeroMQ_Server.py), over TCP on localhost, each server run
+    in its own process:
+
+        sub     : SUB ticks/s received without loss, for increasing publish
+                  rates (every run publishes a known number of ticks, see
+                  the server's _tick_limit)
+        rtt     : p50 / p99 / p999 round trip of OPEN, CLOSE, GET_OPEN_TRADES
+                  and HIST of several sizes, with request IDs
+        memory  : RSS growth of this process per million ticks received
+        batch   : closing --batch-size trades one CLOSE at a time and in one
+                  TRADE_BATCH, with the server reading one command per
+                  --timer-ms as the Expert Advisor's OnTimer()
+        pacing  : trader threads opening trades as fast as they can, giving
+                  up on a request after a timeout and sending it again, at a
+                  server serving one command per timer tick: trades opened
+                  in time per second, timeouts and trades opened too late
+                  (executed after their trader gave up), without pacing and
+                  with the adaptive pacer (DWX_ZMQ_Pacer). The adaptive run
+                  passes if it opened at least 1 - --pace-tolerance as many
+                  trades per second in time as the unpaced run, and at most
+                  --pace-tolerance more of its requests timed out and of its
+                  trades were opened late.
+                  The default load (16 traders, 20 ms timeout) is just
+                  within the server's capacity at --timer-ms 1, where
+                  unpaced retries start opening trades late.
+
+    Results can be saved as JSON and compared with an earlier run, e.g. of
+    another commit.
+
+    Usage:
+        python end_to_end_benchmark.py [--quick] [--output results.json] [--compare baseline.json]
+                                       [--rates 2000,5000,10000,20000,50000] [--symbols 8] [--seconds 2]
+                                       [--commands 1000] [--hist-bars 100,1000,10000]
+                                       [--memory-ticks 1000000] [--batch-size 200] [--timer-ms 1]
+                                       [--pace-traders 16] [--pace-timeout-ms 20] [--pace-rate 100]
+                                       [--pace-tolerance 0.1]
+                                       [--zero-copy] [--binary] [--multipart]
+
+        python end_to_end_benchmark.py --output before.json
+        (checkout, change, ...)
+        python end_to_end_benchmark.py --output after.json --compare before.json
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import json
+import platform
+import argparse
+import traceback
+import subprocess
+import numpy as np
+from threading import Thread
+from datetime import datetime, timedelta, timezone
+from time import perf_counter, perf_counter_ns, sleep
+
+import zmq
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZeroMQ_Connector_v2_0_2_RC1 import DWX_ZeroMQ_Connector
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+_SERVER = os.path.join(_ROOT, 'server', 'DWX_ZeroMQ_Server.py')
+
+# Each server / connector pair gets its own ports (PUSH, PULL, PUB)
+_ports = iter(range(35000, 36000, 3))
+
+##############################################################################
+
+def _server_(_args, _port, *_extra):
+
+    # Stand-in server process on _port .. _port + 2, once it is running
+    _cmd = [sys.executable, '-u', _SERVER,
+            '--push-port', str(_port), '--pull-port', str(_port + 1),
+            '--pub-port', str(_port + 2), '--publish-delay', '0.001']
+
+    if _args.multipart:
+        _cmd.append('--multipart')
+    if _args.binary:
+        _cmd.append('--binary')
+
+    _process = subprocess.Popen(_cmd + [str(_arg) for _arg in _extra],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+
+    for _line in _process.stdout:
+        if 'running' in _line:
+            break
+
+    # Keep reading so that a full pipe never blocks the server
+    Thread(target=lambda: [None for _ in _process.stdout], daemon=True).start()
+
+    return _process
+
+def _stop_(_process):
+
+    _process.terminate()
+    _process.wait()
+
+##############################################################################
+
+def _connector_(_args, _port, **_kwargs):
+
+    _zmq = DWX_ZeroMQ_Connector(_PUSH_PORT=_port, _PULL_PORT=_port + 1,
+                                _SUB_PORT=_port + 2,
+                                _request_ids=True,
+                                _zero_copy=_args.zero_copy,
+                                _binary=_args.binary,
+                                **_kwargs)
+
+    # Commands are sent without blocking: wait for the connections
+    sleep(0.5)
+
+    return _zmq
+
+def _close_(_zmq):
+
+    _zmq._DWX_ZMQ_SHUTDOWN_()
+
+    # Unsent commands (e.g. given up on at a stopped server) would block
+    # the context's term() wherever it is garbage collected
+    _zmq._ZMQ_CONTEXT.destroy(linger=0)
+
+##############################################################################
+
+def _rss_():
+
+    # Resident set size of this process (bytes)
+    with open('/proc/self/statm') as _statm:
+        return int(_statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def _received_(_zmq):
+    return sum(_buffer._count for _, _buffer in _zmq._Market_Data_DB.items())
+
+def _receive_(_zmq, _symbols, _expected, _idle=1.0):
+
+    # Tracks _symbols until _expected ticks arrived, or none for _idle
+    # seconds; (RECEIVED, SECONDS from the first to the last tick)
+    for _symbol in _symbols:
+        _zmq._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+
+    # Subscriptions reach the publisher asynchronously
+    sleep(0.2)
+    _zmq._DWX_MTX_SEND_TRACKPRICES_REQUEST_(_symbols).result(10)
+
+    _received = _last = 0
+    _first = _change = perf_counter()
+
+    while _received < _expected:
+
+        sleep(0.01)
+        _now = perf_counter()
+        _received = _received_(_zmq)
+
+        if _received == _last:
+            if _now - _change > _idle:
+                break
+            continue
+
+        if _last == 0:
+            _first = _now
+        _last, _change = _received, _now
+
+    return _received, max(_change - _first, 1e-9)
+
+##############################################################################
+
+def _sub_(_args, _symbols):
+
+    _results = []
+
+    for _rate in _args.rates:
+
+        # --rates are totals over all symbols
+        _per_symbol = _rate / len(_symbols)
+        _limit = max(int(_per_symbol * _args.seconds), 1)
+        _expected = _limit * len(_symbols)
+
+        _port = next(_ports)
+        _server = _server_(_args, _port, '--tick-rate', _per_symbol, '--tick-limit', _limit)
+        _zmq = _connector_(_args, _port, _tick_capacity=_limit)
+
+        try:
+            _received, _seconds = _receive_(_zmq, _symbols, _expected)
+        finally:
+            _close_(_zmq)
+            _stop_(_server)
+
+        _results.append({'rate': _rate,
+                         'published': _expected,
+                         'received': _received,
+                         'lost': _expected - _received,
+                         'achieved_per_s': round(_received / _seconds, 1)})
+
+        print('sub     : {:>8} ticks/s asked, {:>10.1f} received/s, {} of {} lost'.format(
+            _rate, _received / _seconds, _expected - _received, _expected))
+
+    _lossless = [_result for _result in _results if _result['lost'] == 0]
+
+    return {'runs': _results,
+            'max_lossless_rate': max((_result['rate'] for _result in _lossless), default=0),
+            'max_lossless_achieved_per_s': max((_result['achieved_per_s'] for _result in _lossless),
+                                               default=0.0)}
+
+##############################################################################
+
+def _percentiles_(_samples_ns):
+
+    _us = np.asarray(_samples_ns, dtype=np.float64) / 1e3
+    _p50, _p99, _p999 = np.percentile(_us, [50, 99, 99.9])
+
+    return {'n': len(_us),
+            'p50_us': round(_p50, 1),
+            'p99_us': round(_p99, 1),
+            'p999_us': round(_p999, 1),
+            'mean_us': round(_us.mean(), 1),
+            'max_us': round(_us.max(), 1)}
+
+def _time_(_zmq, _request, _timeout=30):
+
+    # (RESPONSE, ROUND TRIP (ns)) of one request returning a Future. The
+    # PUSH socket (SNDHWM 1) takes the next command once the previous one
+    # has been acknowledged; the sender thread waits for that, which is now
+    # part of the round trip.
+    _start = perf_counter_ns()
+    _response = _request().result(_timeout)
+
+    return _response, perf_counter_ns() - _start
+
+##############################################################################
+
+def _rtt_(_args):
+
+    _port = next(_ports)
+    _server = _server_(_args, _port)
+    _zmq = _connector_(_args, _port)
+
+    _samples = {}
+
+    try:
+        # Warm-up (connections, first parse)
+        for _ in range(10):
+            _time_(_zmq, _zmq._DWX_MTX_GET_ALL_OPEN_TRADES_)
+
+        _tickets = []
+        _samples['OPEN'] = []
+
+        for _ in range(_args.commands):
+            _response, _ns = _time_(_zmq, lambda: _zmq._DWX_MTX_SEND_COMMAND_(
+                'OPEN', 0, 'EURUSD', 0.0, 50, 50, 'benchmark', 0.01, 123456, 0))
+            _tickets.append(_response['_ticket'])
+            _samples['OPEN'].append(_ns)
+
+        # Leaves --open-trades trades for GET_OPEN_TRADES to list
+        _samples['CLOSE'] = []
+
+        for _ticket in _tickets[_args.open_trades:]:
+            _, _ns = _time_(_zmq, lambda: _zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(_ticket))
+            _samples['CLOSE'].append(_ns)
+
+        _samples['GET_OPEN_TRADES'] = [_time_(_zmq, _zmq._DWX_MTX_GET_ALL_OPEN_TRADES_)[1]
+                                       for _ in range(_args.commands)]
+
+        _time_(_zmq, _zmq._DWX_MTX_CLOSE_ALL_TRADES_)
+
+        # M1 bars ending at a fixed time, so every commit fetches the same
+        _end = datetime(2019, 1, 4, 17, 0)
+
+        for _bars in _args.hist_bars:
+            _start = (_end - timedelta(minutes=_bars - 1)).strftime('%Y.%m.%d %H:%M:00')
+            _repeat = max(5, min(_args.commands, 100000 // _bars))
+            _key = 'HIST_{}'.format(_bars)
+
+            _samples[_key] = []
+
+            for _ in range(_repeat):
+                _response, _ns = _time_(_zmq, lambda: _zmq._DWX_MTX_SEND_MARKETHIST_REQUEST_(
+                    'EURUSD', 1, _start, _end.strftime('%Y.%m.%d %H:%M:00'),
+                    _format=_args.hist_format))
+                _samples[_key].append(_ns)
+
+            if len(_response['_data']) != _bars and _args.hist_format is None:
+                print('rtt     : HIST {} bars asked, {} received'.format(_bars, len(_response['_data'])))
+
+    finally:
+        _close_(_zmq)
+        _stop_(_server)
+
+    _results = {_action: _percentiles_(_ns) for _action, _ns in _samples.items()}
+
+    for _action, _result in _results.items():
+        print('rtt     : {:16} p50 {:>9.1f} us, p99 {:>9.1f} us, p999 {:>9.1f} us ({} requests)'.format(
+            _action, _result['p50_us'], _result['p99_us'], _result['p999_us'], _result['n']))
+
+    return _results
+
+##############################################################################
+
+def _batch_(_args):
+
+    _port = next(_ports)
+    _server = _server_(_args, _port, '--timer-ms', _args.timer_ms)
+    _zmq = _connector_(_args, _port)
+
+    _opens = [{'_action': 'OPEN', '_comment': 'benchmark'}] * _args.batch_size
+    _samples = {'one_by_one': [], 'batch': []}
+
+    def _open_():
+        _response, _ = _time_(_zmq, lambda: _zmq._DWX_MTX_SEND_TRADE_BATCH_(_opens))
+        return [_result['_ticket'] for _result in _response['_results']]
+
+    try:
+        for _ in range(_args.batch_repeat):
+
+            _tickets = _open_()
+            _start = perf_counter_ns()
+
+            for _ticket in _tickets:
+                _time_(_zmq, lambda: _zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(_ticket))
+
+            _samples['one_by_one'].append(perf_counter_ns() - _start)
+
+            _tickets = _open_()
+            _response, _ns = _time_(_zmq, lambda: _zmq._DWX_MTX_CLOSE_TRADES_BY_TICKETS_(_tickets))
+            _samples['batch'].append(_ns)
+
+            _closed = sum(_result.get('_response') == 'CLOSE_MARKET'
+                          for _result in _response['_results'])
+            if _closed != len(_tickets):
+                print('batch   : {} of {} trades closed'.format(_closed, len(_tickets)))
+
+    finally:
+        _close_(_zmq)
+        _stop_(_server)
+
+    _one_by_one = float(np.median(_samples['one_by_one'])) / 1e6
+    _batch = float(np.median(_samples['batch'])) / 1e6
+
+    print('batch   : closing {} trades (timer {} ms): {:.1f} ms one by one, {:.1f} ms batched ({:.0f}x)'.format(
+        _args.batch_size, _args.timer_ms, _one_by_one, _batch, _one_by_one / _batch))
+
+    return {'trades': _args.batch_size,
+            'timer_ms': _args.timer_ms,
+            'close_one_by_one_ms': round(_one_by_one, 2),
+            'close_batch_ms': round(_batch, 2)}
+
+##############################################################################
+
+def _pacing_(_args):
+
+    _results = {}
+
+    for _mode in ('none', 'adaptive'):
+
+        _port = next(_ports)
+        _server = _server_(_args, _port, '--timer-ms', _args.timer_ms)
+
+        if _mode == 'adaptive':
+            _zmq = _connector_(_args, _port, _pace_rate=_args.pace_rate)
+        else:
+            _zmq = _connector_(_args, _port)
+
+        # Paced commands wait in the connector, where OPENs their trader
+        # will have given up on expire before reaching the server
+        _timeout = _args.pace_timeout_ms / 1e3
+
+        _opened = []
+        _timeouts = [0]
+        _running = [True]
+
+        def _trader_():
+            while _running[0]:
+                _start = perf_counter_ns()
+                _future = _zmq._DWX_MTX_SEND_COMMAND_('OPEN', 0, 'EURUSD', 0.0, 50, 50,
+                                                       'benchmark', 0.01, 123456, 0,
+                                                       _expiry=_timeout)
+                try:
+                    _future.result(_timeout)
+                    _opened.append(perf_counter_ns() - _start)
+                except Exception:
+                    # As strategies do: give up, then try again
+                    _zmq._DWX_MTX_CANCEL_REQUEST_(_future)
+                    _timeouts[0] += 1
+
+        try:
+            _traders = [Thread(target=_trader_, daemon=True) for _ in range(_args.pace_traders)]
+
+            _start = perf_counter()
+            for _trader in _traders:
+                _trader.start()
+
+            sleep(_args.pace_seconds)
+            _running[0] = False
+            for _trader in _traders:
+                _trader.join()
+            _seconds = perf_counter() - _start
+
+            # Answered after everything already queued at the server
+            _executed = len(_zmq._DWX_MTX_GET_ALL_OPEN_TRADES_().result(60)['_trades'])
+            _stats = _zmq.stats()
+
+        finally:
+            _close_(_zmq)
+            _stop_(_server)
+
+        _result = {'opened_per_s': round(len(_opened) / _seconds, 1),
+                   'timeouts': _timeouts[0],
+                   'opened_late': _executed - len(_opened),
+                   'expired': _stats['sends_expired'],
+                   'timeout_share': round(_timeouts[0] / max(len(_opened) + _timeouts[0], 1), 4),
+                   'late_share': round((_executed - len(_opened)) / max(_executed, 1), 4)}
+
+        # Against the unpaced run, on the same load
+        if _mode == 'adaptive':
+            _unpaced = _results['none']
+            _result['passed'] = (
+                _result['opened_per_s'] >= (1 - _args.pace_tolerance) * _unpaced['opened_per_s']
+                and _result['timeout_share'] <= _unpaced['timeout_share'] + _args.pace_tolerance
+                and _result['late_share'] <= _unpaced['late_share'] + _args.pace_tolerance)
+
+        if _opened:
+            _result.update({_key: _value for _key, _value in _percentiles_(_opened).items()
+                            if _key in ('p50_us', 'p99_us')})
+        if 'pace_rate' in _stats:
+            _result['final_rate'] = round(_stats['pace_rate'], 1)
+
+        print('pacing  : {:8} {:>8.1f} opened/s in time, {:>6} timeouts, {:>6} opened late, '
+              '{:>6} expired unsent{} - {}'.format(
+                  _mode, _result['opened_per_s'], _result['timeouts'], _result['opened_late'],
+                  _result['expired'], ', rate {} /s'.format(_result['final_rate'])
+                  if 'final_rate' in _result else '',
+                  ('PASS' if _result['passed'] else 'FAIL') if 'passed' in _result else 'reference'))
+
+        _results[_mode] = _result
+
+    return _results
+
+##############################################################################
+
+def _memory_(_args, _symbols):
+
+    _per_symbol = max(_args.memory_ticks // len(_symbols), 1)
+
+    _port = next(_ports)
+    _server = _server_(_args, _port, '--tick-rate', _args.memory_rate / len(_symbols),
+                       '--tick-limit', _per_symbol)
+    _zmq = _connector_(_args, _port, _tick_capacity=_args.tick_capacity)
+
+    _before = _rss_()
+
+    try:
+        _received, _seconds = _receive_(_zmq, _symbols, _per_symbol * len(_symbols))
+        _after = _rss_()
+    finally:
+        _close_(_zmq)
+        _stop_(_server)
+
+    _growth = _after - _before
+    _db = _zmq._Market_Data_DB.nbytes
+
+    _results = {'ticks': _received,
+                'lost': _per_symbol * len(_symbols) - _received,
+                'tick_capacity': _args.tick_capacity,
+                'rss_before_bytes': _before,
+                'rss_after_bytes': _after,
+                'rss_growth_bytes': _growth,
+                'rss_growth_per_million_ticks_bytes': int(_growth * 1e6 / max(_received, 1)),
+                'market_data_db_bytes': _db}
+
+    print('memory  : {} ticks, RSS +{:.1f} MiB ({:.1f} MiB per million ticks, '
+          '{:.1f} MiB in _Market_Data_DB)'.format(
+              _received, _growth / 2**20, _growth / 2**20 * 1e6 / max(_received, 1), _db / 2**20))
+
+    return _results
+
+##############################################################################
+
+def _meta_(_args):
+
+    # Commit measured ('+dirty' with uncommitted changes), if in a git tree
+    _git = lambda *_cmd: subprocess.run(('git',) + _cmd, cwd=_ROOT,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        universal_newlines=True).stdout.strip()
+    try:
+        _commit = _git('rev-parse', '--short', 'HEAD') or None
+        if _commit and _git('status', '--porcelain', '--untracked-files=no'):
+            _commit += '+dirty'
+    except OSError:
+        _commit = None
+
+    return {'commit': _commit,
+            'time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'pyzmq': zmq.__version__,
+            'libzmq': zmq.zmq_version(),
+            'platform': platform.platform(),
+            'options': {_name: _value for _name, _value in vars(_args).items()
+                        if _name not in ('output', 'compare')}}
+
+##############################################################################
+
+def _flatten_(_results, _prefix=''):
+
+    # {'rtt.OPEN.p50_us': 123.4, ...} of the numeric results
+    _out = {}
+
+    for _key, _value in _results.items():
+        if isinstance(_value, dict):
+            _out.update(_flatten_(_value, _prefix + _key + '.'))
+        elif isinstance(_value, list):
+            for _item in _value:
+                if isinstance(_item, dict) and 'rate' in _item:
+                    _out.update(_flatten_(_item, '{}{}.{}.'.format(_prefix, _key, _item['rate'])))
+        elif isinstance(_value, (int, float)) and not isinstance(_value, bool):
+            _out[_prefix + _key] = _value
+
+    return _out
+
+def _compare_(_baseline, _results):
+
+    print('\ncompared with {} ({}):'.format(_baseline['meta'].get('commit'),
+                                             _baseline['meta'].get('time')))
+
+    _old = _flatten_(_baseline['results'])
+    _new = _flatten_(_results)
+
+    for _key in sorted(_new):
+        if _key in _old:
+            _change = '' if not _old[_key] else '{:+.1f}%'.format(
+                (_new[_key] - _old[_key]) / _old[_key] * 100)
+            print('    {:52} {:>14} -> {:>14} {}'.format(_key, _old[_key], _new[_key], _change))
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _list = lambda _type: (lambda _value: [_type(_item) for _item in _value.split(',')])
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--quick', action='store_true',
+                       help='fewer / shorter runs, to check the setup')
+    _args.add_argument('--output', default=None, help='save results as JSON')
+    _args.add_argument('--compare', default=None, help='JSON results to compare with')
+    _args.add_argument('--only', type=_list(str), default=['sub', 'rtt', 'memory', 'batch', 'pacing'],
+                       help='comma-separated parts to run (sub, rtt, memory, batch, pacing)')
+    _args.add_argument('--rates', type=_list(int), default=[2000, 5000, 10000, 20000, 50000],
+                       help='SUB ticks/s asked, over all symbols')
+    _args.add_argument('--symbols', type=int, default=8)
+    _args.add_argument('--seconds', type=float, default=2.0,
+                       help='length of each SUB run')
+    _args.add_argument('--commands', type=int, default=1000,
+                       help='OPEN / CLOSE / GET_OPEN_TRADES requests timed')
+    _args.add_argument('--open-trades', type=int, default=10,
+                       help='trades open while GET_OPEN_TRADES is timed')
+    _args.add_argument('--hist-bars', type=_list(int), default=[100, 1000, 10000])
+    _args.add_argument('--hist-format', choices=('arrays', 'dataframe'), default=None)
+    _args.add_argument('--memory-ticks', type=int, default=1000000)
+    _args.add_argument('--memory-rate', type=int, default=20000,
+                       help='ticks/s published for the memory run, over all symbols')
+    _args.add_argument('--tick-capacity', type=int, default=200000,
+                       help='_tick_capacity for the memory run')
+    _args.add_argument('--batch-size', type=int, default=200,
+                       help='trades closed per batch run')
+    _args.add_argument('--batch-repeat', type=int, default=5)
+    _args.add_argument('--timer-ms', type=float, default=1.0,
+                       help="server's min. milliseconds between commands read in the batch and pacing runs")
+    _args.add_argument('--pace-traders', type=int, default=16,
+                       help='threads opening trades in the pacing run')
+    _args.add_argument('--pace-timeout-ms', type=float, default=20.0,
+                       help='milliseconds before a trader gives up on a request and sends it again')
+    _args.add_argument('--pace-rate', type=float, default=100.0,
+                       help="adaptive pacer's initial commands/s")
+    _args.add_argument('--pace-seconds', type=float, default=5.0,
+                       help='length of each pacing run')
+    _args.add_argument('--pace-tolerance', type=float, default=0.1,
+                       help='share by which a passing adaptive pacing run may do worse than the unpaced one')
+    _args.add_argument('--zero-copy', action='store_true')
+    _args.add_argument('--binary', action='store_true')
+    _args.add_argument('--multipart', action='store_true')
+    _args = _args.parse_args()
+
+    if _args.quick:
+        _args.rates = _args.rates[:3]
+        _args.seconds = min(_args.seconds, 1.0)
+        _args.commands = min(_args.commands, 200)
+        _args.memory_ticks = min(_args.memory_ticks, 100000)
+        _args.batch_repeat = min(_args.batch_repeat, 2)
+        _args.pace_seconds = min(_args.pace_seconds, 2.0)
+
+    try:
+        _symbols = ['SYM{:02d}'.format(i) for i in range(_args.symbols)]
+        _results = {}
+
+        if 'memory' in _args.only:
+            # First, before other runs' buffers are in the heap
+            _results['memory'] = _memory_(_args, _symbols)
+        if 'sub' in _args.only:
+            _results['sub'] = _sub_(_args, _symbols)
+        if 'rtt' in _args.only:
+            _results['rtt'] = _rtt_(_args)
+        if 'batch' in _args.only:
+            _results['batch'] = _batch_(_args)
+        if 'pacing' in _args.only:
+            _results['pacing'] = _pacing_(_args)
+
+        if _args.output is not None:
+            with open(_args.output, 'w') as _file:
+                json.dump({'meta': _meta_(_args), 'results': _results}, _file, indent=2)
+            print('\nresults saved to {}'.format(_args.output))
+
+        if _args.compare is not None:
+            with open(_args.compare) as _file:
+                _compare_(json.load(_file), _results)
+
+    except BaseException:
+        # Blocked poll threads would keep the process alive
+        traceback.print_exc()
+        os._exit(1)
+
+    os._exit(0)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    pull_parser_benchmark.py
+
+    Compares eval() against DWX_ZMQ_Parser on HIST responses built exactly
+    like DWX_GetHist() builds them in the MQL4 server, and building a
+    DataFrame from the parsed bars against DWX_ZMQ_Hist_Decoder's columns.
+
+    Usage:
+        python pull_parser_benchmark.py [--bars 100000] [--repeat 3]
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+from pandas import DataFrame, to_datetime
+from time import perf_counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZMQ_Parser import DWX_ZMQ_Parser
+from api.DWX_ZMQ_History import DWX_ZMQ_Hist_Decoder
+
+##############################################################################
+
+def _generate_hist_response_(_bars):
+
+    _rates = []
+
+    for i in range(_bars):
+        _rates.append("{'time':'" + "2019.01.{:02d} {:02d}:{:02d}".format(i % 28 + 1, (i // 60) % 24, i % 60)
+                      + "', 'open':" + "{:.8f}".format(1.1 + (i % 500) * 1e-5)
+                      + ", 'high':" + "{:.8f}".format(1.1005 + (i % 500) * 1e-5)
+                      + ", 'low':" + "{:.8f}".format(1.0995 + (i % 500) * 1e-5)
+                      + ", 'close':" + "{:.8f}".format(1.1001 + (i % 500) * 1e-5)
+                      + ", 'tick_volume':" + str(i % 300)
+                      + ", 'spread':" + str(i % 3)
+                      + ", 'real_volume':" + "0" + "}")
+
+    return "{'_action': 'HIST', '_data': [" + ", ".join(_rates) + "]}"
+
+##############################################################################
+
+def _best_of_(_repeat, _func, _arg):
+
+    _best = None
+
+    for _ in range(_repeat):
+        _t = perf_counter()
+        _result = _func(_arg)
+        _elapsed = perf_counter() - _t
+        _best = _elapsed if _best is None else min(_best, _elapsed)
+
+    return _best, _result
+
+##############################################################################
+
+def _feed_in_chunks_(_msg, _chunk_size=65536):
+
+    _parser = DWX_ZMQ_Parser()
+    _values = []
+
+    for i in range(0, len(_msg), _chunk_size):
+        _values.extend(_parser.feed(_msg[i:i + _chunk_size]))
+
+    return _values[0]
+
+##############################################################################
+
+def _parse_to_dataframe_(_msg):
+
+    # What a handler has to do with the list of per-bar dicts
+    _df = DataFrame(DWX_ZMQ_Parser.parse(_msg)['_data'])
+    _df.index = to_datetime(_df.pop('time'), format='%Y.%m.%d %H:%M')
+
+    return _df
+
+def _decode_to_dataframe_(_msg):
+
+    return DWX_ZMQ_Hist_Decoder.to_dataframe(DWX_ZMQ_Hist_Decoder.decode(_msg)['_data'])
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--bars', type=int, default=100000)
+    _args.add_argument('--repeat', type=int, default=3)
+    _args = _args.parse_args()
+
+    _msg = _generate_hist_response_(_args.bars)
+    print('HIST response: {} bars, {:.1f} MB'.format(_args.bars, len(_msg) / 1e6))
+
+    _t_eval, _expected = _best_of_(_args.repeat, eval, _msg)
+    _t_parse, _parsed = _best_of_(_args.repeat, DWX_ZMQ_Parser.parse, _msg)
+    _t_feed, _fed = _best_of_(_args.repeat, _feed_in_chunks_, _msg)
+
+    assert _parsed == _expected, 'DWX_ZMQ_Parser.parse() does not match eval()'
+    assert _fed == _expected, 'DWX_ZMQ_Parser.feed() does not match eval()'
+
+    print('eval()                  : {:8.3f} s'.format(_t_eval))
+    print('DWX_ZMQ_Parser.parse()  : {:8.3f} s  ({:.1f}x)'.format(_t_parse, _t_eval / _t_parse))
+    print('DWX_ZMQ_Parser.feed()   : {:8.3f} s  ({:.1f}x, 64 KB chunks)'.format(_t_feed, _t_eval / _t_feed))
+
+    _t_df, _df = _best_of_(_args.repeat, _parse_to_dataframe_, _msg)
+    _t_columns, _columns = _best_of_(_args.repeat, DWX_ZMQ_Hist_Decoder.decode, _msg)
+    _t_decoded_df, _decoded_df = _best_of_(_args.repeat, _decode_to_dataframe_, _msg)
+
+    assert np.array_equal(_decoded_df.index.values.astype('datetime64[s]'),
+                          _df.index.values.astype('datetime64[s]')), 'Bar times differ'
+    assert np.array_equal(_decoded_df.values, _df.values), 'Bar values differ'
+
+    print('parse() + DataFrame     : {:8.3f} s'.format(_t_df))
+    print('Hist_Decoder.decode()   : {:8.3f} s  ({:.1f}x, arrays)'.format(_t_columns, _t_df / _t_columns))
+    print('decode() + DataFrame    : {:8.3f} s  ({:.1f}x)'.format(_t_decoded_df, _t_df / _t_decoded_df))
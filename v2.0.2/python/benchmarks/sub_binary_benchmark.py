@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    sub_binary_benchmark.py
+
+    Compares text SUB messages ("SYMBOL BID;ASK") with binary tick records
+    (api/DWX_ZMQ_Binary_Format.py), in batches of _batch_budget ticks:
+
+        decode  : parse and store already received messages
+        receive : drain the same ticks from an inproc PUB socket, end to end
+
+    Usage:
+        python sub_binary_benchmark.py [--ticks 200000] [--symbols 28] [--multipart]
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import zmq
+import argparse
+from time import perf_counter, sleep, time_ns
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZeroMQ_Connector_v2_0_2_RC1 import DWX_ZeroMQ_Connector
+from api.DWX_ZMQ_Binary_Format import DWX_ZMQ_Binary_Format, KIND_TICK
+
+##############################################################################
+
+def _ticks_(_symbols, _ticks):
+
+    # (TOPIC, TEXT PAYLOAD, BINARY RECORD)
+    _out = []
+
+    for i in range(_ticks):
+        _id = i % len(_symbols)
+        _bid = 1.1 + (i % 100) * 1e-5
+        _out.append((_symbols[_id].encode(),
+                     '{:f};{:f}'.format(_bid, _bid + 0.0002).encode(),
+                     DWX_ZMQ_Binary_Format.encode_tick(_id, 1546300800000 + i, _bid, _bid + 0.0002)))
+
+    return _out
+
+##############################################################################
+
+def _decode_text_(_zmq, _ticks, _budget):
+
+    # Messages as recv_string() returns them
+    _batches = [[(time_ns(), (_topic + b' ' + _text).decode()) for _topic, _text, _ in _ticks[i:i + _budget]]
+                for i in range(0, len(_ticks), _budget)]
+
+    _start = perf_counter()
+
+    for _batch in _batches:
+        _zmq._DWX_ZMQ_Process_Sub_Batch_(_batch)
+
+    return perf_counter() - _start
+
+def _decode_binary_(_zmq, _ticks, _budget):
+
+    _start = perf_counter()
+
+    for i in range(0, len(_ticks), _budget):
+        _batch = _ticks[i:i + _budget]
+        _zmq._DWX_ZMQ_Store_Binary_(KIND_TICK,
+                                    DWX_ZMQ_Binary_Format.decode_ticks(b''.join(_r for _, _, _r in _batch)),
+                                    [time_ns()] * len(_batch),
+                                    [_topic for _topic, _, _ in _batch])
+
+    return perf_counter() - _start
+
+##############################################################################
+
+def _receive_(_zmq, _pub, _sub, _ticks, _binary, _multipart):
+
+    for _topic, _text, _record in _ticks:
+        _payload = _record if _binary else _text
+        if _multipart:
+            _pub.send_multipart([_topic, _payload])
+        else:
+            _pub.send(_topic + b' ' + _payload)
+
+    # Wait for the whole run to be queued on the SUB side
+    while not _sub.poll(0):
+        sleep(0.01)
+    sleep(0.5)
+
+    _received = 0
+    _start = perf_counter()
+
+    while _received < len(_ticks):
+        _received += _zmq._DWX_ZMQ_Drain_Sub_Binary_(_sub)
+
+    return perf_counter() - _start
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--ticks', type=int, default=200000)
+    _args.add_argument('--symbols', type=int, default=28)
+    _args.add_argument('--batch-budget', type=int, default=1000)
+    _args.add_argument('--multipart', action='store_true',
+                       help='[TOPIC, PAYLOAD] frames')
+    _args = _args.parse_args()
+
+    _symbols = ['SYM{:02d}'.format(i) for i in range(_args.symbols)]
+    _ticks = _ticks_(_symbols, _args.ticks)
+
+    _context = zmq.Context()
+    _pub = _context.socket(zmq.PUB)
+    _pub.setsockopt(zmq.SNDHWM, 0)
+    _pub.bind('inproc://ticks')
+
+    _sub = _context.socket(zmq.SUB)
+    _sub.setsockopt(zmq.RCVHWM, 0)
+    _sub.connect('inproc://ticks')
+    _sub.setsockopt_string(zmq.SUBSCRIBE, '')
+
+    # Only the connector's parsing / storing methods are used, on the
+    # sockets above; its own sockets point at unused ports.
+    _zmq = DWX_ZeroMQ_Connector(_PUSH_PORT=32790, _PULL_PORT=32791, _SUB_PORT=32792,
+                                _batch_budget=_args.batch_budget,
+                                _tick_capacity=_args.ticks,
+                                _binary=True)
+
+    # Allocate every symbol's ring buffer before measuring
+    _decode_binary_(_zmq, _ticks[:len(_symbols)], _args.batch_budget)
+    _decode_text_(_zmq, _ticks[:len(_symbols)], _args.batch_budget)
+
+    print('{} ticks, {} symbols, batches of {}{}'.format(
+        _args.ticks, _args.symbols, _args.batch_budget,
+        ', [TOPIC, PAYLOAD] frames' if _args.multipart else ''))
+
+    for _name, _elapsed in (('decode text', _decode_text_(_zmq, _ticks, _args.batch_budget)),
+                            ('decode binary', _decode_binary_(_zmq, _ticks, _args.batch_budget)),
+                            ('receive text', _receive_(_zmq, _pub, _sub, _ticks, False, _args.multipart)),
+                            ('receive binary', _receive_(_zmq, _pub, _sub, _ticks, True, _args.multipart))):
+
+        print('{:15}: {:6.2f} us/tick, {:10,.0f} ticks/s'.format(
+            _name, _elapsed / _args.ticks * 1e6, _args.ticks / _elapsed))
+
+    os._exit(0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    sub_drain_benchmark.py
+
+    Publishes synthetic BID/ASK ticks at a fixed rate to a DWX_ZeroMQ_Connector
+    and reports its poll loop counters (batch size, loop latency), plus how
+    long the connector needs to catch up once publishing stops.
+
+    Usage:
+        python sub_drain_benchmark.py [--rate 50000] [--seconds 5] [--symbols 28]
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import zmq
+import argparse
+from time import perf_counter, sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZeroMQ_Connector_v2_0_2_RC1 import DWX_ZeroMQ_Connector
+
+##############################################################################
+
+def _publish_(_socket, _symbols, _rate, _seconds):
+
+    # Sends in 1 ms slices to hold the average rate
+    _per_slice = max(1, _rate // 1000)
+    _sent = 0
+    _start = perf_counter()
+
+    while perf_counter() - _start < _seconds:
+
+        for _ in range(_per_slice):
+            _symbol = _symbols[_sent % len(_symbols)]
+            _socket.send_string('{} {:.5f};{:.5f}'.format(_symbol,
+                                                          1.1 + (_sent % 100) * 1e-5,
+                                                          1.1002 + (_sent % 100) * 1e-5))
+            _sent += 1
+
+        _due = _start + _sent / _rate
+        _wait = _due - perf_counter()
+
+        if _wait > 0:
+            sleep(_wait)
+
+    return _sent, perf_counter() - _start
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--rate', type=int, default=50000)
+    _args.add_argument('--seconds', type=float, default=5.0)
+    _args.add_argument('--symbols', type=int, default=28)
+    _args.add_argument('--batch-budget', type=int, default=1000)
+    _args.add_argument('--port', type=int, default=32770)
+    _args = _args.parse_args()
+
+    _symbols = ['SYM{:02d}'.format(i) for i in range(_args.symbols)]
+
+    _context = zmq.Context()
+    _pub = _context.socket(zmq.PUB)
+    _pub.setsockopt(zmq.SNDHWM, 0)
+    _pub.bind('tcp://*:{}'.format(_args.port))
+
+    _zmq = DWX_ZeroMQ_Connector(_SUB_PORT=_args.port,
+                                _batch_budget=_args.batch_budget)
+
+    for _symbol in _symbols:
+        _zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_symbol)
+
+    # Let the subscriptions reach the publisher
+    sleep(1)
+
+    _sent, _elapsed = _publish_(_pub, _symbols, _args.rate, _args.seconds)
+
+    # Time to drain whatever is still queued
+    _stop = perf_counter()
+
+    while _zmq._poll_stats['messages'] < _sent and perf_counter() - _stop < 10:
+        sleep(0.001)
+
+    _catch_up = perf_counter() - _stop
+    _stats = _zmq._get_poll_stats_()
+
+    print('Published      : {} ticks in {:.2f} s ({:.0f} msgs/s)'.format(_sent, _elapsed, _sent / _elapsed))
+    print('Received       : {} ticks, caught up {:.1f} ms after publishing stopped'.format(_stats['messages'], _catch_up * 1e3))
+    print('Wakeups        : {}'.format(_stats['wakeups']))
+    print('Batch size     : mean {:.1f}, max {} (budget {} reached {} times)'.format(
+        _stats['mean_batch'], _stats['max_batch'], _args.batch_budget, _stats['budget_exhausted']))
+    print('Loop latency   : mean {:.1f} us, max {:.1f} us'.format(
+        _stats['mean_loop_ns'] / 1e3, _stats['max_loop_ns'] / 1e3))
+
+    # The poll thread blocks in poll(), so leave without joining it
+    _zmq._setStatus(False)
+    os._exit(0)
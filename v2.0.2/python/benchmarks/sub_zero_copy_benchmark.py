@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    sub_zero_copy_benchmark.py
+
+    Compares the default SUB path (recv_string + split) with the zero-copy
+    path (_zero_copy=True, frames parsed in place) on the same queued ticks:
+    time per tick, and memory allocated while draining as seen by tracemalloc
+    (peak above the starting point, per batch of _batch_budget ticks).
+
+    Usage:
+        python sub_zero_copy_benchmark.py [--ticks 100000] [--symbols 28] [--multipart]
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import zmq
+import argparse
+import tracemalloc
+from time import perf_counter, sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZeroMQ_Connector_v2_0_2_RC1 import DWX_ZeroMQ_Connector
+
+##############################################################################
+
+def _publish_(_pub, _symbols, _ticks, _multipart):
+
+    for i in range(_ticks):
+        _topic = _symbols[i % len(_symbols)]
+        _payload = '{:.5f};{:.5f}'.format(1.1 + (i % 100) * 1e-5, 1.1002 + (i % 100) * 1e-5)
+
+        if _multipart:
+            _pub.send_multipart([_topic.encode(), _payload.encode()])
+        else:
+            _pub.send_string(_topic + ' ' + _payload)
+
+##############################################################################
+
+def _drain_copy_(_zmq, _sub):
+
+    _batch = _zmq._DWX_ZMQ_Drain_(_sub)
+    _zmq._DWX_ZMQ_Process_Sub_Batch_(_batch)
+
+    return len(_batch)
+
+def _drain_zero_copy_(_zmq, _sub):
+
+    return _zmq._DWX_ZMQ_Drain_Sub_Zero_Copy_(_sub)
+
+##############################################################################
+
+def _run_(_zmq, _pub, _sub, _drain, _symbols, _ticks, _multipart, _trace):
+
+    _publish_(_pub, _symbols, _ticks, _multipart)
+
+    # Wait for the whole run to be queued on the SUB side
+    while not _sub.poll(0):
+        sleep(0.01)
+    sleep(0.5)
+
+    _received = 0
+    _peak = 0
+
+    if _trace:
+        tracemalloc.start()
+
+    _start = perf_counter()
+
+    while _received < _ticks:
+
+        if _trace:
+            tracemalloc.reset_peak()
+            _before = tracemalloc.get_traced_memory()[0]
+
+        _received += _drain(_zmq, _sub)
+
+        if _trace:
+            _peak = max(_peak, tracemalloc.get_traced_memory()[1] - _before)
+
+    _elapsed = perf_counter() - _start
+
+    if _trace:
+        tracemalloc.stop()
+
+    return _elapsed, _peak
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--ticks', type=int, default=100000)
+    _args.add_argument('--symbols', type=int, default=28)
+    _args.add_argument('--batch-budget', type=int, default=1000)
+    _args.add_argument('--multipart', action='store_true',
+                       help='[TOPIC, PAYLOAD] frames (zero-copy path only)')
+    _args = _args.parse_args()
+
+    _symbols = ['SYM{:02d}'.format(i) for i in range(_args.symbols)]
+
+    _context = zmq.Context()
+    _pub = _context.socket(zmq.PUB)
+    _pub.setsockopt(zmq.SNDHWM, 0)
+    _pub.bind('inproc://ticks')
+
+    _sub = _context.socket(zmq.SUB)
+    _sub.setsockopt(zmq.RCVHWM, 0)
+    _sub.connect('inproc://ticks')
+    _sub.setsockopt_string(zmq.SUBSCRIBE, '')
+
+    # Only the connector's parsing / storing methods are used, on the
+    # sockets above; its own sockets point at unused ports.
+    _zmq = DWX_ZeroMQ_Connector(_PUSH_PORT=32790, _PULL_PORT=32791, _SUB_PORT=32792,
+                                _batch_budget=_args.batch_budget,
+                                _tick_capacity=_args.ticks)
+
+    # Allocate every symbol's ring buffer before measuring
+    _publish_(_pub, _symbols, len(_symbols), _args.multipart)
+    sleep(0.5)
+    _drain_zero_copy_(_zmq, _sub)
+
+    _modes = [('zero-copy', _drain_zero_copy_)]
+
+    if not _args.multipart:
+        _modes.insert(0, ('recv_string', _drain_copy_))
+
+    print('{} ticks, {} symbols, batches of {}{}'.format(
+        _args.ticks, _args.symbols, _args.batch_budget,
+        ', [TOPIC, PAYLOAD] frames' if _args.multipart else ''))
+
+    for _name, _drain in _modes:
+
+        _elapsed, _ = _run_(_zmq, _pub, _sub, _drain, _symbols, _args.ticks, _args.multipart, False)
+        _, _peak = _run_(_zmq, _pub, _sub, _drain, _symbols, _args.ticks, _args.multipart, True)
+
+        print('{:12}: {:6.2f} us/tick, {:8.0f} bytes allocated per batch ({:.1f} per tick)'.format(
+            _name, _elapsed / _args.ticks * 1e6, _peak, _peak / _args.batch_budget))
+
+    os._exit(0)
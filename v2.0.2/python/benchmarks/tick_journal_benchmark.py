@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    tick_journal_benchmark.py
+
+    Cost of recording every SUB message in the tick journal
+    (api/DWX_ZMQ_Tick_Journal.py): drains the same queued ticks with and
+    without _tick_journal, for the default and the zero-copy SUB paths,
+    then replays the journal to check every tick was recorded.
+
+    Usage:
+        python tick_journal_benchmark.py [--ticks 200000] [--symbols 28] [--dir /tmp/journal]
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import zmq
+import argparse
+import tempfile
+from time import perf_counter, sleep, time_ns
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZeroMQ_Connector_v2_0_2_RC1 import DWX_ZeroMQ_Connector
+from api.DWX_ZMQ_Tick_Journal import DWX_ZMQ_Tick_Journal
+
+##############################################################################
+
+def _publish_(_pub, _symbols, _ticks):
+
+    for i in range(_ticks):
+        _pub.send_string('{} {:.5f};{:.5f}'.format(_symbols[i % len(_symbols)],
+                                                  1.1 + (i % 100) * 1e-5,
+                                                  1.1002 + (i % 100) * 1e-5))
+
+##############################################################################
+
+def _drain_copy_(_zmq, _sub):
+
+    _batch = _zmq._DWX_ZMQ_Drain_(_sub)
+
+    if _zmq._Tick_Journal is not None:
+        _zmq._DWX_ZMQ_Journal_Batch_(_batch)
+
+    _zmq._DWX_ZMQ_Process_Sub_Batch_(_batch)
+
+    return len(_batch)
+
+def _drain_zero_copy_(_zmq, _sub):
+    return _zmq._DWX_ZMQ_Drain_Sub_Zero_Copy_(_sub)
+
+##############################################################################
+
+def _run_(_zmq, _pub, _sub, _drain, _symbols, _ticks):
+
+    _publish_(_pub, _symbols, _ticks)
+
+    # Wait for the whole run to be queued on the SUB side
+    while not _sub.poll(0):
+        sleep(0.01)
+    sleep(0.5)
+
+    _received = 0
+    _start = perf_counter()
+
+    while _received < _ticks:
+        _received += _drain(_zmq, _sub)
+        if _zmq._Tick_Journal is not None:
+            _zmq._Tick_Journal._flush_()
+
+    return perf_counter() - _start
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--ticks', type=int, default=200000)
+    _args.add_argument('--symbols', type=int, default=28)
+    _args.add_argument('--batch-budget', type=int, default=1000)
+    _args.add_argument('--dir', default=None,
+                       help='journal directory (default: a temporary one)')
+    _args = _args.parse_args()
+
+    _dir = _args.dir or tempfile.mkdtemp(prefix='dwx_journal_')
+    _symbols = ['SYM{:02d}'.format(i) for i in range(_args.symbols)]
+
+    _context = zmq.Context()
+    _pub = _context.socket(zmq.PUB)
+    _pub.setsockopt(zmq.SNDHWM, 0)
+    _pub.bind('inproc://ticks')
+
+    _sub = _context.socket(zmq.SUB)
+    _sub.setsockopt(zmq.RCVHWM, 0)
+    _sub.connect('inproc://ticks')
+    _sub.setsockopt_string(zmq.SUBSCRIBE, '')
+
+    # Only the connector's parsing / storing methods are used, on the
+    # sockets above; its own sockets point at unused ports.
+    _zmq = DWX_ZeroMQ_Connector(_PUSH_PORT=32790, _PULL_PORT=32791, _SUB_PORT=32792,
+                                _batch_budget=_args.batch_budget,
+                                _tick_capacity=_args.ticks,
+                                _tick_journal=_dir)
+    _journal = _zmq._Tick_Journal
+
+    # Allocate every symbol's ring buffer before measuring
+    _publish_(_pub, _symbols, len(_symbols))
+    sleep(0.5)
+    _zmq._Tick_Journal = None
+    _drain_zero_copy_(_zmq, _sub)
+
+    print('{} ticks, {} symbols, batches of {}, journal in {}'.format(
+        _args.ticks, _args.symbols, _args.batch_budget, _dir))
+
+    for _name, _drain in (('recv_string', _drain_copy_), ('zero-copy', _drain_zero_copy_)):
+
+        _zmq._Tick_Journal = None
+        _off = _run_(_zmq, _pub, _sub, _drain, _symbols, _args.ticks)
+
+        _zmq._Tick_Journal = _journal
+        _on = _run_(_zmq, _pub, _sub, _drain, _symbols, _args.ticks)
+
+        print('{:12}: {:6.2f} us/tick without journal, {:6.2f} with ({:+.2f})'.format(
+            _name, _off / _args.ticks * 1e6, _on / _args.ticks * 1e6,
+            (_on - _off) / _args.ticks * 1e6))
+
+    _journal._close_()
+
+    _start = perf_counter()
+    _day = DWX_ZMQ_Tick_Journal._day_name_(time_ns() // (86400 * 10**9))
+    _replayed = sum(1 for _ in DWX_ZMQ_Tick_Journal.replay(_dir, _day))
+
+    print('replay      : {} entries in {:.2f} s ({} recorded)'.format(
+        _replayed, perf_counter() - _start, 2 * _args.ticks))
+
+    os._exit(0)
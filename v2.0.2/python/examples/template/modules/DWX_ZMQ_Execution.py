@@ -13,8 +13,7 @@
     https://opensource.org/licenses/BSD-3-Clause
 """
 
-from pandas import to_datetime
-from time import sleep
+from concurrent.futures import TimeoutError
 
 class DWX_ZMQ_Execution():
     
@@ -30,6 +29,7 @@ class DWX_ZMQ_Execution():
                   _wbreak=10):
         
         _check = ''
+        _future = None
         
         # Reset thread data output
         self._zmq._set_response_(None)
@@ -38,33 +38,49 @@ class DWX_ZMQ_Execution():
         if _exec_dict['_action'] == 'OPEN':
             
             _check = '_action'
-            self._zmq._DWX_MTX_NEW_TRADE_(_order=_exec_dict)
+            
+            # Not sent at all once this call has given up on it
+            _future = self._zmq._DWX_MTX_NEW_TRADE_(_order=_exec_dict,
+                                                    _expiry=_delay * _wbreak)
             
         # CLOSE TRADE
         elif _exec_dict['_action'] == 'CLOSE':
             
             _check = '_response_value'
-            self._zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(_exec_dict['_ticket'])
+            _future = self._zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(_exec_dict['_ticket'])
             
         if _verbose:
             print('\n[{}] {} -> MetaTrader'.format(_exec_dict['_comment'],
                                                    str(_exec_dict)))
-            
-        # While loop start time reference            
-        _ws = to_datetime('now')
         
-        # While data not received, sleep until timeout
-        while self._zmq._valid_response_('zmq') == False:
-            sleep(_delay)
+        # Not sent (send backlog full): no response will come
+        if _future is False:
+            return None
+        
+        # Request IDs enabled: wait for this command's own response
+        if _future is not None:
+            
+            try:
+                _response = _future.result(timeout=_delay * _wbreak)
+            except TimeoutError:
+                self._zmq._DWX_MTX_CANCEL_REQUEST_(_future)
+                return None
+            except Exception:                   # Command could not be sent
+                return None
+            
+            if _check in _response.keys():
+                return _response
+            
+            return None
             
-            if (to_datetime('now') - _ws).total_seconds() > (_delay * _wbreak):
-                break
+        # Wait for the poll thread to store a response, until timeout
+        _response = self._zmq._wait_response_(_delay * _wbreak)
         
         # If data received, return DataFrame
-        if self._zmq._valid_response_('zmq'):
+        if _response is not None:
             
-            if _check in self._zmq._get_response_().keys():
-                return self._zmq._get_response_()
+            if _check in _response.keys():
+                return _response
                 
         # Default
         return None
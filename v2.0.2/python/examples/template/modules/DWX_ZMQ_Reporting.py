@@ -13,8 +13,8 @@
     https://opensource.org/licenses/BSD-3-Clause
 """
 
-from pandas import DataFrame, to_datetime
-from time import sleep
+from pandas import DataFrame
+from concurrent.futures import TimeoutError
 
 class DWX_ZMQ_Reporting():
     
@@ -26,27 +26,48 @@ class DWX_ZMQ_Reporting():
     def _get_open_trades_(self, _trader='Trader_SYMBOL', 
                           _delay=0.1, _wbreak=10):
         
+        # Answer from the connector's trades book, unless it is due for a
+        # snapshot (the GET_OPEN_TRADES response below reconciles it)
+        _book = self._zmq._Trades_Book
+        
+        if _book is not None and not _book._due_():
+            
+            _trades = _book.select(_comment=_trader)
+            
+            if len(_trades) > 0:
+                return DataFrame(data=_trades.values(),
+                                 index=_trades.keys())
+            
+            return DataFrame()
+        
         # Reset data output
         self._zmq._set_response_(None)
         
         # Get open trades from MetaTrader
-        self._zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()
-
-        # While loop start time reference            
-        _ws = to_datetime('now')
+        _future = self._zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()
+        
+        # Not sent (send backlog full): no response will come
+        if _future is False:
+            _response = None
         
-        # While data not received, sleep until timeout
-        while self._zmq._valid_response_('zmq') == False:
+        # Request IDs enabled: wait for this command's own response
+        elif _future is not None:
             
-            sleep(_delay)
+            try:
+                _response = _future.result(timeout=_delay * _wbreak)
+            except TimeoutError:
+                self._zmq._DWX_MTX_CANCEL_REQUEST_(_future)
+                _response = None
+            except Exception:                   # Command could not be sent
+                _response = None
+        
+        else:
             
-            if (to_datetime('now') - _ws).total_seconds() > (_delay * _wbreak):
-                break
+            # Wait for the poll thread to store a response, until timeout
+            _response = self._zmq._wait_response_(_delay * _wbreak)
         
         # If data received, return DataFrame
-        if self._zmq._valid_response_('zmq'):
-            
-            _response = self._zmq._get_response_()
+        if self._zmq._valid_response_(_response):
             
             if ('_trades' in _response.keys()
                 and len(_response['_trades']) > 0):
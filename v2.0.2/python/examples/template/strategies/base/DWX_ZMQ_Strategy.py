@@ -36,7 +36,9 @@ class DWX_ZMQ_Strategy(object):
                  _broker_gmt=3,                 # Darwinex GMT offset
                  _pulldata_handlers = [],       # Handlers to process data received through PULL port.
                  _subdata_handlers = [],        # Handlers to process data received through SUB port.
-                 _verbose=False):               # Print ZeroMQ messages
+                 _verbose=False,                # Print ZeroMQ messages
+                 _request_ids=False,            # Match responses to commands by request ID
+                 _handler_workers=0):           # Run handlers off the poll thread
                  
         self._name = _name
         self._symbols = _symbols
@@ -45,7 +47,9 @@ class DWX_ZMQ_Strategy(object):
         # Not entirely necessary here.
         self._zmq = DWX_ZeroMQ_Connector(_pulldata_handlers=_pulldata_handlers,
                                          _subdata_handlers=_subdata_handlers,
-                                         _verbose=_verbose)
+                                         _verbose=_verbose,
+                                         _request_ids=_request_ids,
+                                         _handler_workers=_handler_workers)
         
         # Modules
         self._execution = DWX_ZMQ_Execution(self._zmq)
@@ -82,7 +82,10 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
         self._delay = _delay
         self._verbose = _verbose
         
-        # lock for acquire/release of ZeroMQ connector
+        # Commands can be sent from any thread (the connector's sender
+        # thread owns the socket), but without request IDs every trader reads
+        # the same latest response: this lock keeps each trader's commands
+        # and their responses together
         self._lock = Lock()
         
     ##########################################################################
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    prices_subscriptions_async.py
+
+    asyncio version of prices_subscriptions.py: one coroutine per symbol
+    consumes its own bid-ask stream from AsyncDWX_ZeroMQ_Connector, so the
+    number of symbols is not limited by the number of threads.
+
+    Each coroutine prints the first 10 prices of its symbol and returns.
+    Once all have finished, the price feeds are removed in the Expert
+    Advisor and the program finishes.
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+#############################################################################
+# DWX-ZMQ required imports
+#############################################################################
+
+
+# Append path for main project folder
+import sys
+sys.path.append('../../..')
+
+# Import asyncio ZMQ-Connector from relative path
+from api.AsyncDWX_ZeroMQ_Connector_v2_0_2_RC1 import AsyncDWX_ZeroMQ_Connector
+
+
+#############################################################################
+# Other required imports
+#############################################################################
+
+import asyncio
+
+
+#############################################################################
+# Per-symbol coroutines sharing one connector
+#############################################################################
+
+class prices_subscriptions_async():
+
+    def __init__(self,
+                 _symbols=['EURUSD','GDAXI'],
+                 _prices=10,
+                 _verbose=False):
+
+        self._symbols = _symbols
+        self._prices = _prices
+
+        self._zmq = AsyncDWX_ZeroMQ_Connector(_verbose=_verbose)
+
+    ##########################################################################
+    async def _trader_(self, _symbol):
+        """
+        Consumes _symbol's price stream until self._prices have arrived
+        """
+        _count = 0
+
+        async for _timestamp, (_bid, _ask) in self._zmq._DWX_MTX_MARKETDATA_STREAM_(_symbol):
+
+            print('[{}] {} {}/{}'.format(_symbol, _timestamp, _bid, _ask))
+
+            _count += 1
+            if _count >= self._prices:
+                break
+
+    ##########################################################################
+    async def run(self):
+        """
+        Subscribes to self._symbols, runs one trader per symbol, then removes
+        the price feeds
+        """
+        for _symbol in self._symbols:
+            await self._zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_symbol)
+
+        print(await self._zmq._DWX_MTX_SEND_TRACKPRICES_REQUEST_(self._symbols))
+
+        await asyncio.gather(*[self._trader_(_symbol) for _symbol in self._symbols])
+
+        print(await self._zmq._DWX_MTX_SEND_TRACKPRICES_REQUEST_([]))
+
+        self._zmq._close_()
+
+
+""" -----------------------------------------------------------------------------------------------
+    -----------------------------------------------------------------------------------------------
+    SCRIPT SETUP
+    -----------------------------------------------------------------------------------------------
+    -----------------------------------------------------------------------------------------------
+"""
+if __name__ == "__main__":
+
+  # creates object with a predefined configuration: symbol list including EURUSD and GDAXI
+  example = prices_subscriptions_async()
+
+  # Runs example until every symbol has received its prices
+  asyncio.run(example.run())
+  print('Bye!!!')
@@ -117,7 +117,8 @@ class rates_historic(DWX_ZMQ_Strategy):
         self._zmq._DWX_MTX_SEND_MARKETHIST_REQUEST_(_symbol='EURGBP',
                                                     _timeframe=1440,
                                                     _start='2019.01.04 00:00:00',
-                                                    _end  ='2019.01.14 00:00:00')
+                                                    _end  ='2019.01.14 00:00:00',
+                                                    _format='dataframe') # '_data' as a DataFrame
 
     ##########################################################################    
     def stop(self):
@@ -0,0 +1,1101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    DWX_ZeroMQ_Server.py
+
+    Python stand-in for DWX_ZeroMQ_Server_v2.0.2_RC1.mq4 and
+    DWX_ZeroMQ_Service_v1.0.0.mq5 (same ports, commands and responses, with
+    a simulated account and price feed), for running the connectors without
+    MetaTrader: local testing, CI, benchmarks.
+
+    Usage:
+        python DWX_ZeroMQ_Server.py [--push-port 32768] [--pull-port 32769] [--pub-port 32770]
+                                    [--multipart] [--binary] [--dialect mt4|mt5]
+                                    [--symbols EURUSD,GBPUSD] [--tick-rate 1000] [--tick-limit 5000]
+                                    [--timer-ms 1]
+                                    [--replay JOURNAL_DIR [--replay-day 2019-01-04] [--replay-speed 1]]
+
+    DW_ZeroMQ_Connector_v1_1.py connects to ports 32766 / 32767 by default:
+        python DWX_ZeroMQ_Server.py --dialect mt5 --push-port 32766 --pull-port 32767
+    --
+
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import sys
+import zmq
+import random
+import argparse
+from time import sleep, time, monotonic
+from datetime import datetime, timedelta
+from threading import Thread, Lock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from api.DWX_ZMQ_Binary_Format import DWX_ZMQ_Binary_Format
+from api.DWX_ZMQ_Tick_Journal import DWX_ZMQ_Tick_Journal
+
+# Instrument names are SYMBOL_TIMEFRAME, as in GetTimeframeText()
+_TIMEFRAME_TEXT = {1: 'M1', 5: 'M5', 15: 'M15', 30: 'M30', 60: 'H1',
+                   240: 'H4', 1440: 'D1', 10080: 'W1', 43200: 'MN1'}
+
+# MT5 Service actions (ENUM_DWX_SERV_ACTION, as in DW_ZeroMQ_Connector_v1_1.py)
+HEARTBEAT=0
+POS_OPEN=1
+POS_MODIFY=2
+POS_CLOSE=3
+POS_CLOSE_PARTIAL=4
+POS_CLOSE_MAGIC=5
+POS_CLOSE_ALL=6
+ORD_OPEN=7
+ORD_MODIFY=8
+ORD_DELETE=9
+ORD_DELETE_ALL=10
+GET_POSITIONS=11
+GET_PENDING_ORDERS=12
+GET_DATA=13
+GET_TICK_DATA=14
+GET_DATA_SYMBOL=15
+GET_ALL_SYMBOLS=16
+
+# Commands accepted in a TRADE_BATCH
+_BATCH_ACTIONS = ('OPEN', 'MODIFY', 'CLOSE', 'CLOSE_PARTIAL')
+
+# MT5 Service's Publish_Symbols
+_MT5_SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY', 'USDCAD', 'AUDUSD', 'NZDUSD', 'USDCHF']
+
+# Simulated symbol properties (every symbol is quoted with 5 digits)
+_POINT = 0.00001
+_DIGITS = 5
+
+_EPOCH = datetime(1970, 1, 1)
+
+class DWX_ZeroMQ_Server():
+
+    """
+    Setup MetaTrader stand-in (binds the ports DWX_ZeroMQ_Connector connects to)
+    """
+    def __init__(self,
+                 _host='*',                 # Interface to bind to
+                 _protocol='tcp',           # Connection protocol
+                 _PUSH_PORT=32768,          # Port clients PUSH commands to
+                 _PULL_PORT=32769,          # Port clients PULL responses from
+                 _PUB_PORT=32770,           # Port clients SUBscribe to
+                 _publish_delay=0.1,        # Seconds between published ticks
+                 _poll_timeout=100,         # ZMQ Poller Timeout (ms)
+                 _seed=None,                # Random seed for the price feed
+                 _multipart=False,          # Publish topic and payload as two frames
+                 _binary=False,             # Publish binary records instead of text
+                 _dialect='mt4',            # SUB format: 'mt4' (Expert Advisor) or 'mt5' (Service)
+                 _symbols=None,             # Symbols of GET_ALL_SYMBOLS, published from the start if 'mt5'
+                 _tick_rate=None,           # Ticks per second per symbol (None: one per _publish_delay)
+                 _tick_limit=None,          # Ticks per symbol to publish, then only rates (None: no limit)
+                 _max_lots=1.0,             # MT5 MaximumLotSize
+                 _timer_interval=None,      # Min. seconds between commands read (None: no wait)
+                 _replay=None,              # Tick journal directory to publish instead of synthetic ticks
+                 _replay_day=None,          # Journal day ('%Y-%m-%d', None: the latest)
+                 _replay_speed=1.0,         # Replay pace, x recorded (0: as fast as possible)
+                 _verbose=False):
+
+        if _dialect not in ('mt4', 'mt5'):
+            raise ValueError("Unknown dialect {!r}, expected 'mt4' or 'mt5'".format(_dialect))
+
+        self._ACTIVE = True
+        self._verbose = _verbose
+        self._poll_timeout = _poll_timeout
+        self._publish_delay = _publish_delay
+        self._multipart = _multipart
+        self._binary = _binary
+        self._dialect = _dialect
+        self._symbols = list(_symbols or _MT5_SYMBOLS)
+        self._tick_rate = _tick_rate
+        self._tick_limit = _tick_limit
+        self._max_lots = _max_lots
+        self._timer_interval = _timer_interval
+        self._replay = _replay
+        self._replay_day = _replay_day
+        self._replay_speed = _replay_speed
+        self._random = random.Random(_seed)
+
+        self._ZMQ_CONTEXT = zmq.Context()
+        self._URL = _protocol + "://" + _host + ":"
+
+        # Same socket layout as the Expert Advisor: commands arrive on the
+        # client's PUSH port, responses leave on the client's PULL port.
+        self._PULL_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PULL)
+        self._PULL_SOCKET.bind(self._URL + str(_PUSH_PORT))
+
+        self._PUSH_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUSH)
+        self._PUSH_SOCKET.bind(self._URL + str(_PULL_PORT))
+
+        self._PUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUB)
+        self._PUB_SOCKET.bind(self._URL + str(_PUB_PORT))
+
+        # Simulated market ({SYMBOL: (BID, ASK)}) and account ({TICKET: {..}},
+        # MT5 pending orders apart)
+        self._prices = {}
+        self._trades = {}
+        self._orders = {}
+        self._next_ticket = 85000000
+        self._lock = Lock()
+
+        # Published symbols / (symbol, timeframe) instruments
+        self._publish_symbols = list(self._symbols) if _dialect == 'mt5' else []
+        self._publish_instruments = []
+
+        # Symbol IDs of binary records ({TOPIC: ID})
+        self._symbol_ids = {}
+
+        # Last published tick time per symbol ({SYMBOL: ms since epoch})
+        self._tick_msc = {}
+
+        # Client request ID of the command being handled
+        self._request_id = None
+
+        self._Command_Thread = Thread(target=self._DWX_ZMQ_Serve_Commands_)
+        self._Command_Thread.daemon = True
+
+        self._Publish_Thread = Thread(target=self._DWX_ZMQ_Publish_Data_)
+        self._Publish_Thread.daemon = True
+
+    ##########################################################################
+
+    def _start_(self):
+
+        self._Command_Thread.start()
+        self._Publish_Thread.start()
+
+        print("[INIT] Stand-in MetaTrader server running.")
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        self._ACTIVE = False
+
+        self._Command_Thread.join()
+        self._Publish_Thread.join()
+
+        self._ZMQ_CONTEXT.destroy(0)
+
+        print("\n++ [KERNEL] Stand-in MetaTrader server stopped.")
+
+    ##########################################################################
+
+    """
+    Simulated market
+    """
+    def _get_bid_ask_(self, _symbol):
+
+        with self._lock:
+
+            if _symbol not in self._prices:
+                _bid = round(self._random.uniform(0.5, 2.0), 5)
+            else:
+                _bid = round(self._prices[_symbol][0]
+                             + self._random.choice((-1, 0, 1)) * 0.00001, 5)
+
+            self._prices[_symbol] = (_bid, round(_bid + 0.00002, 5))
+
+            return self._prices[_symbol]
+
+    def _time_string_(self, _seconds=True):
+
+        return datetime.now().strftime('%Y.%m.%d %H:%M:%S' if _seconds
+                                       else '%Y.%m.%d %H:%M')
+
+    def _string_to_time_(self, _string):
+
+        # StringToTime(): 'YYYY.MM.DD [HH:MM[:SS]]', None if malformed
+        for _format in ('%Y.%m.%d %H:%M:%S', '%Y.%m.%d %H:%M', '%Y.%m.%d'):
+            try:
+                return datetime.strptime(_string, _format)
+            except ValueError:
+                pass
+
+        return None
+
+    ##########################################################################
+
+    """
+    Function to receive and answer commands (the Expert Advisor's OnTimer())
+    """
+    def _DWX_ZMQ_Serve_Commands_(self):
+
+        _poller = zmq.Poller()
+        _poller.register(self._PULL_SOCKET, zmq.POLLIN)
+
+        # Earliest time the next command may be read (OnTimer() pacing)
+        _next_read = monotonic()
+
+        while self._ACTIVE:
+
+            if self._timer_interval is not None:
+                _wait = _next_read - monotonic()
+                if _wait > 0:
+                    sleep(_wait)
+
+            if not _poller.poll(self._poll_timeout):
+                continue
+
+            try:
+                _msg = self._PULL_SOCKET.recv_string(zmq.DONTWAIT)
+            except zmq.error.Again:
+                continue
+
+            if self._timer_interval is not None:
+                _next_read = monotonic() + self._timer_interval
+
+            if self._verbose:
+                print("[COMMAND] " + _msg)
+
+            # Responses are built before any is sent, so a malformed command
+            # gets only the error response
+            try:
+                _responses = list(self._DWX_ZMQ_Handle_Message_(_msg))
+            except Exception as ex:
+                _responses = [self._DWX_ZMQ_Error_Response_(_msg, ex)]
+
+            for _response in _responses:
+                self._PUSH_SOCKET.send_string(_response)
+
+    ##########################################################################
+
+    """
+    Function yielding the response messages to a command (usually one, none
+    for unknown commands, one per chunk for chunked HIST)
+    """
+    def _DWX_ZMQ_Handle_Message_(self, _msg):
+
+        # Strip client request ID, if any
+        self._request_id = None
+
+        if _msg.startswith('@') and ';' in _msg:
+            _id, _msg = _msg[1:].split(';', 1)
+            self._request_id = int(_id) if _id.isdigit() else None
+
+        if _msg.startswith('TRADE_BATCH;'):
+            _response = self._DWX_ZMQ_Handle_Trade_Batch_(_msg)
+        else:
+            _response = self._DWX_ZMQ_Interpret_Message_(_msg.split(';'))
+
+        if _response is None:
+            return
+
+        if isinstance(_response, dict):
+            _response = [_response]
+
+        for _r in _response:
+
+            # Echo client request ID
+            if self._request_id is not None:
+                _r = dict(_request_id=self._request_id, **_r)
+
+            yield str(_r)
+
+    def _DWX_ZMQ_Error_Response_(self, _msg, _exception):
+
+        # The command's first field (after any request ID) as the action
+        if _msg.startswith('@') and ';' in _msg:
+            _msg = _msg.split(';', 1)[1]
+
+        _response = {'_action': _msg.split(';', 1)[0],
+                     '_response': 'INVALID_COMMAND',
+                     '_response_value': str(_exception)}
+
+        if self._request_id is not None:
+            _response = dict(_request_id=self._request_id, **_response)
+
+        if self._verbose:
+            print("[ERROR] {}: {}".format(_msg, _exception))
+
+        return str(_response)
+
+    ##########################################################################
+
+    def _DWX_ZMQ_Interpret_Message_(self, _compArray):
+
+        # MT5 Service dialect (DW_ZeroMQ_Connector_v1_1.py): numeric action
+        # code first, e.g. 1;0;EURUSD;0.0;500;500;DWX;0.01;123456;0 (POS_OPEN)
+        if _compArray[0].isdigit():
+            return self._DWX_ZMQ_Interpret_MT5_Message_(_compArray)
+
+        if _compArray[0] == 'TRADE' and len(_compArray) == 11:
+            return self._DWX_ZMQ_Handle_Trade_(_compArray)
+
+        if _compArray[0] == 'DATA' and len(_compArray) == 5:
+            return self._DWX_GetData_(_compArray)
+
+        if _compArray[0] == 'HIST' and len(_compArray) == 5:
+            return self._DWX_GetHist_(_compArray)
+
+        if _compArray[0] == 'HIST' and len(_compArray) == 6:
+            return self._DWX_GetHist_Chunked_(_compArray, int(_compArray[5]))
+
+        if _compArray[0] == 'TRACK_PRICES':
+            self._publish_symbols = [s for s in _compArray[1:] if s != '']
+            return {'_action': 'TRACK_PRICES',
+                    '_data': {'symbol_count': len(self._publish_symbols)}}
+
+        if _compArray[0] == 'TRACK_RATES':
+            self._publish_instruments = list(zip(_compArray[1::2],
+                                                 [int(tf) for tf in _compArray[2::2]]))
+            return {'_action': 'TRACK_RATES',
+                    '_data': {'instrument_count': len(self._publish_instruments)}}
+
+        # Unknown commands get no response, as in the Expert Advisor
+        return None
+
+    ##########################################################################
+
+    """
+    Trading (TRADE;ACTION;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;TICKET)
+    """
+    def _DWX_ZMQ_Handle_Trade_(self, _compArray):
+
+        _action = _compArray[1]
+
+        if _action == 'OPEN':
+            return self._DWX_OpenOrder_(_compArray[3], int(_compArray[2]),
+                                        float(_compArray[8]), float(_compArray[5]),
+                                        float(_compArray[6]), _compArray[7],
+                                        int(_compArray[9]))
+
+        if _action == 'MODIFY':
+            _ticket = int(_compArray[10])
+            _response = {'_action': 'MODIFY', '_ticket': _ticket}
+
+            if _ticket in self._trades:
+                self._trades[_ticket]['_SL'] = float(_compArray[5])
+                self._trades[_ticket]['_TP'] = float(_compArray[6])
+                _response.update({'_sl': float(_compArray[5]),
+                                  '_tp': float(_compArray[6])})
+            else:
+                _response['_response'] = 'NOT_FOUND'
+
+            return _response
+
+        if _action == 'CLOSE':
+            _ticket = int(_compArray[10])
+            _response = {'_action': 'CLOSE', '_ticket': _ticket}
+
+            if _ticket in self._trades:
+                _response.update(self._DWX_CloseAtMarket_(_ticket))
+                _response.update({'_response': 'CLOSE_MARKET',
+                                  '_response_value': 'SUCCESS'})
+            else:
+                _response['_response'] = 'NOT_FOUND'
+
+            return _response
+
+        if _action == 'CLOSE_PARTIAL':
+            _ticket = int(_compArray[10])
+            _response = {'_action': 'CLOSE', '_ticket': _ticket,
+                         '_response': 'CLOSE_PARTIAL'}
+
+            if _ticket in self._trades:
+                _response.update(self._DWX_CloseAtMarket_(_ticket,
+                                                          float(_compArray[8])))
+
+            return _response
+
+        if _action in ('CLOSE_MAGIC', 'CLOSE_ALL'):
+
+            if _action == 'CLOSE_MAGIC':
+                _magic = int(_compArray[9])
+                _response = {'_action': 'CLOSE_ALL_MAGIC', '_magic': _magic}
+                _tickets = [t for t, o in self._trades.items() if o['_magic'] == _magic]
+            else:
+                _response = {'_action': 'CLOSE_ALL'}
+                _tickets = list(self._trades.keys())
+
+            _response['_responses'] = {}
+
+            for _ticket in _tickets:
+                _closed = {'_symbol': self._trades[_ticket]['_symbol']}
+                _closed.update(self._DWX_CloseAtMarket_(_ticket))
+                _closed['_response'] = 'CLOSE_MARKET'
+                _response['_responses'][_ticket] = _closed
+
+            if _tickets:
+                _response['_response_value'] = 'SUCCESS'
+            else:
+                _response['_response'] = 'NOT_FOUND'
+
+            return _response
+
+        if _action == 'GET_OPEN_TRADES':
+            return {'_action': 'OPEN_TRADES',
+                    '_trades': {t: dict(o) for t, o in self._trades.items()}}
+
+        return None
+
+    ##########################################################################
+
+    """
+    Batched trading (TRADE_BATCH;COUNT|ACTION;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;
+    LOTS;MAGIC;TICKET|...), one response with a result per item
+    """
+    def _DWX_ZMQ_Handle_Trade_Batch_(self, _msg):
+
+        _header, *_items = _msg.split('|')
+
+        try:
+            _count = int(_header.split(';')[1])
+        except (IndexError, ValueError):
+            _count = None
+
+        # Truncated or malformed: nothing is executed
+        if _count != len(_items):
+            return {'_action': 'TRADE_BATCH', '_response': 'INVALID_BATCH'}
+
+        # Executed in order, each result as the response to the command
+        # sent alone
+        _results = []
+
+        for _item in _items:
+
+            _compArray = ['TRADE'] + _item.split(';')
+            _result = None
+
+            if len(_compArray) == 11 and _compArray[1] in _BATCH_ACTIONS:
+                try:
+                    _result = self._DWX_ZMQ_Handle_Trade_(_compArray)
+                except ValueError:
+                    pass
+
+            if _result is None:
+                _result = {'_response': 'INVALID_BATCH_ITEM'}
+
+            _results.append(_result)
+
+        return {'_action': 'TRADE_BATCH', '_count': len(_results), '_results': _results}
+
+    ##########################################################################
+
+    def _DWX_OpenOrder_(self, _symbol, _type, _lots, _SL, _TP, _comment, _magic):
+
+        _bid, _ask = self._get_bid_ask_(_symbol)
+        _price = _ask if _type in (0, 2, 4) else _bid
+
+        self._next_ticket += 1
+        _ticket = self._next_ticket
+
+        self._trades[_ticket] = {'_magic': _magic,
+                                 '_symbol': _symbol,
+                                 '_lots': _lots,
+                                 '_type': _type,
+                                 '_open_price': _price,
+                                 '_open_time': self._time_string_(),
+                                 '_SL': _SL,
+                                 '_TP': _TP,
+                                 '_pnl': 0.0,
+                                 '_comment': _comment}
+
+        return {'_action': 'EXECUTION',
+                '_magic': _magic,
+                '_ticket': _ticket,
+                '_open_time': self._trades[_ticket]['_open_time'],
+                '_open_price': _price,
+                '_sl': _SL,
+                '_tp': _TP}
+
+    ##########################################################################
+
+    def _DWX_CloseAtMarket_(self, _ticket, _size=-1):
+
+        _trade = self._trades.pop(_ticket)
+        _bid, _ask = self._get_bid_ask_(_trade['_symbol'])
+        _price = _bid if _trade['_type'] in (0, 2, 4) else _ask
+
+        # Partial close: the remainder gets a new ticket, as in MetaTrader
+        if 0.01 <= _size < _trade['_lots']:
+            self._next_ticket += 1
+            _trade['_lots'] = round(_trade['_lots'] - _size, 2)
+            self._trades[self._next_ticket] = _trade
+            return {'_close_price': _price, '_close_lots': _size}
+
+        return {'_close_price': _price, '_close_lots': _trade['_lots']}
+
+    ##########################################################################
+
+    """
+    Data requests (DATA|HIST;SYMBOL;TIMEFRAME;START_DATETIME;END_DATETIME)
+    """
+    def _DWX_CopyRates_(self, _compArray):
+
+        _timeframe = timedelta(minutes=int(_compArray[2]))
+        _start = datetime.strptime(_compArray[3], '%Y.%m.%d %H:%M:%S')
+        _end = datetime.strptime(_compArray[4], '%Y.%m.%d %H:%M:%S')
+
+        # Deterministic per (symbol, bar time), so repeated requests agree
+        _rates = []
+
+        # First bar opening at or after _start, as CopyRates() returns them
+        _epoch = datetime(1970, 1, 1)
+        _time = _epoch - ((_epoch - _start) // _timeframe) * _timeframe
+
+        while _time <= _end:
+            _bar = random.Random('{} {}'.format(_compArray[1], _time))
+            _open = round(_bar.uniform(1.0, 1.2), 5)
+            _close = round(_open + _bar.uniform(-0.001, 0.001), 5)
+            _rates.append((_time, _open,
+                           round(max(_open, _close) + _bar.uniform(0, 0.0005), 5),
+                           round(min(_open, _close) - _bar.uniform(0, 0.0005), 5),
+                           _close, _bar.randint(1, 300), 0, 0))
+            _time += _timeframe
+
+        return _rates
+
+    def _DWX_GetData_(self, _compArray):
+
+        _rates = self._DWX_CopyRates_(_compArray)
+
+        if not _rates:
+            return {'_action': 'DATA', '_response': 'NOT_AVAILABLE'}
+
+        return {'_action': 'DATA',
+                '_data': {r[0].strftime('%Y.%m.%d %H:%M'): r[4] for r in _rates}}
+
+    def _DWX_GetHist_(self, _compArray):
+
+        _rates = self._DWX_CopyRates_(_compArray)
+
+        if not _rates:
+            return {'_action': 'HIST', '_response': 'NOT_AVAILABLE'}
+
+        return {'_action': 'HIST',
+                '_data': [self._hist_bar_(r) for r in _rates]}
+
+    def _DWX_GetHist_Chunked_(self, _compArray, _chunk_size):
+
+        _rates = self._DWX_CopyRates_(_compArray)
+        _chunk_size = max(1, _chunk_size)
+
+        # Generator: each chunk is built, sent, and only then the next one,
+        # so the client can use the first bars before the last are built.
+        # '_total' counts the bars of the whole response; an empty range is
+        # one final chunk with no bars.
+        for _seq, _first in enumerate(range(0, max(1, len(_rates)), _chunk_size)):
+            yield {'_action': 'HIST_CHUNK',
+                   '_symbol': _compArray[1],
+                   '_timeframe': int(_compArray[2]),
+                   '_seq': _seq,
+                   '_final': _first + _chunk_size >= len(_rates),
+                   '_total': len(_rates),
+                   '_data': [self._hist_bar_(r) for r in _rates[_first:_first + _chunk_size]]}
+
+    def _hist_bar_(self, _rate):
+
+        return {'time': _rate[0].strftime('%Y.%m.%d %H:%M'),
+                'open': _rate[1], 'high': _rate[2], 'low': _rate[3], 'close': _rate[4],
+                'tick_volume': _rate[5], 'spread': _rate[6], 'real_volume': _rate[7]}
+
+    ##########################################################################
+
+    """
+    MT5 Service dialect (ACTION;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;TICKET
+    for trading, GET_DATA;SYMBOL;TIMEFRAME;START;END, GET_TICK_DATA;SYMBOL;START;END,
+    GET_DATA_SYMBOL;SYMBOL, GET_ALL_SYMBOLS). SL / TP are sent in points and
+    reported as prices.
+    """
+    def _DWX_ZMQ_Interpret_MT5_Message_(self, _compArray):
+
+        # components[10], as in MessageHandler()
+        _compArray = (_compArray + [''] * 10)[:10]
+        _action = int(_compArray[0])
+
+        try:
+            if _action == HEARTBEAT:
+                return {'_action': 'heartbeat', '_response': 'loud and clear!'}
+
+            if _action in (POS_OPEN, ORD_OPEN):
+                return self._DWX_MT5_Open_(_action, _compArray[2], int(_compArray[1]),
+                                           float(_compArray[7]), float(_compArray[3]),
+                                           float(_compArray[4]), float(_compArray[5]),
+                                           _compArray[6], int(_compArray[8]))
+
+            if _action in (POS_MODIFY, ORD_MODIFY):
+                return self._DWX_MT5_Modify_(_action, int(_compArray[9]),
+                                             float(_compArray[4]), float(_compArray[5]))
+
+            if _action in (POS_CLOSE, POS_CLOSE_PARTIAL):
+                return self._DWX_MT5_Close_(int(_compArray[9]),
+                                            float(_compArray[7]) if _action == POS_CLOSE_PARTIAL else -1)
+
+            if _action in (POS_CLOSE_MAGIC, POS_CLOSE_ALL):
+                return self._DWX_MT5_Close_Many_(int(_compArray[8]) if _action == POS_CLOSE_MAGIC else None)
+
+            if _action == ORD_DELETE:
+                return self._DWX_MT5_Delete_(int(_compArray[9]))
+
+            if _action == ORD_DELETE_ALL:
+                _response = {'_action': 'DELETE_ALL', '_responses': {}}
+
+                for _ticket in sorted(self._orders, reverse=True):
+                    _order = self._orders.pop(_ticket)
+                    _response['_responses'][_ticket] = {'_symbol': _order['_symbol'],
+                                                        '_magic': _order['_magic'],
+                                                        '_response': 'CLOSE_PENDING'}
+
+                if _response['_responses']:
+                    _response['_response_value'] = 'SUCCESS'
+                else:
+                    _response['_response'] = 'NOT_FOUND'
+
+                return _response
+
+            if _action == GET_POSITIONS:
+                return {'_action': 'OPEN_POSITIONS',
+                        '_positions': {t: dict(o) for t, o in self._trades.items()}}
+
+            if _action == GET_PENDING_ORDERS:
+                return {'_action': 'PENDING_ORDERS',
+                        '_orders': {t: dict(o) for t, o in self._orders.items()}}
+
+            if _action == GET_DATA:
+                return self._DWX_MT5_GetData_(_compArray)
+
+            if _action == GET_TICK_DATA:
+                return self._DWX_MT5_GetTickData_(_compArray)
+
+            if _action == GET_DATA_SYMBOL:
+                return {'_action': 'GET_DATA_SYMBOL',
+                        '_symbol_data': {'_symbol_point': _POINT,
+                                         '_symbol_digits': _DIGITS,
+                                         '_symbol_contract_size': 100000.0,
+                                         '_symbol_lots_min': 0.01}}
+
+            if _action == GET_ALL_SYMBOLS:
+                return {'_action': 'GET_ALL_SYMBOLS', '_all_symbols': list(self._symbols)}
+
+        except ValueError:
+            pass # Malformed command, no response (as unknown commands)
+
+        return None
+
+    ##########################################################################
+
+    def _DWX_MT5_Open_(self, _action, _symbol, _type, _lots, _price, _SL, _TP, _comment, _magic):
+
+        _response = {'_action': 'EXECUTION'}
+
+        # POS_OPEN: ORDER_TYPE_BUY / SELL, ORD_OPEN: BUY_LIMIT .. SELL_STOP
+        if _action == POS_OPEN and _type > 1:
+            _response.update({'_response': 'ACTION_TYPE_ERROR',
+                              'response_value': 'INVALID_POSITION_OPEN_TYPE'})
+            return _response
+
+        if _action == ORD_OPEN and not 2 <= _type <= 5:
+            _response.update({'_response': 'ACTION_TYPE_ERROR',
+                              'response_value': 'INVALID_PENDING_ORDER_TYPE'})
+            return _response
+
+        if _lots > self._max_lots:
+            _response.update({'_response': 'LOT_SIZE_ERROR',
+                              'response_value': 'MAX_LOT_SIZE_EXCEEDED'})
+            return _response
+
+        _bid, _ask = self._get_bid_ask_(_symbol)
+
+        # Stops from market price (positions) or order price (pending)
+        if _action == POS_OPEN:
+            _price = _ask if _type == 0 else _bid
+            _reference = _bid if _type == 0 else _ask
+        else:
+            _reference = _price
+
+        _direction = 1 if _type in (0, 2, 4) else -1
+        _sl = round(_reference - _SL * _direction * _POINT, _DIGITS) if _SL != 0 else 0.0
+        _tp = round(_reference + _TP * _direction * _POINT, _DIGITS) if _TP != 0 else 0.0
+
+        self._next_ticket += 1
+        _ticket = self._next_ticket
+
+        _entry = {'_magic': _magic,
+                  '_symbol': _symbol,
+                  '_lots': _lots,
+                  '_type': _type,
+                  '_open_price': _price}
+
+        if _action == POS_OPEN:
+            _entry.update({'_open_time': self._time_string_(),
+                           '_SL': _sl, '_TP': _tp, '_pnl': 0.0, '_comment': _comment})
+            self._trades[_ticket] = _entry
+            _response.update({'_magic': _magic, '_ticket': _ticket,
+                              '_open_time': _entry['_open_time'], '_open_price': _price})
+        else:
+            _entry.update({'_SL': _sl, '_TP': _tp, '_comment': _comment})
+            self._orders[_ticket] = _entry
+            _response.update({'_magic': _magic, '_ticket': _ticket,
+                              '_setup_time': self._time_string_(), '_open_price': _price})
+
+        return _response
+
+    ##########################################################################
+
+    def _DWX_MT5_Modify_(self, _action, _ticket, _SL, _TP):
+
+        if _action == POS_MODIFY:
+            _response = {'_action': 'POSITION_MODIFY'}
+            _book = self._trades
+        else:
+            _response = {'_action': 'ORDER_MODIFY'}
+            _book = self._orders
+
+        if _ticket not in _book:
+            _response['_response'] = 'NOT_FOUND'
+            return _response
+
+        _entry = _book[_ticket]
+        _direction = 1 if _entry['_type'] in (0, 2, 4) else -1
+        _sl = round(_entry['_open_price'] - _SL * _direction * _POINT, _DIGITS) if _SL != 0 else 0.0
+        _tp = round(_entry['_open_price'] + _TP * _direction * _POINT, _DIGITS) if _TP != 0 else 0.0
+
+        _entry['_SL'] = _sl
+        _entry['_TP'] = _tp
+        _response.update({'_sl': _sl, '_tp': _tp})
+
+        return _response
+
+    ##########################################################################
+
+    def _DWX_MT5_Close_(self, _ticket, _size=-1):
+
+        _response = {'_action': 'CLOSE', '_ticket': _ticket}
+
+        if _size != -1:
+            _response['_response'] = 'CLOSE_PARTIAL'
+
+        if _ticket not in self._trades:
+            _response['_response'] = 'NOT_FOUND'
+            return _response
+
+        _position = self._trades[_ticket]
+        _bid, _ask = self._get_bid_ask_(_position['_symbol'])
+
+        # Sizes below the minimum or above the volume close everything;
+        # the position keeps its ticket when partially closed
+        if not 0.01 <= _size < _position['_lots']:
+            _size = _position['_lots']
+            del self._trades[_ticket]
+        else:
+            _position['_lots'] = round(_position['_lots'] - _size, 2)
+
+        _response.update({'_close_price': _bid if _position['_type'] == 0 else _ask,
+                          '_close_lots': _size})
+
+        if _response.get('_response') != 'CLOSE_PARTIAL':
+            _response.update({'_response': 'CLOSE_MARKET', '_response_value': 'SUCCESS'})
+
+        return _response
+
+    def _DWX_MT5_Close_Many_(self, _magic=None):
+
+        if _magic is None:
+            _response = {'_action': 'CLOSE_ALL', '_responses': {}}
+        else:
+            _response = {'_action': 'CLOSE_ALL_MAGIC', '_magic': _magic, '_responses': {}}
+
+        for _ticket in sorted(self._trades, reverse=True):
+
+            _position = self._trades[_ticket]
+
+            if _magic is not None and _position['_magic'] != _magic:
+                continue
+
+            _closed = {'_symbol': _position['_symbol']}
+            if _magic is None:
+                _closed['_magic'] = _position['_magic']
+
+            _result = self._DWX_MT5_Close_(_ticket)
+            _closed.update({'_close_price': _result['_close_price'],
+                            '_close_lots': _result['_close_lots'],
+                            '_response': 'CLOSE_MARKET'})
+            _response['_responses'][_ticket] = _closed
+
+        if _response['_responses']:
+            _response['_response_value'] = 'SUCCESS'
+        else:
+            _response['_response'] = 'NOT_FOUND'
+
+        return _response
+
+    def _DWX_MT5_Delete_(self, _ticket):
+
+        _response = {'_action': 'DELETE', '_ticket': _ticket}
+
+        if self._orders.pop(_ticket, None) is None:
+            _response['_response'] = 'NOT_FOUND'
+        else:
+            _response.update({'_response': 'CLOSE_PENDING', '_response_value': 'SUCCESS'})
+
+        return _response
+
+    ##########################################################################
+
+    def _DWX_MT5_GetData_(self, _compArray):
+
+        # ENUM_TIMEFRAMES: minutes up to M30, 0x4000 + hours, W1, MN1
+        _timeframe = int(_compArray[2])
+
+        if _timeframe == 32769:
+            _minutes = 10080
+        elif _timeframe == 49153:
+            _minutes = 43200
+        elif _timeframe > 16384:
+            _minutes = (_timeframe - 16384) * 60
+        else:
+            _minutes = _timeframe
+
+        _start = self._string_to_time_(_compArray[3])
+        _end = self._string_to_time_(_compArray[4])
+        _rates = []
+
+        if _start is not None and _end is not None and _minutes > 0:
+            _rates = self._DWX_CopyRates_([_compArray[0], _compArray[1], _minutes,
+                                           _start.strftime('%Y.%m.%d %H:%M:%S'),
+                                           _end.strftime('%Y.%m.%d %H:%M:%S')])
+
+        if not _rates:
+            return {'_action': 'GET_DATA', '_response': 'NOT_AVAILABLE'}
+
+        return {'_action': 'GET_DATA',
+                '_ohlc_data': {r[0].strftime('%Y.%m.%d %H:%M'): [r[1], r[2], r[3], r[4]]
+                               for r in _rates}}
+
+    def _DWX_MT5_GetTickData_(self, _compArray):
+
+        _response = {'_action': 'GET_TICK_DATA'}
+
+        # '0' end: up to now
+        _start = None if _compArray[2] == '0' else self._string_to_time_(_compArray[2])
+        _end = datetime.now() if _compArray[3] in ('0', '') else self._string_to_time_(_compArray[3])
+
+        if _start is None or _end is None:
+            _response['_response'] = 'INCORRECT_DATE_FORMAT'
+            return _response
+
+        _ticks = self._DWX_CopyTicks_(_compArray[1], _start, _end)
+
+        if not _ticks:
+            _response['_response'] = 'NO_TICKS_AVAILABLE'
+            return _response
+
+        _response['_data'] = {
+            (_EPOCH + timedelta(milliseconds=_msc)).strftime('%Y.%m.%d %H:%M:%S.%f')[:-3]: [_bid, _ask]
+            for _msc, _bid, _ask in _ticks}
+
+        return _response
+
+    def _DWX_CopyTicks_(self, _symbol, _start, _end):
+
+        # Deterministic per (symbol, second): 0 to 3 ticks each, around that
+        # minute's bar open, so repeated requests agree
+        _ticks = []
+        _first = int((_start - _EPOCH).total_seconds())
+        _last = int((_end - _EPOCH).total_seconds())
+
+        for _second in range(_first, _last + 1):
+
+            _random = random.Random('{} {}'.format(_symbol, _second))
+            _base = random.Random('{} {}'.format(_symbol, _EPOCH + timedelta(minutes=_second // 60)))
+            _open = round(_base.uniform(1.0, 1.2), 5)
+
+            for _ms in sorted(_random.sample(range(1000), _random.randint(0, 3))):
+                _bid = round(_open + _random.uniform(-0.0005, 0.0005), 5)
+                _ticks.append((_second * 1000 + _ms, _bid, round(_bid + 0.00002, 5)))
+
+        return _ticks
+
+    ##########################################################################
+
+    """
+    Function to publish prices / rates for tracked symbols (the Expert Advisor's OnTick())
+    """
+    def _DWX_ZMQ_Publish_Data_(self):
+
+        if self._replay is not None:
+            self._DWX_ZMQ_Replay_Ticks_()
+            return
+
+        # Ticks published per symbol so far, for _tick_rate / _tick_limit
+        _published = 0
+        _start = monotonic()
+
+        while self._ACTIVE:
+
+            # Paced from the first tracked symbol on
+            if not self._publish_symbols:
+                _published = 0
+                _start = monotonic()
+
+            if self._tick_rate is None:
+                _due = 1
+            else:
+                _due = int((monotonic() - _start) * self._tick_rate) - _published
+
+            if self._tick_limit is not None:
+                _due = min(_due, self._tick_limit - _published)
+
+            if _due > 0:
+                _published += _due
+                for _symbol in list(self._publish_symbols):
+                    self._publish_ticks_(_symbol, _due)
+
+            for _symbol, _timeframe in list(self._publish_instruments):
+                _bid, _ask = self._get_bid_ask_(_symbol)
+                _time = int(time()) // (_timeframe * 60) * (_timeframe * 60)
+                _topic = "{}_{}".format(_symbol, _TIMEFRAME_TEXT.get(_timeframe, 'UNKNOWN'))
+                if self._binary:
+                    self._publish_(_topic, DWX_ZMQ_Binary_Format.encode_rate(
+                        self._symbol_id_(_topic), _time, _bid, _bid, _bid, _bid, 1, 0, 0))
+                else:
+                    self._publish_(_topic, "{};{:f};{:f};{:f};{:f};{};{};{}".format(
+                                       _time, _bid, _bid, _bid, _bid, 1, 0, 0))
+
+            sleep(self._publish_delay)
+
+    ##########################################################################
+
+    def _publish_ticks_(self, _symbol, _count):
+
+        _ticks = [self._get_bid_ask_(_symbol) for _ in range(_count)]
+
+        # Tick times (ms) strictly increasing per symbol, as time_msc in MT5
+        _msc = max(int(time() * 1000) - _count + 1, self._tick_msc.get(_symbol, 0) + 1)
+        self._tick_msc[_symbol] = _msc + _count - 1
+
+        if self._binary:
+            for _i, (_bid, _ask) in enumerate(_ticks):
+                self._publish_(_symbol, DWX_ZMQ_Binary_Format.encode_tick(
+                    self._symbol_id_(_symbol), _msc + _i, _bid, _ask))
+
+        # MT5 Service: all new ticks of the symbol in one message
+        elif self._dialect == 'mt5':
+            self._publish_(_symbol, "#".join("{};{:.5f};{:.5f}".format(_msc + _i, _bid, _ask)
+                                             for _i, (_bid, _ask) in enumerate(_ticks)))
+
+        else:
+            for _bid, _ask in _ticks:
+                self._publish_(_symbol, "{:f};{:f}".format(_bid, _ask))
+
+    ##########################################################################
+
+    """
+    Function to publish the messages of a tick journal, as recorded, at
+    _replay_speed times the recorded pace
+    """
+    def _DWX_ZMQ_Replay_Ticks_(self):
+
+        _day = self._replay_day or max(os.listdir(self._replay))
+        _first = None
+        _count = 0
+
+        print("[REPLAY] Publishing {} from {}".format(_day, self._replay))
+
+        for _seq, _time_ns, _topic, _payload in DWX_ZMQ_Tick_Journal.replay(self._replay, _day):
+
+            if not self._ACTIVE:
+                return
+
+            if self._replay_speed > 0:
+                if _first is None:
+                    _first = (_time_ns, monotonic())
+                _wait = (_first[1] + (_time_ns - _first[0]) / 1e9 / self._replay_speed
+                         - monotonic())
+                if _wait > 0:
+                    sleep(_wait)
+
+            self._publish_(_topic, _payload)
+            _count += 1
+
+        print("[REPLAY] Done, {} messages published".format(_count))
+
+    ##########################################################################
+
+    """
+    Function to publish one message: "TOPIC PAYLOAD" as the Expert Advisor
+    does, or [TOPIC, PAYLOAD] as two frames if _multipart is set. _payload
+    is text or a binary record (bytes).
+    """
+    def _publish_(self, _topic, _payload):
+
+        if isinstance(_payload, str):
+            _payload = _payload.encode()
+
+        if self._multipart:
+            self._PUB_SOCKET.send_multipart([_topic.encode(), _payload])
+        else:
+            self._PUB_SOCKET.send(_topic.encode() + b" " + _payload)
+
+    def _symbol_id_(self, _topic):
+
+        if _topic not in self._symbol_ids:
+            self._symbol_ids[_topic] = len(self._symbol_ids)
+
+        return self._symbol_ids[_topic]
+
+##############################################################################
+
+if __name__ == "__main__":
+
+    _args = argparse.ArgumentParser(description=__doc__.split('--')[0])
+    _args.add_argument('--push-port', type=int, default=32768)
+    _args.add_argument('--pull-port', type=int, default=32769)
+    _args.add_argument('--pub-port', type=int, default=32770)
+    _args.add_argument('--publish-delay', type=float, default=0.1)
+    _args.add_argument('--multipart', action='store_true',
+                       help='publish topic and payload as two frames')
+    _args.add_argument('--binary', action='store_true',
+                       help='publish binary records instead of text')
+    _args.add_argument('--dialect', choices=('mt4', 'mt5'), default='mt4',
+                       help='SUB message format')
+    _args.add_argument('--symbols', default=None,
+                       help='comma-separated symbols (mt5: published from the start)')
+    _args.add_argument('--tick-rate', type=float, default=None,
+                       help='ticks per second per symbol')
+    _args.add_argument('--tick-limit', type=int, default=None,
+                       help='ticks per symbol to publish')
+    _args.add_argument('--timer-ms', type=float, default=None,
+                       help='min. milliseconds between commands read (OnTimer() pacing)')
+    _args.add_argument('--seed', type=int, default=None)
+    _args.add_argument('--replay', default=None,
+                       help='tick journal directory to publish')
+    _args.add_argument('--replay-day', default=None)
+    _args.add_argument('--replay-speed', type=float, default=1.0)
+    _args.add_argument('--verbose', action='store_true')
+    _args = _args.parse_args()
+
+    _server = DWX_ZeroMQ_Server(_PUSH_PORT=_args.push_port,
+                                _PULL_PORT=_args.pull_port,
+                                _PUB_PORT=_args.pub_port,
+                                _publish_delay=_args.publish_delay,
+                                _multipart=_args.multipart,
+                                _binary=_args.binary,
+                                _dialect=_args.dialect,
+                                _symbols=_args.symbols.split(',') if _args.symbols else None,
+                                _tick_rate=_args.tick_rate,
+                                _tick_limit=_args.tick_limit,
+                                _timer_interval=None if _args.timer_ms is None else _args.timer_ms / 1000,
+                                _seed=_args.seed,
+                                _replay=_args.replay,
+                                _replay_day=_args.replay_day,
+                                _replay_speed=_args.replay_speed,
+                                _verbose=_args.verbose)
+    _server._start_()
+
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        _server._stop_()